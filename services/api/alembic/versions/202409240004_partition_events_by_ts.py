@@ -0,0 +1,150 @@
+"""Partition events by ts with a BRIN index and add per-minute rollups.
+
+Revision ID: 202409240004
+Revises: 202409240003
+Create Date: 2025-09-24 05:10:00
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "202409240004"
+down_revision = "202409240003"
+branch_labels = None
+depends_on = None
+
+_PARTITION_DAYS_AHEAD = 7
+
+_CREATE_PARTITION_FUNCTION = """
+CREATE OR REPLACE FUNCTION create_events_partition(day date) RETURNS text AS $$
+DECLARE
+    part text := format('events_p%s', to_char(day, 'YYYYMMDD'));
+    lower_bound timestamptz := day::timestamp AT TIME ZONE 'UTC';
+    upper_bound timestamptz := (day + 1)::timestamp AT TIME ZONE 'UTC';
+BEGIN
+    IF to_regclass(part) IS NOT NULL THEN
+        RETURN part;
+    END IF;
+    EXECUTE format(
+        'CREATE TABLE %I (LIKE events INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', part
+    );
+    EXECUTE format(
+        'WITH moved AS (DELETE FROM events_default WHERE ts >= %L AND ts < %L RETURNING *) '
+        'INSERT INTO %I SELECT * FROM moved',
+        lower_bound, upper_bound, part
+    );
+    EXECUTE format(
+        'ALTER TABLE events ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+        part, lower_bound, upper_bound
+    );
+    RETURN part;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE events RENAME TO events_legacy")
+    op.execute("ALTER TABLE events_legacy RENAME CONSTRAINT events_pkey TO events_legacy_pkey")
+    op.execute(
+        "ALTER TABLE events_legacy RENAME CONSTRAINT events_stream_id_fkey "
+        "TO events_legacy_stream_id_fkey"
+    )
+    op.execute("ALTER INDEX IF EXISTS ix_events_stream_id RENAME TO ix_events_legacy_stream_id")
+    op.execute("ALTER INDEX IF EXISTS ix_events_id RENAME TO ix_events_legacy_id")
+    op.execute("ALTER SEQUENCE IF EXISTS events_id_seq RENAME TO events_legacy_id_seq")
+
+    op.create_table(
+        "events",
+        sa.Column("id", sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column("stream_id", sa.Integer(), nullable=False),
+        sa.Column("type", sa.String(length=120), nullable=False),
+        sa.Column("payload_json", postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column("ts", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.PrimaryKeyConstraint("id", "ts"),
+        sa.ForeignKeyConstraint(["stream_id"], ["streams.id"], ondelete="CASCADE"),
+        postgresql_partition_by="RANGE (ts)",
+    )
+    op.create_index("ix_events_stream_id", "events", ["stream_id"])
+    op.create_index("ix_events_ts_brin", "events", ["ts"], postgresql_using="brin")
+
+    op.execute(_CREATE_PARTITION_FUNCTION)
+    op.execute("CREATE TABLE events_default PARTITION OF events DEFAULT")
+    op.execute(
+        f"""
+        SELECT create_events_partition(day::date)
+        FROM generate_series(
+            COALESCE(
+                (SELECT date_trunc('day', min(ts) AT TIME ZONE 'UTC') FROM events_legacy),
+                date_trunc('day', now() AT TIME ZONE 'UTC')
+            ),
+            date_trunc('day', now() AT TIME ZONE 'UTC') + interval '{_PARTITION_DAYS_AHEAD} days',
+            interval '1 day'
+        ) AS day
+        """
+    )
+
+    op.execute(
+        """
+        INSERT INTO events (id, stream_id, type, payload_json, ts)
+        SELECT id, stream_id, type, COALESCE(payload_json::jsonb, '{}'::jsonb), ts
+        FROM events_legacy
+        """
+    )
+    op.execute(
+        "SELECT setval(pg_get_serial_sequence('events', 'id'), "
+        "COALESCE((SELECT max(id) FROM events), 0) + 1, false)"
+    )
+    op.execute("DROP TABLE events_legacy")
+
+    op.create_table(
+        "event_rollups",
+        sa.Column("stream_id", sa.Integer(), nullable=False),
+        sa.Column("minute", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("type", sa.String(length=120), nullable=False),
+        sa.Column("event_count", sa.BigInteger(), nullable=False, server_default=sa.text("0")),
+        sa.Column("gift_value", sa.Numeric(18, 2), nullable=False, server_default=sa.text("0")),
+        sa.PrimaryKeyConstraint("stream_id", "minute", "type"),
+        sa.ForeignKeyConstraint(["stream_id"], ["streams.id"], ondelete="CASCADE"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("event_rollups")
+
+    op.execute("ALTER TABLE events RENAME TO events_partitioned")
+    op.execute(
+        "ALTER TABLE events_partitioned RENAME CONSTRAINT events_pkey TO events_partitioned_pkey"
+    )
+    op.execute(
+        "ALTER TABLE events_partitioned RENAME CONSTRAINT events_stream_id_fkey "
+        "TO events_partitioned_stream_id_fkey"
+    )
+    op.execute("ALTER INDEX ix_events_stream_id RENAME TO ix_events_partitioned_stream_id")
+    op.execute("ALTER SEQUENCE events_id_seq RENAME TO events_partitioned_id_seq")
+
+    op.create_table(
+        "events",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("stream_id", sa.Integer(), sa.ForeignKey("streams.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("type", sa.String(length=120), nullable=False),
+        sa.Column("payload_json", sa.JSON(), nullable=True),
+        sa.Column("ts", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+    )
+    op.create_index("ix_events_stream_id", "events", ["stream_id"])
+    op.execute(
+        """
+        INSERT INTO events (id, stream_id, type, payload_json, ts)
+        SELECT id, stream_id, type, payload_json::json, ts FROM events_partitioned
+        """
+    )
+    op.execute(
+        "SELECT setval(pg_get_serial_sequence('events', 'id'), "
+        "COALESCE((SELECT max(id) FROM events), 0) + 1, false)"
+    )
+    op.execute("DROP TABLE events_partitioned CASCADE")
+    op.execute("DROP FUNCTION IF EXISTS create_events_partition(date)")
@@ -0,0 +1,26 @@
+"""Replace the events stream_id index with a (stream_id, ts, id) keyset index.
+
+Revision ID: 202409240005
+Revises: 202409240004
+Create Date: 2025-09-24 06:00:00
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "202409240005"
+down_revision = "202409240004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_events_stream_id_ts_id", "events", ["stream_id", "ts", "id"])
+    op.drop_index("ix_events_stream_id", table_name="events")
+
+
+def downgrade() -> None:
+    op.create_index("ix_events_stream_id", "events", ["stream_id"])
+    op.drop_index("ix_events_stream_id_ts_id", table_name="events")
@@ -0,0 +1,47 @@
+"""Add (user_id, created_at, id) indexes for product and rule keyset pagination.
+
+The rules table was previously only created by ``create_all`` at startup, so it
+is created here when missing.
+
+Revision ID: 202409240006
+Revises: 202409240005
+Create Date: 2025-09-24 06:30:00
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "202409240006"
+down_revision = "202409240005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if not sa.inspect(op.get_bind()).has_table("rules"):
+        op.create_table(
+            "rules",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("trigger", sa.String(length=255), nullable=False),
+            sa.Column("action", sa.String(length=32), nullable=False),
+            sa.Column("params_json", postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+            sa.Column("active", sa.Boolean(), nullable=False),
+            sa.Column("created_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        )
+        op.create_index("ix_rules_id", "rules", ["id"])
+        op.create_index("ix_rules_user_id", "rules", ["user_id"])
+
+    op.create_index(
+        "ix_products_user_id_created_at_id", "products", ["user_id", "created_at", "id"]
+    )
+    op.create_index("ix_rules_user_id_created_at_id", "rules", ["user_id", "created_at", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_rules_user_id_created_at_id", table_name="rules")
+    op.drop_index("ix_products_user_id_created_at_id", table_name="products")
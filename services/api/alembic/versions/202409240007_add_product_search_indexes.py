@@ -0,0 +1,47 @@
+"""Add trigram, full-text and tag indexes for product search.
+
+Revision ID: 202409240007
+Revises: 202409240006
+Create Date: 2025-09-24 07:00:00
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "202409240007"
+down_revision = "202409240006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index(
+        "ix_products_title_trgm",
+        "products",
+        ["title"],
+        postgresql_using="gin",
+        postgresql_ops={"title": "gin_trgm_ops"},
+    )
+    op.create_index(
+        "ix_products_title_fts",
+        "products",
+        [sa.text("to_tsvector('simple'::regconfig, title)")],
+        postgresql_using="gin",
+    )
+    op.create_index(
+        "ix_products_tags",
+        "products",
+        ["tags"],
+        postgresql_using="gin",
+        postgresql_ops={"tags": "jsonb_path_ops"},
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_products_tags", table_name="products")
+    op.drop_index("ix_products_title_fts", table_name="products")
+    op.drop_index("ix_products_title_trgm", table_name="products")
@@ -0,0 +1,51 @@
+"""Add a unique (user_id, url) natural key to products for bulk upserts.
+
+The upgrade refuses to run while a user has several products with the same
+URL: deleting them would lose data and leave ``pin_product`` rules pointing
+at removed ids. The error lists the duplicates so they can be merged by hand.
+
+Revision ID: 202409240008
+Revises: 202409240007
+Create Date: 2025-09-24 08:00:00
+"""
+
+from __future__ import annotations
+
+from alembic import context, op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "202409240008"
+down_revision = "202409240007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if not context.is_offline_mode():
+        duplicates = op.get_bind().execute(
+            sa.text(
+                """
+                SELECT user_id, url, array_agg(id ORDER BY id) AS ids
+                FROM products
+                GROUP BY user_id, url
+                HAVING count(*) > 1
+                ORDER BY user_id, url
+                """
+            )
+        ).all()
+        if duplicates:
+            listed = "\n".join(
+                f"  user {user_id}: {url} -> product ids {', '.join(map(str, ids))}"
+                for user_id, url, ids in duplicates
+            )
+            raise RuntimeError(
+                f"{len(duplicates)} product URLs are used by more than one product of the "
+                "same user. Merge or delete the duplicates (and repoint pin_product rules "
+                f"at the kept id) before upgrading:\n{listed}"
+            )
+    op.create_index("uq_products_user_id_url", "products", ["user_id", "url"], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index("uq_products_user_id_url", table_name="products")
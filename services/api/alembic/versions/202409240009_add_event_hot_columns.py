@@ -0,0 +1,136 @@
+"""Promote hot event payload fields to typed, indexed columns.
+
+Existing rows are backfilled with the same rules as
+``app.services.event_columns`` at ingest time: the first non-empty string
+under each column's keys is moved out of ``payload_json`` (non-canonical key
+names are kept under ``"~keys"``) and ``gift_value`` is derived from
+``value`` x ``amount``. Run ``VACUUM ANALYZE events`` afterwards so the space
+held by the rewritten rows is reused.
+
+Revision ID: 202409240009
+Revises: 202409240008
+Create Date: 2025-09-24 09:00:00
+"""
+
+from __future__ import annotations
+
+from typing import Optional, Sequence
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "202409240009"
+down_revision = "202409240008"
+branch_labels = None
+depends_on = None
+
+# Frozen copy of event_columns.PAYLOAD_KEYS and the types each column applies to.
+_COLUMNS = (
+    ("username", ("username", "user", "author"), None),
+    ("message", ("message", "text"), ("chat", "chat_repeat")),
+    ("gift_name", ("giftName", "gift_name", "gift"), ("gift",)),
+)
+_ALIASES_KEY = "~keys"
+
+
+def _picked_key(keys: Sequence[str], types: Optional[Sequence[str]]) -> str:
+    """SQL for the payload key a column is taken from, NULL if none qualifies."""
+
+    branches = " ".join(
+        f"WHEN jsonb_typeof(payload_json -> '{key}') = 'string' "
+        f"AND payload_json ->> '{key}' <> '' THEN '{key}'"
+        for key in keys
+    )
+    picked = f"CASE {branches} END"
+    if types is None:
+        return picked
+    listed = ", ".join(f"'{event_type}'" for event_type in types)
+    return f"CASE WHEN type IN ({listed}) THEN {picked} END"
+
+
+def upgrade() -> None:
+    op.add_column("events", sa.Column("username", sa.Text(), nullable=True))
+    op.add_column("events", sa.Column("message", sa.Text(), nullable=True))
+    op.add_column("events", sa.Column("gift_name", sa.Text(), nullable=True))
+    op.add_column("events", sa.Column("gift_value", sa.Numeric(18, 2), nullable=True))
+
+    # The key each column is taken from is worked out once per row, then used
+    # both to fill the column and to strip (or alias) it in the payload.
+    picked = ",\n                ".join(
+        f"{_picked_key(keys, types)} AS {column}" for column, keys, types in _COLUMNS
+    )
+    assignments = ",\n            ".join(
+        f"{column} = e.payload_json ->> p.{column}" for column, _, _ in _COLUMNS
+    )
+    moved = ", ".join(f"p.{column}" for column, _, _ in _COLUMNS)
+    aliases = ", ".join(
+        f"'{column}', NULLIF({column}, '{keys[0]}')" for column, keys, _ in _COLUMNS
+    )
+    op.execute(
+        f"""
+        WITH picked AS (
+            SELECT
+                id,
+                ts,
+                {picked}
+            FROM events
+        ),
+        p AS (
+            SELECT *, jsonb_strip_nulls(jsonb_build_object({aliases})) AS aliases
+            FROM picked
+        )
+        UPDATE events e SET
+            {assignments},
+            gift_value = CASE WHEN e.type = 'gift' AND jsonb_typeof(e.payload_json -> 'value') = 'number'
+                THEN (e.payload_json ->> 'value')::numeric * CASE
+                    WHEN jsonb_typeof(e.payload_json -> 'amount') = 'number'
+                        THEN (e.payload_json ->> 'amount')::numeric
+                    ELSE 1
+                END
+            END,
+            payload_json = (e.payload_json - array_remove(ARRAY[{moved}], NULL)) || CASE
+                WHEN p.aliases = '{{}}'::jsonb THEN '{{}}'::jsonb
+                ELSE jsonb_build_object('{_ALIASES_KEY}', p.aliases)
+            END
+        FROM p
+        WHERE e.id = p.id AND e.ts = p.ts
+        """
+    )
+
+    op.create_index(
+        "ix_events_stream_id_username_ts",
+        "events",
+        ["stream_id", "username", "ts"],
+        postgresql_where=sa.text("username IS NOT NULL"),
+    )
+    op.create_index(
+        "ix_events_stream_id_gift_value",
+        "events",
+        ["stream_id", "gift_value"],
+        postgresql_where=sa.text("gift_value IS NOT NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_events_stream_id_gift_value", table_name="events")
+    op.drop_index("ix_events_stream_id_username_ts", table_name="events")
+
+    for column, keys, _ in _COLUMNS:
+        op.execute(
+            f"""
+            UPDATE events SET payload_json = payload_json || jsonb_build_object(
+                COALESCE(payload_json -> '{_ALIASES_KEY}' ->> '{column}', '{keys[0]}'), {column}
+            )
+            WHERE {column} IS NOT NULL
+            """
+        )
+    op.execute(
+        f"UPDATE events SET payload_json = payload_json - '{_ALIASES_KEY}' "
+        f"WHERE payload_json ? '{_ALIASES_KEY}'"
+    )
+
+    op.drop_column("events", "gift_value")
+    op.drop_column("events", "gift_name")
+    op.drop_column("events", "message")
+    op.drop_column("events", "username")
@@ -0,0 +1,25 @@
+"""Record when a stream's events were moved to the cold archive.
+
+Revision ID: 202409240010
+Revises: 202409240009
+Create Date: 2025-09-24 10:00:00
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "202409240010"
+down_revision = "202409240009"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("streams", sa.Column("archived_at", sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("streams", "archived_at")
@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import hashlib
+from typing import Dict, Optional
+
+from fastapi import Request, Response, status
+
+from app.services.versions import CollectionVersion
+
+
+def collection_etag(namespace: str, user_id: int, version: CollectionVersion, variant: str = "") -> str:
+    """Weak ETag for one representation (``variant``) of a versioned collection."""
+
+    digest = hashlib.blake2b(variant.encode(), digest_size=6).hexdigest()
+    return f'W/"{namespace}-{user_id}-{version.number}-{digest}"'
+
+
+def validator_headers(etag: str) -> Dict[str, str]:
+    # No Last-Modified: HTTP dates have one-second resolution, so a client
+    # revalidating with If-Modified-Since would miss a second write within the
+    # same second. The ETag changes with every version.
+    return {"ETag": etag, "Cache-Control": "no-cache"}
+
+
+def _matches_etag(header: str, etag: str) -> bool:
+    candidates = {candidate.strip() for candidate in header.split(",")}
+    if "*" in candidates:
+        return True
+    # Weak comparison: W/"x" and "x" are equivalent for GET revalidation.
+    opaque = etag.removeprefix("W/")
+    return any(candidate.removeprefix("W/") == opaque for candidate in candidates)
+
+
+def not_modified_response(request: Request, etag: str) -> Optional[Response]:
+    """Return a ``304 Not Modified`` response if the client's copy is still current.
+
+    Only ``If-None-Match`` is honoured; ``If-Modified-Since`` is ignored.
+    """
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is None or not _matches_etag(if_none_match, etag):
+        return None
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=validator_headers(etag))
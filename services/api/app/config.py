@@ -1,3 +1,5 @@
+from typing import List, Literal
+
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -8,10 +10,89 @@ class Settings(BaseSettings):
         default="postgresql+asyncpg://postgres:postgres@db:5432/postgres",
         env="DATABASE_URL",
     )
+    database_replica_urls: List[str] = Field(default=[], env="DATABASE_REPLICA_URLS")
+    db_schema_mode: Literal["check", "create_all", "skip"] = Field(
+        default="check", env="DB_SCHEMA_MODE"
+    )
+    db_pool_prewarm_connections: int = Field(default=5, env="DB_POOL_PREWARM_CONNECTIONS")
+    db_pool_size: int = Field(default=5, env="DB_POOL_SIZE")
+    db_max_overflow: int = Field(default=10, env="DB_MAX_OVERFLOW")
+    db_pool_timeout_seconds: float = Field(default=30.0, env="DB_POOL_TIMEOUT_SECONDS")
+    db_pool_recycle_seconds: int = Field(default=-1, env="DB_POOL_RECYCLE_SECONDS")
+    db_pool_pre_ping: bool = Field(default=False, env="DB_POOL_PRE_PING")
+    replica_health_check_seconds: float = Field(default=5.0, env="REPLICA_HEALTH_CHECK_SECONDS")
+    replica_max_lag_seconds: float = Field(default=5.0, env="REPLICA_MAX_LAG_SECONDS")
+    read_your_writes_seconds: float = Field(default=10.0, env="READ_YOUR_WRITES_SECONDS")
     jwt_secret: str = Field(default="super-secret-key", env="JWT_SECRET")
     jwt_algorithm: str = Field(default="HS256", env="JWT_ALGORITHM")
     jwt_expiry_seconds: int = Field(default=3600, env="JWT_EXPIRY_SECONDS")
+    jwt_cache_max_entries: int = Field(default=10000, env="JWT_CACHE_MAX_ENTRIES")
+    admin_token: str = Field(default="", env="ADMIN_TOKEN")
     redis_url: str = Field(default="redis://localhost:6379/0", env="REDIS_URL")
+    rule_cache_ttl_seconds: float = Field(default=300.0, env="RULE_CACHE_TTL_SECONDS")
+    rule_limiter_backend: Literal["memory", "redis"] = Field(
+        default="memory", env="RULE_LIMITER_BACKEND"
+    )
+    rule_stream_max_per_minute: float = Field(default=0.0, env="RULE_STREAM_MAX_PER_MINUTE")
+    rule_stream_burst: int = Field(default=1, env="RULE_STREAM_BURST")
+    ingest_max_in_flight: int = Field(default=64, env="INGEST_MAX_IN_FLIGHT")
+    ingest_queue_size_high: int = Field(default=1000, env="INGEST_QUEUE_SIZE_HIGH")
+    ingest_queue_size_normal: int = Field(default=200, env="INGEST_QUEUE_SIZE_NORMAL")
+    ingest_max_wait_ms: float = Field(default=2000.0, env="INGEST_MAX_WAIT_MS")
+    ingest_high_priority_types: List[str] = Field(
+        default=["gift", "purchase", "order"], env="INGEST_HIGH_PRIORITY_TYPES"
+    )
+    shard_nodes: List[str] = Field(default=[], env="SHARD_NODES")
+    shard_self: str = Field(default="", env="SHARD_SELF")
+    shard_vnodes: int = Field(default=128, env="SHARD_VNODES")
+    shard_forward_timeout_seconds: float = Field(default=2.0, env="SHARD_FORWARD_TIMEOUT_SECONDS")
+    chat_dedup_enabled: bool = Field(default=True, env="CHAT_DEDUP_ENABLED")
+    chat_dedup_window_seconds: float = Field(default=10.0, env="CHAT_DEDUP_WINDOW_SECONDS")
+    chat_dedup_max_windows: int = Field(default=100000, env="CHAT_DEDUP_MAX_WINDOWS")
+    chat_user_max_per_minute: float = Field(default=20.0, env="CHAT_USER_MAX_PER_MINUTE")
+    chat_user_burst: int = Field(default=5, env="CHAT_USER_BURST")
+    event_buffer_enabled: bool = Field(default=False, env="EVENT_BUFFER_ENABLED")
+    event_buffer_durability: Literal["flush", "enqueue"] = Field(
+        default="flush", env="EVENT_BUFFER_DURABILITY"
+    )
+    event_buffer_max_batch: int = Field(default=500, env="EVENT_BUFFER_MAX_BATCH")
+    event_buffer_max_delay_ms: int = Field(default=20, env="EVENT_BUFFER_MAX_DELAY_MS")
+    event_buffer_max_pending: int = Field(default=10000, env="EVENT_BUFFER_MAX_PENDING")
+    event_partition_maintenance_enabled: bool = Field(
+        default=True, env="EVENT_PARTITION_MAINTENANCE_ENABLED"
+    )
+    event_partition_interval_seconds: float = Field(
+        default=3600.0, env="EVENT_PARTITION_INTERVAL_SECONDS"
+    )
+    event_partition_days_ahead: int = Field(default=7, env="EVENT_PARTITION_DAYS_AHEAD")
+    event_partition_lock_timeout_ms: int = Field(default=1000, env="EVENT_PARTITION_LOCK_TIMEOUT_MS")
+    event_retention_days: int = Field(default=30, env="EVENT_RETENTION_DAYS")
+    event_archive_enabled: bool = Field(default=False, env="EVENT_ARCHIVE_ENABLED")
+    event_archive_backend: Literal["local", "http"] = Field(default="local", env="EVENT_ARCHIVE_BACKEND")
+    event_archive_dir: str = Field(default="./archive", env="EVENT_ARCHIVE_DIR")
+    event_archive_url: str = Field(default="", env="EVENT_ARCHIVE_URL")
+    event_archive_cache_dir: str = Field(default="./archive-cache", env="EVENT_ARCHIVE_CACHE_DIR")
+    event_archive_after_hours: float = Field(default=24.0, env="EVENT_ARCHIVE_AFTER_HOURS")
+    event_archive_interval_seconds: float = Field(default=3600.0, env="EVENT_ARCHIVE_INTERVAL_SECONDS")
+    event_archive_segment_rows: int = Field(default=65536, env="EVENT_ARCHIVE_SEGMENT_ROWS")
+    stream_stats_window_seconds: int = Field(default=60, env="STREAM_STATS_WINDOW_SECONDS")
+    stream_stats_checkpoint_seconds: float = Field(
+        default=5.0, env="STREAM_STATS_CHECKPOINT_SECONDS"
+    )
+    broadcast_backend: Literal["http", "redis"] = Field(default="http", env="BROADCAST_BACKEND")
+    gateway_broadcast_urls: List[str] = Field(
+        default=["http://gateway:3000/broadcast", "http://localhost:3000/broadcast"],
+        env="GATEWAY_BROADCAST_URLS",
+    )
+    broadcast_queue_size: int = Field(default=10000, env="BROADCAST_QUEUE_SIZE")
+    broadcast_batch_size: int = Field(default=50, env="BROADCAST_BATCH_SIZE")
+    broadcast_action_fan_out: int = Field(default=4, env="BROADCAST_ACTION_FAN_OUT")
+    broadcast_timeout_seconds: float = Field(default=2.0, env="BROADCAST_TIMEOUT_SECONDS")
+    broadcast_failure_threshold: int = Field(default=3, env="BROADCAST_FAILURE_THRESHOLD")
+    broadcast_cooldown_seconds: float = Field(default=10.0, env="BROADCAST_COOLDOWN_SECONDS")
+    loop_monitor_enabled: bool = Field(default=True, env="LOOP_MONITOR_ENABLED")
+    loop_monitor_interval_ms: float = Field(default=50.0, env="LOOP_MONITOR_INTERVAL_MS")
+    loop_stall_threshold_ms: float = Field(default=100.0, env="LOOP_STALL_THRESHOLD_MS")
 
     model_config = SettingsConfigDict(env_file=".env", case_sensitive=False)
 
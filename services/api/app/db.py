@@ -1,11 +1,39 @@
-from typing import AsyncGenerator
+import asyncio
+import logging
+import re
+import time
+from contextlib import AsyncExitStack
+from pathlib import Path
+from typing import AsyncGenerator, Callable, Dict, Optional, Set, Tuple
 
-from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import Request
+from sqlalchemy import text
+from sqlalchemy.exc import ProgrammingError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
+from .config import settings
 from .models.base import Base, get_engine, get_sessionmaker
+from .replicas import get_replica_router
+from .services.versions import get_version_registry
 
 async_session_maker = get_sessionmaker()
 
+# Clients send this header (any non-empty value) to read from the primary.
+READ_YOUR_WRITES_HEADER = "X-Read-Your-Writes"
+
+_MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / "alembic" / "versions"
+# Matches ``revision = "..."`` and ``down_revision = None | "..." | ("...", ...)``.
+_REVISION_ASSIGNMENT = re.compile(
+    r"\b(revision|down_revision)\b[^=]*?=\s*(None|\([^)]*\)|[\"'][^\"']*[\"'])"
+)
+_QUOTED = re.compile(r"[\"']([^\"']+)[\"']")
+
+_logger = logging.getLogger(__name__)
+
+
+class SchemaRevisionError(RuntimeError):
+    """The database schema is missing or older than the migrations of this build."""
+
 
 async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
     """FastAPI dependency that provides an async database session."""
@@ -14,10 +42,127 @@ async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
         yield session
 
 
+async def read_session_maker(
+    request: Request,
+    *namespaces: str,
+    user_id: Optional[int] = None,
+) -> async_sessionmaker[AsyncSession]:
+    """Pick the session factory for a read-only request.
+
+    Reads go to a healthy replica unless the client asks for the primary with
+    :data:`READ_YOUR_WRITES_HEADER`, or one of the user's ``namespaces`` was
+    written within ``READ_YOUR_WRITES_SECONDS`` and a replica may not have it yet.
+    """
+
+    router = get_replica_router()
+    if not router.has_replicas or request.headers.get(READ_YOUR_WRITES_HEADER):
+        return async_session_maker
+    if user_id is not None:
+        versions = get_version_registry()
+        for namespace in namespaces:
+            version = await versions.current(namespace, user_id)
+            if time.time() - version.modified_at < settings.read_your_writes_seconds:
+                return async_session_maker
+    return router.pick() or async_session_maker
+
+
+def read_session(
+    *namespaces: str,
+    user_id: Optional[int] = None,
+) -> Callable[[Request], AsyncGenerator[AsyncSession, None]]:
+    """FastAPI dependency factory for read-only sessions, see :func:`read_session_maker`."""
+
+    async def dependency(request: Request) -> AsyncGenerator[AsyncSession, None]:
+        session_maker = await read_session_maker(request, *namespaces, user_id=user_id)
+        async with session_maker() as session:
+            yield session
+
+    return dependency
+
+
+def migration_revisions(directory: Path = _MIGRATIONS_DIR) -> Dict[str, Tuple[str, ...]]:
+    """Map each Alembic revision in ``directory`` to its parent revisions.
+
+    The identifiers are read from the source, so neither Alembic nor the
+    migration modules are imported on the startup path.
+    """
+
+    revisions: Dict[str, Tuple[str, ...]] = {}
+    for path in sorted(directory.glob("*.py")):
+        found: Dict[str, str] = {}
+        for name, value in _REVISION_ASSIGNMENT.findall(path.read_text(encoding="utf-8")):
+            found.setdefault(name, value)
+        if "revision" in found:
+            revision = _QUOTED.findall(found["revision"])[0]
+            revisions[revision] = tuple(_QUOTED.findall(found.get("down_revision", "None")))
+    return revisions
+
+
+def migration_heads(revisions: Dict[str, Tuple[str, ...]]) -> Set[str]:
+    parents = {parent for down in revisions.values() for parent in down}
+    return set(revisions) - parents
+
+
+async def check_schema_revision() -> None:
+    """Compare the database's Alembic revision with this build's head in one query.
+
+    Raises :class:`SchemaRevisionError` if the schema is missing or behind. A
+    revision this build does not know is assumed to come from a newer deploy
+    and only logged, so older workers keep serving during a rolling upgrade.
+    """
+
+    revisions = migration_revisions()
+    heads = migration_heads(revisions)
+    try:
+        async with get_engine().connect() as conn:
+            applied = set((await conn.execute(text("SELECT version_num FROM alembic_version"))).scalars())
+    except ProgrammingError as exc:
+        raise SchemaRevisionError("Database has no alembic_version table; run `alembic upgrade head`") from exc
+
+    if applied == heads:
+        return
+    unknown = applied - set(revisions)
+    if unknown:
+        _logger.warning(
+            "Database is at revision %s, newer than this build's head %s",
+            ", ".join(sorted(unknown)),
+            ", ".join(sorted(heads)),
+        )
+        return
+    raise SchemaRevisionError(
+        f"Database is at revision {', '.join(sorted(applied)) or '<none>'}, "
+        f"expected {', '.join(sorted(heads))}; run `alembic upgrade head`"
+    )
+
+
+async def prewarm_pool(connections: int) -> None:
+    """Open up to ``connections`` pooled connections so first requests skip connecting."""
+
+    count = min(connections, settings.db_pool_size)
+    if count <= 0:
+        return
+    engine = get_engine()
+    try:
+        async with AsyncExitStack() as stack:
+            await asyncio.gather(
+                *(stack.enter_async_context(engine.connect()) for _ in range(count))
+            )
+    except Exception as exc:  # noqa: BLE001 - connections are opened on demand instead
+        _logger.warning("Unable to pre-warm the database pool: %s", exc)
+
+
 async def init_db() -> None:
-    """Initialise database structures if they do not yet exist."""
+    """Prepare the database connection for serving according to ``DB_SCHEMA_MODE``.
+
+    ``check`` verifies the Alembic revision, ``create_all`` creates missing
+    tables from the models (local development only), ``skip`` does neither.
+    """
 
-    from . import models  # noqa: F401  Ensures model metadata is registered
+    if settings.db_schema_mode == "create_all":
+        from . import models  # noqa: F401  Ensures model metadata is registered
 
-    async with get_engine().begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+        async with get_engine().begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+    elif settings.db_schema_mode == "check":
+        await check_schema_revision()
+    await prewarm_pool(settings.db_pool_prewarm_connections)
@@ -1,38 +1,93 @@
 from http import HTTPStatus
 
-from fastapi import Depends, FastAPI, HTTPException
+from fastapi import Depends, FastAPI, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from . import auth, db
+from . import auth, db, metrics
 from .config import settings
-from .routers import events, products, rules
+from .redis_client import close_redis
+from .replicas import get_replica_router
+from .routers import debug, events, products, rules, streams
 from .schemas import (
     HealthResponse,
     TokenResponse,
     UserLoginRequest,
     UserRegisterRequest,
 )
+from .services.broadcaster import get_broadcaster
+from .services.chat_dedup import get_chat_deduper
+from .services.diagnostics import get_loop_monitor
+from .services.event_archive import close_segment_store, get_event_archiver
+from .services.event_partitions import get_partition_maintenance
+from .services.event_writer import get_event_writer
+from .services.sharding import get_shard_router
+from .services.stream_stats import get_stream_stats
+from .services.versions import get_version_registry
 
 app = FastAPI(title=settings.app_name)
 
+app.add_middleware(metrics.MetricsMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor"],
 )
 
 app.include_router(products.router, prefix="/products", tags=["products"])
 app.include_router(events.router, tags=["events"])
 app.include_router(rules.router, tags=["rules"])
+app.include_router(streams.router, tags=["streams"])
+app.include_router(debug.router, tags=["debug"])
 
 
 @app.on_event("startup")
 async def on_startup() -> None:
-    # Ensure database structures exist before the application starts accepting traffic
+    if settings.loop_monitor_enabled:
+        # Started first so that stalls during the rest of startup are recorded too
+        await get_loop_monitor().start()
+    # Refuse traffic until the schema matches this build, and open pool connections up front
     await db.init_db()
+    # Subscribe to collection version bumps so cached rule sets are dropped across workers
+    await get_version_registry().start()
+    await get_replica_router().start()
+    if settings.event_buffer_enabled:
+        await get_event_writer().start()
+    await get_broadcaster().start()
+    if settings.chat_dedup_enabled:
+        await get_chat_deduper().start(events.emit_chat_repeats)
+    await get_stream_stats().start()
+    if settings.event_partition_maintenance_enabled:
+        await get_partition_maintenance().start()
+    if settings.event_archive_enabled:
+        await get_event_archiver().start()
+
+
+@app.on_event("shutdown")
+async def on_shutdown() -> None:
+    if settings.event_archive_enabled:
+        await get_event_archiver().stop()
+    if settings.event_partition_maintenance_enabled:
+        await get_partition_maintenance().stop()
+    if settings.chat_dedup_enabled:
+        # Emit the summaries of open dedup windows while events can still be written
+        await get_chat_deduper().stop()
+    if settings.event_buffer_enabled:
+        # Flush buffered events before the worker exits
+        await get_event_writer().stop()
+    await get_broadcaster().stop()
+    await get_shard_router().close()
+    await close_segment_store()
+    await get_stream_stats().stop()
+    await get_replica_router().stop()
+    await get_version_registry().stop()
+    await close_redis()
+    if settings.loop_monitor_enabled:
+        await get_loop_monitor().stop()
 
 
 @app.get("/health", response_model=HealthResponse)
@@ -40,6 +95,11 @@ async def health() -> HealthResponse:
     return HealthResponse(status="ok")
 
 
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics() -> Response:
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
 @app.post(
     "/users/register",
     response_model=TokenResponse,
@@ -38,6 +38,8 @@ class Stream(Base):
     platform: Mapped[str] = mapped_column(String(120), nullable=False)
     start_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
     end_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    # Set once the stream's events have moved to archive segments (app.services.event_archive).
+    archived_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
     title: Mapped[str] = mapped_column(String(255), nullable=False)
 
     user: Mapped["User"] = relationship(back_populates="streams")
@@ -48,6 +50,7 @@ class Stream(Base):
 
 from .product import Product  # noqa: E402,F401
 from .event import Event  # noqa: E402,F401
+from .event_rollup import EventRollup  # noqa: E402,F401
 from .rule import Rule  # noqa: E402,F401
 
-__all__ = ["Base", "Product", "User", "Stream", "Event", "Rule"]
+__all__ = ["Base", "Product", "User", "Stream", "Event", "EventRollup", "Rule"]
@@ -1,25 +1,58 @@
+import time
 from typing import AsyncGenerator, Optional
 
 from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from app.config import settings
+from app.metrics import DB_POOL_CHECKED_OUT, DB_POOL_CHECKOUT_SECONDS, DB_POOL_OVERFLOW
 
 
 class Base(DeclarativeBase):
     """Base declarative class for the application's ORM models."""
 
 
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """The default async pool, recording how long each checkout waits."""
+
+    def _do_get(self):  # type: ignore[no-untyped-def]
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT_SECONDS.observe(time.perf_counter() - started)
+
+
 _engine: Optional[AsyncEngine] = None
 _session_factory: Optional[async_sessionmaker[AsyncSession]] = None
 
 
+def build_engine(url: str) -> AsyncEngine:
+    """Create an async engine for ``url`` with the configured pool sizing."""
+
+    return create_async_engine(
+        url,
+        echo=False,
+        future=True,
+        poolclass=TimedQueuePool,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout_seconds,
+        pool_recycle=settings.db_pool_recycle_seconds,
+        pool_pre_ping=settings.db_pool_pre_ping,
+    )
+
+
 def get_engine() -> AsyncEngine:
     """Create (or return an existing) async engine bound to the configured database URL."""
 
     global _engine
     if _engine is None:
-        _engine = create_async_engine(settings.database_url, echo=False, future=True)
+        _engine = build_engine(settings.database_url)
+        pool = _engine.pool
+        DB_POOL_CHECKED_OUT.set_function(pool.checkedout)
+        DB_POOL_OVERFLOW.set_function(lambda: max(pool.overflow(), 0))
     return _engine
 
 
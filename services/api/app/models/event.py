@@ -1,9 +1,10 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Any, Dict, TYPE_CHECKING
+from decimal import Decimal
+from typing import Any, Dict, Optional, TYPE_CHECKING
 
-from sqlalchemy import DateTime, ForeignKey, Integer, String, func
+from sqlalchemy import DDL, BigInteger, DateTime, ForeignKey, Index, Numeric, String, Text, event, func, text
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -12,20 +13,86 @@ from .base import Base
 if TYPE_CHECKING:
     from . import Stream
 
+# Creates (idempotently) the daily partition holding ``day``. Rows that already
+# landed in the default partition for that day are moved into the new one, so
+# creating a partition late never fails on the default partition constraint.
+CREATE_PARTITION_FUNCTION = """
+CREATE OR REPLACE FUNCTION create_events_partition(day date) RETURNS text AS $$
+DECLARE
+    part text := format('events_p%s', to_char(day, 'YYYYMMDD'));
+    lower_bound timestamptz := day::timestamp AT TIME ZONE 'UTC';
+    upper_bound timestamptz := (day + 1)::timestamp AT TIME ZONE 'UTC';
+BEGIN
+    IF to_regclass(part) IS NOT NULL THEN
+        RETURN part;
+    END IF;
+    EXECUTE format(
+        'CREATE TABLE %I (LIKE events INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', part
+    );
+    EXECUTE format(
+        'WITH moved AS (DELETE FROM events_default WHERE ts >= %L AND ts < %L RETURNING *) '
+        'INSERT INTO %I SELECT * FROM moved',
+        lower_bound, upper_bound, part
+    );
+    EXECUTE format(
+        'ALTER TABLE events ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+        part, lower_bound, upper_bound
+    );
+    RETURN part;
+END;
+$$ LANGUAGE plpgsql
+"""
+
 
 class Event(Base):
     __tablename__ = "events"
+    __table_args__ = (
+        Index("ix_events_stream_id_ts_id", "stream_id", "ts", "id"),
+        Index("ix_events_ts_brin", "ts", postgresql_using="brin"),
+        Index(
+            "ix_events_stream_id_username_ts",
+            "stream_id",
+            "username",
+            "ts",
+            postgresql_where=text("username IS NOT NULL"),
+        ),
+        Index(
+            "ix_events_stream_id_gift_value",
+            "stream_id",
+            "gift_value",
+            postgresql_where=text("gift_value IS NOT NULL"),
+        ),
+        {"postgresql_partition_by": "RANGE (ts)"},
+    )
 
-    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
     stream_id: Mapped[int] = mapped_column(
         ForeignKey("streams.id", ondelete="CASCADE"),
         nullable=False,
         default=1,
     )
     type: Mapped[str] = mapped_column(String(120), nullable=False)
+    # What is left of the adapter payload once the hot fields below have been
+    # promoted; see app.services.event_columns for the encoding.
     payload_json: Mapped[Dict[str, Any]] = mapped_column(JSONB, nullable=False)
+    username: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    message: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    gift_name: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    gift_value: Mapped[Optional[Decimal]] = mapped_column(Numeric(18, 2), nullable=True)
+    # Partition key: part of the primary key because Postgres requires unique
+    # constraints on a partitioned table to include it.
     ts: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True), server_default=func.now(), nullable=False
+        DateTime(timezone=True), primary_key=True, server_default=func.now(), nullable=False
     )
 
     stream: Mapped["Stream"] = relationship(back_populates="events")
+
+
+# DDL() applies ``statement % context`` when compiling, so the format()
+# placeholders in the plpgsql body must be escaped.
+event.listen(Event.__table__, "after_create", DDL(CREATE_PARTITION_FUNCTION.replace("%", "%%")))
+event.listen(
+    Event.__table__,
+    "after_create",
+    DDL("CREATE TABLE IF NOT EXISTS events_default PARTITION OF events DEFAULT"),
+)
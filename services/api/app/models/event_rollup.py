@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import BigInteger, DateTime, ForeignKey, Numeric, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+
+class EventRollup(Base):
+    """Per-stream, per-minute event aggregates kept after raw partitions are dropped."""
+
+    __tablename__ = "event_rollups"
+
+    stream_id: Mapped[int] = mapped_column(
+        ForeignKey("streams.id", ondelete="CASCADE"), primary_key=True
+    )
+    minute: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True)
+    type: Mapped[str] = mapped_column(String(120), primary_key=True)
+    event_count: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    gift_value: Mapped[float] = mapped_column(Numeric(18, 2), nullable=False, default=0)
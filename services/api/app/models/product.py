@@ -1,7 +1,6 @@
-from sqlalchemy import Column, ForeignKey, Integer, String, Text
+from sqlalchemy import DDL, Column, ForeignKey, Index, Integer, String, Text, event, func, text
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
 from sqlalchemy.types import DateTime
 
 from .base import Base
@@ -9,6 +8,28 @@ from .base import Base
 
 class Product(Base):
     __tablename__ = "products"
+    __table_args__ = (
+        Index("ix_products_user_id_created_at_id", "user_id", "created_at", "id"),
+        # Natural key used by bulk import upserts.
+        Index("uq_products_user_id_url", "user_id", "url", unique=True),
+        Index(
+            "ix_products_title_trgm",
+            "title",
+            postgresql_using="gin",
+            postgresql_ops={"title": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_products_title_fts",
+            func.to_tsvector(text("'simple'::regconfig"), text("title")),
+            postgresql_using="gin",
+        ),
+        Index(
+            "ix_products_tags",
+            "tags",
+            postgresql_using="gin",
+            postgresql_ops={"tags": "jsonb_path_ops"},
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True, default=1)
@@ -21,3 +42,7 @@ class Product(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
     user = relationship("User", back_populates="products")
+
+
+# The trigram index needs pg_trgm; create it when the table is created outside Alembic.
+event.listen(Product.__table__, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
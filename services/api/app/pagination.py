@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+import base64
+import json
+from datetime import datetime
+from typing import Tuple
+
+
+def encode_cursor(position: datetime, row_id: int) -> str:
+    """Encode a keyset position (timestamp, id) as an opaque URL-safe cursor."""
+
+    raw = json.dumps([position.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decode a cursor produced by :func:`encode_cursor`; raises ``ValueError`` if invalid."""
+
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        position, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(position), int(row_id)
+    except (TypeError, ValueError) as exc:
+        raise ValueError("Invalid pagination cursor") from exc
@@ -0,0 +1,30 @@
+from typing import Optional
+
+from redis.asyncio import Redis
+
+from .config import settings
+
+_client: Optional[Redis] = None
+
+
+def get_redis() -> Redis:
+    """Create (or return an existing) pooled async Redis client for the configured URL."""
+
+    global _client
+    if _client is None:
+        _client = Redis.from_url(
+            settings.redis_url,
+            decode_responses=True,
+            socket_connect_timeout=2.0,
+            health_check_interval=30,
+        )
+    return _client
+
+
+async def close_redis() -> None:
+    """Close the shared Redis client and release its connection pool."""
+
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
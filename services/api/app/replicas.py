@@ -0,0 +1,162 @@
+"""Routing of read-only sessions to PostgreSQL read replicas.
+
+Replicas from ``DATABASE_REPLICA_URLS`` are used round-robin while they pass
+a periodic health check: the check query must succeed within a short timeout
+and report replication lag below ``REPLICA_MAX_LAG_SECONDS``. Without healthy
+replicas, reads fall back to the primary.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+from app.config import settings
+from app.models.base import build_engine
+
+_CHECK_TIMEOUT_SECONDS = 2.0
+# Zero on a primary, or on a replica that has replayed everything it has received;
+# otherwise the age of the last replayed transaction.
+_LAG_QUERY = text(
+    """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+    """
+)
+
+_logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Replica:
+    url: str
+    engine: AsyncEngine
+    session_factory: async_sessionmaker[AsyncSession]
+    healthy: bool = False
+    lag_seconds: Optional[float] = None
+    last_error: Optional[str] = field(default=None)
+
+
+class ReplicaRouter:
+    """Round-robin over the healthy replicas, checked in the background."""
+
+    def __init__(
+        self,
+        engines: Sequence[AsyncEngine],
+        *,
+        check_interval_seconds: float,
+        max_lag_seconds: float,
+    ) -> None:
+        self._replicas = [
+            Replica(
+                url=engine.url.render_as_string(hide_password=True),
+                engine=engine,
+                session_factory=async_sessionmaker(
+                    bind=engine, expire_on_commit=False, class_=AsyncSession
+                ),
+            )
+            for engine in engines
+        ]
+        self._check_interval_seconds = check_interval_seconds
+        self._max_lag_seconds = max_lag_seconds
+        self._cycle = itertools.cycle(self._replicas)
+        self._task: Optional[asyncio.Task[None]] = None
+
+    @property
+    def has_replicas(self) -> bool:
+        return bool(self._replicas)
+
+    def pick(self) -> Optional[async_sessionmaker[AsyncSession]]:
+        """Return the next healthy replica's session factory, or ``None``."""
+
+        for _ in range(len(self._replicas)):
+            replica = next(self._cycle)
+            if replica.healthy:
+                return replica.session_factory
+        return None
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [
+            {
+                "url": replica.url,
+                "healthy": replica.healthy,
+                "lag_seconds": replica.lag_seconds,
+                "last_error": replica.last_error,
+            }
+            for replica in self._replicas
+        ]
+
+    async def check(self) -> None:
+        await asyncio.gather(*(self._check(replica) for replica in self._replicas))
+
+    async def start(self) -> None:
+        if self._replicas and self._task is None:
+            # Check once before serving so healthy replicas are used from the first request.
+            await self.check()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for replica in self._replicas:
+            await replica.engine.dispose()
+
+    async def _check(self, replica: Replica) -> None:
+        async def measure_lag() -> Any:
+            async with replica.engine.connect() as conn:
+                return await conn.scalar(_LAG_QUERY)
+
+        try:
+            lag = await asyncio.wait_for(measure_lag(), _CHECK_TIMEOUT_SECONDS)
+        except Exception as exc:  # noqa: BLE001 - any failure takes the replica out of rotation
+            if replica.healthy:
+                _logger.warning("Read replica %s is unavailable: %s", replica.url, exc)
+            replica.healthy = False
+            replica.last_error = str(exc)
+            return
+
+        replica.lag_seconds = float(lag)
+        replica.last_error = None
+        healthy = replica.lag_seconds <= self._max_lag_seconds
+        if healthy != replica.healthy:
+            _logger.info(
+                "Read replica %s is %s (lag %.1fs)",
+                replica.url,
+                "healthy" if healthy else "lagging",
+                replica.lag_seconds,
+            )
+        replica.healthy = healthy
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self._check_interval_seconds)
+            await self.check()
+
+
+_router: Optional[ReplicaRouter] = None
+
+
+def get_replica_router() -> ReplicaRouter:
+    """Return the process-wide read replica router."""
+
+    global _router
+    if _router is None:
+        _router = ReplicaRouter(
+            [build_engine(url) for url in settings.database_replica_urls],
+            check_interval_seconds=settings.replica_health_check_seconds,
+            max_lag_seconds=settings.replica_max_lag_seconds,
+        )
+    return _router
@@ -1 +1 @@
-__all__ = ["products", "events", "rules"]
+__all__ = ["products", "events", "rules", "streams", "debug"]
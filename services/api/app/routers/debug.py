@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
+
+from app.auth import require_admin
+from app.config import settings
+from app.replicas import get_replica_router
+from app.services.sharding import FORWARDED_HEADER, get_shard_router
+from app.services.diagnostics import format_collapsed, get_loop_monitor
+
+router = APIRouter(prefix="/debug", dependencies=[Depends(require_admin)])
+
+
+@router.get("/loop-stalls", response_model=List[Dict[str, Any]])
+async def loop_stalls() -> List[Dict[str, Any]]:
+    """Most recent event loop stalls, newest last, with the stack that blocked the loop."""
+
+    return get_loop_monitor().stalls()
+
+
+@router.get("/profile", response_class=PlainTextResponse)
+async def profile(
+    seconds: float = Query(default=5.0, gt=0, le=60),
+    interval_ms: float = Query(default=5.0, ge=1, le=1000),
+) -> PlainTextResponse:
+    """Sample the worker's event loop and return collapsed stacks for flame graphs."""
+
+    try:
+        samples = await get_loop_monitor().profile(seconds, interval_ms / 1000)
+    except RuntimeError as exc:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc)) from exc
+    return PlainTextResponse(format_collapsed(samples))
+
+
+@router.get("/replicas", response_model=List[Dict[str, Any]])
+async def replicas() -> List[Dict[str, Any]]:
+    """Health and replication lag of the configured read replicas."""
+
+    return get_replica_router().stats()
+
+
+@router.get("/shards", response_model=Dict[str, Any])
+async def shards() -> Dict[str, Any]:
+    """This worker's view of the ingest shard ring."""
+
+    return get_shard_router().stats()
+
+
+@router.put("/shards", response_model=Dict[str, Any])
+async def rebalance_shards(
+    nodes: List[str] = Body(..., embed=True),
+    forwarded_by: Optional[str] = Header(default=None, alias=FORWARDED_HEADER),
+) -> Dict[str, Any]:
+    """Replace the shard ring's nodes on this worker, then on every other node of the new ring.
+
+    ``propagated`` reports the outcome per peer; repeat the call if any failed.
+    """
+
+    shards = get_shard_router()
+    try:
+        shards.set_nodes(nodes)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    stats = shards.stats()
+    if forwarded_by is None:
+        stats["propagated"] = await shards.propagate_nodes(nodes, settings.admin_token)
+    return stats
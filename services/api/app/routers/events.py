@@ -1,85 +1,67 @@
 from __future__ import annotations
 
 import logging
+import time
 from typing import Any, Dict, List, Optional
 
-import httpx
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Header, HTTPException, status
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app import db
-from app.models.event import Event
+from app.config import settings
+from app.metrics import (
+    EVENTS_INGESTED_TOTAL,
+    INGEST_STAGE_SECONDS,
+    RULE_ACTION_SECONDS,
+    RULE_FIRINGS_SUPPRESSED_TOTAL,
+    RULE_HITS_TOTAL,
+)
 from app.models.product import Product
-from app.models.rule import Rule
 from app.schemas.event import EventIngestRequest
-from app.services.rule_engine import apply_rules
+from app.services.admission import AdmissionRejected, event_priority, get_admission_controller
+from app.services.broadcaster import get_broadcaster
+from app.services.chat_dedup import REPEAT_EVENT_TYPE, chat_text, get_chat_deduper
+from app.services.event_writer import EventRow, get_event_writer, insert_events
+from app.services.rate_limiter import get_rule_limiter
+from app.services.rule_cache import get_rule_cache
+from app.services.sharding import FORWARDED_HEADER, get_shard_router
+from app.services.rule_engine import CompiledRule
+from app.services.stream_stats import get_stream_stats
+from app.services.versions import PRODUCTS_NAMESPACE, RULES_NAMESPACE
 
 router = APIRouter(prefix="/events")
 
 _DEFAULT_STREAM_ID = 1
 _DEFAULT_USER_ID = 1
-_GATEWAY_ENDPOINTS = (
-    "http://gateway:3000/broadcast",
-    "http://localhost:3000/broadcast",
-)
 _CHANNEL_BY_TYPE = {
     "chat": "chat.events",
     "gift": "gift.events",
+    REPEAT_EVENT_TYPE: "chat.events",
 }
 
+_DEDUP_SECONDS = INGEST_STAGE_SECONDS.labels("dedup")
+_PERSIST_SECONDS = INGEST_STAGE_SECONDS.labels("persist")
+_RULE_LOOKUP_SECONDS = INGEST_STAGE_SECONDS.labels("rule_lookup")
+_RULE_MATCH_SECONDS = INGEST_STAGE_SECONDS.labels("rule_match")
+_DISPATCH_SECONDS = INGEST_STAGE_SECONDS.labels("dispatch")
+_FORWARD_SECONDS = INGEST_STAGE_SECONDS.labels("forward")
+
+# Rule and product lookups while processing events may be served by a replica.
+_read_session = db.read_session(RULES_NAMESPACE, PRODUCTS_NAMESPACE, user_id=_DEFAULT_USER_ID)
+
 _logger = logging.getLogger(__name__)
 
 
-async def _forward_to_gateway(event_type: str, payload: Dict[str, Any]) -> None:
-    """Forward the event payload to the gateway, trying known endpoints."""
+def _forward_to_gateway(event_type: str, payload: Dict[str, Any], *, concurrent: bool = False) -> None:
+    """Queue the event payload for delivery to the gateway by the background broadcaster."""
 
     channel = _CHANNEL_BY_TYPE.get(event_type, "chat.events")
     message = {"type": event_type, **payload}
+    get_broadcaster().enqueue(channel, message, concurrent=concurrent)
 
-    async with httpx.AsyncClient(timeout=5.0) as client:
-        last_error: Optional[Exception] = None
-        for endpoint in _GATEWAY_ENDPOINTS:
-            try:
-                response = await client.post(
-                    endpoint,
-                    json={"channel": channel, "message": message},
-                )
-                response.raise_for_status()
-                return
-            except httpx.HTTPError as exc:
-                last_error = exc
-                _logger.warning(
-                    "Failed to broadcast event via %s: %s", endpoint, exc, exc_info=False
-                )
-
-        if last_error is not None:
-            _logger.error(
-                "Unable to broadcast event after trying all endpoints: %s", last_error
-            )
-
-
-async def _fetch_active_rules(session: AsyncSession) -> List[Rule]:
-    stmt = select(Rule).where(
-        Rule.user_id == _DEFAULT_USER_ID,
-        Rule.active.is_(True),
-    )
-    result = await session.scalars(stmt)
-    return list(result.all())
-
-
-async def _build_product_payload(
-    product_id: int,
-    session: AsyncSession,
-) -> Optional[Dict[str, Any]]:
-    stmt = select(Product).where(
-        Product.id == product_id,
-        Product.user_id == _DEFAULT_USER_ID,
-    )
-    product = await session.scalar(stmt)
-    if product is None:
-        return None
 
+def _product_payload(product: Product) -> Dict[str, Any]:
     return {
         "id": product.id,
         "title": product.title,
@@ -91,10 +73,44 @@ async def _build_product_payload(
     }
 
 
+async def _load_product_payloads(
+    product_ids: List[int],
+    session: AsyncSession,
+) -> Dict[int, Dict[str, Any]]:
+    """Return the pin payloads of ``product_ids`` found for the user, in one query."""
+
+    if not product_ids:
+        return {}
+    stmt = select(Product).where(
+        Product.id.in_(product_ids),
+        Product.user_id == _DEFAULT_USER_ID,
+    )
+    products = (await session.scalars(stmt)).all()
+    return {product.id: _product_payload(product) for product in products}
+
+
 async def _dispatch_rule_actions(
     actions: List[Dict[str, Any]],
     session: AsyncSession,
 ) -> None:
+    """Queue the broadcasts for ``actions`` in order.
+
+    Every product pinned by the actions is resolved up front in a single
+    query; the broadcasts themselves are delivered by the background
+    broadcaster, so dispatch never waits on the gateway, and are marked
+    concurrent so they fan out after the chat that triggered them.
+    """
+
+    started = time.perf_counter()
+    product_ids = sorted(
+        {
+            action["product_id"]
+            for action in actions
+            if action.get("action") == "pin_product" and isinstance(action.get("product_id"), int)
+        }
+    )
+    products = await _load_product_payloads(product_ids, session)
+
     for action in actions:
         action_type = action.get("action")
         if action_type == "reply":
@@ -102,45 +118,242 @@ async def _dispatch_rule_actions(
             if not text:
                 _logger.debug("reply action skipped due to missing text")
                 continue
-            await _forward_to_gateway("auto_reply", {"text": text})
+            _forward_to_gateway("auto_reply", {"text": text}, concurrent=True)
         elif action_type == "pin_product":
             product_id = action.get("product_id")
             if not isinstance(product_id, int):
                 _logger.debug("pin_product action skipped due to invalid product_id")
                 continue
-            product_payload = await _build_product_payload(product_id, session)
+            product_payload = products.get(product_id)
             if product_payload is None:
                 _logger.warning(
                     "pin_product action skipped; product %s not found", product_id
                 )
                 continue
-            await _forward_to_gateway("pin_product", {"product": product_payload})
+            _forward_to_gateway("pin_product", {"product": product_payload}, concurrent=True)
         else:
             _logger.debug("Unsupported rule action encountered: %s", action_type)
+            continue
+        RULE_ACTION_SECONDS.labels(action_type).observe(time.perf_counter() - started)
+
+
+async def _admit_rule_firings(
+    stream_id: int,
+    matched: List[CompiledRule],
+) -> List[Dict[str, Any]]:
+    """Return the actions of the matched rules that are within their rate limits."""
+
+    limiter = get_rule_limiter()
+    actions = []
+    for rule in matched:
+        RULE_HITS_TOTAL.labels(rule.action).inc()
+        suppressed_by = await limiter.acquire(stream_id, rule.limit_key, rule.limits)
+        if suppressed_by is not None:
+            RULE_FIRINGS_SUPPRESSED_TOTAL.labels(rule.action, suppressed_by).inc()
+            continue
+        actions.append(rule.to_payload())
+    return actions
+
+
+def _event_row(request: EventIngestRequest) -> EventRow:
+    return {
+        "stream_id": request.stream_id or _DEFAULT_STREAM_ID,
+        "type": request.type,
+        "payload_json": dict(request.payload),
+    }
+
+
+async def _persist_events(rows: List[EventRow], session: AsyncSession) -> List[EventRow]:
+    """Store ``rows``; returns those not stored because their stream is archived."""
+
+    with _PERSIST_SECONDS.time():
+        if settings.event_buffer_enabled:
+            return await get_event_writer().write(rows)
+        return await insert_events(session, rows)
+
+
+def _accept_events(rows: List[EventRow]) -> List[EventRow]:
+    """Return the events not collapsed by the dedup stage."""
+
+    if not settings.chat_dedup_enabled:
+        return rows
+    deduper = get_chat_deduper()
+    with _DEDUP_SECONDS.time():
+        return [row for row in rows if deduper.admit(row)]
+
+
+def _record_events(rows: List[EventRow]) -> None:
+    """Count received events, collapsed repeats included, once they are stored.
+
+    Only called after persisting succeeded, so a client retrying a failed
+    batch does not count its events twice.
+    """
+
+    stream_stats = get_stream_stats()
+    for row in rows:
+        event_type = row["type"]
+        # Client-supplied types are folded into "other" to keep the label set bounded.
+        EVENTS_INGESTED_TOTAL.labels(event_type if event_type in _CHANNEL_BY_TYPE else "other").inc()
+        stream_stats.record(row["stream_id"], event_type, row["payload_json"])
+
+
+async def emit_chat_repeats(rows: List[EventRow]) -> None:
+    """Persist and broadcast the ``chat_repeat`` summaries of closed dedup windows."""
+
+    async with db.async_session_maker() as session:
+        archived = {id(row) for row in await _persist_events(rows, session)}
+    for row in rows:
+        if id(row) not in archived:
+            _forward_to_gateway(row["type"], row["payload_json"])
+
+
+async def _process_event(row: EventRow, read_session: AsyncSession) -> None:
+    event_type = row["type"]
+    payload = row["payload_json"]
+
+    with _FORWARD_SECONDS.time():
+        _forward_to_gateway(event_type, payload)
+
+    if event_type == "chat":
+        text = chat_text(payload)
+        if text and text.strip():
+            with _RULE_LOOKUP_SECONDS.time():
+                matcher = await get_rule_cache().get_matcher(_DEFAULT_USER_ID, read_session)
+            with _RULE_MATCH_SECONDS.time():
+                matched = matcher.match_rules(text)
+            if matched:
+                actions = await _admit_rule_firings(row["stream_id"], matched)
+                if not actions:
+                    return
+                with _DISPATCH_SECONDS.time():
+                    await _dispatch_rule_actions(actions, read_session)
+
+
+@router.get("/broadcast/stats", response_model=Dict[str, Any])
+async def broadcast_stats() -> Dict[str, Any]:
+    return get_broadcaster().stats()
+
+
+@router.get("/rules/limits/stats", response_model=Dict[str, int])
+async def rule_limit_stats() -> Dict[str, int]:
+    return get_rule_limiter().stats()
+
+
+@router.get("/admission/stats", response_model=Dict[str, Any])
+async def admission_stats() -> Dict[str, Any]:
+    return get_admission_controller().stats()
+
+
+@router.get("/dedup/stats", response_model=Dict[str, Any])
+async def dedup_stats() -> Dict[str, Any]:
+    return get_chat_deduper().stats()
+
+
+def _positions(received: List[EventRow], rows: List[EventRow]) -> List[int]:
+    row_ids = {id(row) for row in rows}
+    return [index for index, row in enumerate(received) if id(row) in row_ids]
+
+
+def _overloaded(received: List[EventRow], rejected: List[EventRow], retry_after: int, reason: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail={
+            "message": f"Ingest is overloaded ({reason}), retry later",
+            # Positions in the request body; only these need to be sent again.
+            "rejected": _positions(received, rejected),
+        },
+        headers={"Retry-After": str(retry_after)},
+    )
+
+
+def _archived(received: List[EventRow], rejected: List[EventRow]) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail={
+            "message": "Stream is archived and no longer accepts events",
+            # Positions in the request body; retrying them will not help.
+            "rejected": _positions(received, rejected),
+        },
+    )
+
+
+async def _ingest(
+    rows: List[EventRow],
+    session: AsyncSession,
+    read_session: AsyncSession,
+    forwarded_by: Optional[str],
+) -> None:
+    """Process ``rows`` here or on their owning workers.
+
+    Rows accepted anywhere are kept even if others are shed, so a 429 lists
+    the rejected positions and a client must retry only those. Rows of
+    archived streams are refused for good with a 409 listing their positions.
+    """
+
+    received = rows
+    shed: List[EventRow] = []
+    archived: List[EventRow] = []
+    retry_after = 0
+    reason = "owning worker unavailable"
+    shards = get_shard_router()
+    if shards.enabled and forwarded_by is None:
+        rows, remote = shards.split(rows)
+        if remote:
+            undelivered, shed, owner_retry_after, archived = await shards.forward(remote)
+            retry_after = owner_retry_after or 0
+            rows += undelivered
+
+    if rows:
+        priority = event_priority((row["type"] for row in rows), settings.ingest_high_priority_types)
+        try:
+            async with get_admission_controller().admit(priority):
+                accepted = _accept_events(rows)
+                stored = rows
+                if accepted:
+                    try:
+                        skipped = await _persist_events(accepted, session)
+                    except Exception:
+                        # Nothing was stored: undo dedup so the client's retry is not collapsed.
+                        if settings.chat_dedup_enabled:
+                            get_chat_deduper().release(accepted)
+                        raise
+                    if skipped:
+                        if settings.chat_dedup_enabled:
+                            get_chat_deduper().release(skipped)
+                        skipped_ids = {id(row) for row in skipped}
+                        accepted = [row for row in accepted if id(row) not in skipped_ids]
+                        stored = [row for row in rows if id(row) not in skipped_ids]
+                        archived += skipped
+                _record_events(stored)
+                for row in accepted:
+                    await _process_event(row, read_session)
+        except AdmissionRejected as exc:
+            shed += rows
+            retry_after = max(retry_after, exc.retry_after_seconds)
+            reason = exc.reason
+    if shed:
+        raise _overloaded(received, shed, retry_after, reason)
+    if archived:
+        raise _archived(received, archived)
 
 
 @router.post("/ingest", status_code=status.HTTP_204_NO_CONTENT)
 async def ingest_event(
     request: EventIngestRequest,
     session: AsyncSession = Depends(db.get_async_session),
+    read_session: AsyncSession = Depends(_read_session),
+    forwarded_by: Optional[str] = Header(default=None, alias=FORWARDED_HEADER),
 ) -> None:
-    payload = dict(request.payload)
-    event = Event(
-        stream_id=_DEFAULT_STREAM_ID,
-        type=request.type,
-        payload_json=payload,
-    )
-    session.add(event)
-    await session.commit()
-
-    await _forward_to_gateway(request.type, payload)
+    await _ingest([_event_row(request)], session, read_session, forwarded_by)
+    return None
 
-    if request.type == "chat":
-        text = payload.get("text") or payload.get("message")
-        if isinstance(text, str) and text.strip():
-            rules = await _fetch_active_rules(session)
-            actions = apply_rules(text, rules)
-            if actions:
-                await _dispatch_rule_actions(actions, session)
 
+@router.post("/ingest/batch", status_code=status.HTTP_204_NO_CONTENT)
+async def ingest_events_batch(
+    requests: List[EventIngestRequest],
+    session: AsyncSession = Depends(db.get_async_session),
+    read_session: AsyncSession = Depends(_read_session),
+    forwarded_by: Optional[str] = Header(default=None, alias=FORWARDED_HEADER),
+) -> None:
+    await _ingest([_event_row(request) for request in requests], session, read_session, forwarded_by)
     return None
@@ -1,28 +1,127 @@
 from http import HTTPStatus
-from typing import List
+from typing import List, Literal, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy import select
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, tuple_
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app import db
+from app.conditional import collection_etag, not_modified_response, validator_headers
 from app.models.product import Product
-from app.schemas.product import ProductIn, ProductOut
+from app.pagination import decode_cursor, encode_cursor
+from app.schemas.product import (
+    ProductImportReport,
+    ProductIn,
+    ProductOut,
+    ProductSearchHit,
+    ProductSearchPage,
+)
+from app.services.product_io import ProductFormat, export_products, import_products
+from app.services.product_search import build_search_query
+from app.services.versions import PRODUCTS_NAMESPACE, get_version_registry
 
 router = APIRouter()
 
 _DEFAULT_USER_ID = 1
+_MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
 
 
 @router.get("/", response_model=List[ProductOut])
-async def list_products(session: AsyncSession = Depends(db.get_async_session)) -> List[ProductOut]:
+async def list_products(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(default=None, ge=1, le=500),
+    session: AsyncSession = Depends(db.read_session(PRODUCTS_NAMESPACE, user_id=_DEFAULT_USER_ID)),
+) -> List[ProductOut]:
+    version = await get_version_registry().current(PRODUCTS_NAMESPACE, _DEFAULT_USER_ID)
+    etag = collection_etag(PRODUCTS_NAMESPACE, _DEFAULT_USER_ID, version, f"{limit}:{cursor}")
+    cached = not_modified_response(request, etag)
+    if cached is not None:
+        return cached
+
     stmt = (
         select(Product)
         .where(Product.user_id == _DEFAULT_USER_ID)
-        .order_by(Product.created_at.desc())
+        .order_by(Product.created_at.desc(), Product.id.desc())
     )
+    if cursor:
+        try:
+            created_at, product_id = decode_cursor(cursor)
+        except ValueError as exc:
+            raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail=str(exc)) from exc
+        stmt = stmt.where(tuple_(Product.created_at, Product.id) < tuple_(created_at, product_id))
+    if limit is not None:
+        stmt = stmt.limit(limit + 1)
+
     result = await session.scalars(stmt)
-    return list(result.all())
+    products = list(result.all())
+    if limit is not None and len(products) > limit:
+        products = products[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(products[-1].created_at, products[-1].id)
+    response.headers.update(validator_headers(etag))
+    return products
+
+
+@router.get("/search", response_model=ProductSearchPage)
+async def search_products(
+    q: str = "",
+    tags: List[str] = Query(default=[]),
+    limit: int = Query(default=20, ge=1, le=100),
+    offset: int = Query(default=0, ge=0),
+    session: AsyncSession = Depends(db.read_session(PRODUCTS_NAMESPACE, user_id=_DEFAULT_USER_ID)),
+) -> ProductSearchPage:
+    # Accept both ?tags=a&tags=b and ?tags=a,b
+    wanted_tags = [tag.strip() for value in tags for tag in value.split(",") if tag.strip()]
+    stmt = build_search_query(_DEFAULT_USER_ID, q, wanted_tags).limit(limit + 1).offset(offset)
+    rows = (await session.execute(stmt)).all()
+
+    items = [
+        ProductSearchHit.model_validate(
+            {**ProductOut.model_validate(product).model_dump(), "score": score}
+        )
+        for product, score in rows[:limit]
+    ]
+    next_offset = offset + limit if len(rows) > limit else None
+    return ProductSearchPage(items=items, next_offset=next_offset)
+
+
+@router.get("/export")
+async def export_catalog(
+    request: Request,
+    format: Literal["csv", "ndjson"] = "ndjson",
+) -> StreamingResponse:
+    """Stream the whole catalog without loading it into memory."""
+
+    session_maker = await db.read_session_maker(
+        request, PRODUCTS_NAMESPACE, user_id=_DEFAULT_USER_ID
+    )
+
+    async def _body():
+        # The export owns its session for as long as rows are being streamed.
+        async with session_maker() as export_session:
+            async for text in export_products(export_session, _DEFAULT_USER_ID, format):
+                yield text
+
+    return StreamingResponse(
+        _body(),
+        media_type=_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="products.{format}"'},
+    )
+
+
+async def _commit_product(session: AsyncSession) -> None:
+    """Commit a product write, turning a duplicate ``(user_id, url)`` into a 409."""
+
+    try:
+        await session.commit()
+    except IntegrityError as exc:
+        await session.rollback()
+        raise HTTPException(
+            status_code=HTTPStatus.CONFLICT, detail="A product with this URL already exists"
+        ) from exc
 
 
 @router.post("/", response_model=ProductOut, status_code=status.HTTP_201_CREATED)
@@ -40,11 +139,34 @@ async def create_product(
         stock_info=payload.stock_info,
     )
     session.add(product)
-    await session.commit()
+    await _commit_product(session)
     await session.refresh(product)
+    await get_version_registry().bump(PRODUCTS_NAMESPACE, _DEFAULT_USER_ID)
     return product
 
 
+@router.post("/import", response_model=ProductImportReport)
+async def import_catalog(
+    request: Request,
+    format: Optional[Literal["csv", "ndjson"]] = None,
+    session: AsyncSession = Depends(db.get_async_session),
+) -> ProductImportReport:
+    """Upsert products keyed on URL from a streamed CSV or NDJSON body."""
+
+    fmt: ProductFormat = format or (
+        "csv" if request.headers.get("content-type", "").startswith("text/csv") else "ndjson"
+    )
+    report = ProductImportReport()
+    try:
+        await import_products(session, _DEFAULT_USER_ID, request.stream(), fmt, report=report)
+    finally:
+        # Chunks commit independently, so a failed import may still have
+        # changed the catalog that cached listings were validated against.
+        if report.inserted or report.updated:
+            await get_version_registry().bump(PRODUCTS_NAMESPACE, _DEFAULT_USER_ID)
+    return report
+
+
 async def _get_product_or_404(product_id: int, session: AsyncSession) -> Product:
     stmt = select(Product).where(
         Product.id == product_id,
@@ -71,8 +193,9 @@ async def update_product(
     product.tags = list(payload.tags)
     product.stock_info = payload.stock_info
 
-    await session.commit()
+    await _commit_product(session)
     await session.refresh(product)
+    await get_version_registry().bump(PRODUCTS_NAMESPACE, _DEFAULT_USER_ID)
     return product
 
 
@@ -84,4 +207,5 @@ async def delete_product(
     product = await _get_product_or_404(product_id, session)
     await session.delete(product)
     await session.commit()
+    await get_version_registry().bump(PRODUCTS_NAMESPACE, _DEFAULT_USER_ID)
     return None
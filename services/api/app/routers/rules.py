@@ -1,15 +1,18 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy import select
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import select, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app import db
+from app.conditional import collection_etag, not_modified_response, validator_headers
 from app.models.rule import Rule
+from app.pagination import decode_cursor, encode_cursor
 from app.schemas.rule import RuleEvalRequest, RuleIn, RuleOut
-from app.services.rule_engine import apply_rules
+from app.services.rule_cache import get_rule_cache
+from app.services.versions import RULES_NAMESPACE, get_version_registry
 
 router = APIRouter(prefix="/rules", tags=["rules"])
 
@@ -28,14 +31,40 @@ async def _get_rule_or_404(rule_id: int, session: AsyncSession) -> Rule:
 
 
 @router.get("/", response_model=List[RuleOut])
-async def list_rules(session: AsyncSession = Depends(db.get_async_session)) -> List[RuleOut]:
+async def list_rules(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(default=None, ge=1, le=500),
+    session: AsyncSession = Depends(db.read_session(RULES_NAMESPACE, user_id=_DEFAULT_USER_ID)),
+) -> List[RuleOut]:
+    version = await get_version_registry().current(RULES_NAMESPACE, _DEFAULT_USER_ID)
+    etag = collection_etag(RULES_NAMESPACE, _DEFAULT_USER_ID, version, f"{limit}:{cursor}")
+    cached = not_modified_response(request, etag)
+    if cached is not None:
+        return cached
+
     stmt = (
         select(Rule)
         .where(Rule.user_id == _DEFAULT_USER_ID)
-        .order_by(Rule.created_at.desc())
+        .order_by(Rule.created_at.desc(), Rule.id.desc())
     )
+    if cursor:
+        try:
+            created_at, rule_id = decode_cursor(cursor)
+        except ValueError as exc:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+        stmt = stmt.where(tuple_(Rule.created_at, Rule.id) < tuple_(created_at, rule_id))
+    if limit is not None:
+        stmt = stmt.limit(limit + 1)
+
     result = await session.scalars(stmt)
-    return list(result.all())
+    rules = list(result.all())
+    if limit is not None and len(rules) > limit:
+        rules = rules[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(rules[-1].created_at, rules[-1].id)
+    response.headers.update(validator_headers(etag))
+    return rules
 
 
 @router.post("/", response_model=RuleOut, status_code=status.HTTP_201_CREATED)
@@ -53,6 +82,7 @@ async def create_rule(
     session.add(rule)
     await session.commit()
     await session.refresh(rule)
+    await get_rule_cache().invalidate(_DEFAULT_USER_ID)
     return rule
 
 
@@ -71,6 +101,7 @@ async def update_rule(
 
     await session.commit()
     await session.refresh(rule)
+    await get_rule_cache().invalidate(_DEFAULT_USER_ID)
     return rule
 
 
@@ -82,18 +113,20 @@ async def delete_rule(
     rule = await _get_rule_or_404(rule_id, session)
     await session.delete(rule)
     await session.commit()
+    await get_rule_cache().invalidate(_DEFAULT_USER_ID)
     return None
 
 
 @router.post("/eval", response_model=List[Dict[str, Any]])
 async def evaluate_rules(
     payload: RuleEvalRequest,
-    session: AsyncSession = Depends(db.get_async_session),
+    session: AsyncSession = Depends(db.read_session(RULES_NAMESPACE, user_id=_DEFAULT_USER_ID)),
 ) -> List[Dict[str, Any]]:
-    stmt = select(Rule).where(
-        Rule.user_id == _DEFAULT_USER_ID,
-        Rule.active.is_(True),
-    )
-    result = await session.scalars(stmt)
-    actions = apply_rules(payload.text, list(result.all()))
+    matcher = await get_rule_cache().get_matcher(_DEFAULT_USER_ID, session)
+    actions = matcher.match(payload.text)
     return actions
+
+
+@router.get("/cache/stats", response_model=Dict[str, int])
+async def rule_cache_stats() -> Dict[str, int]:
+    return get_rule_cache().stats()
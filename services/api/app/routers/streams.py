@@ -0,0 +1,227 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, AsyncIterator, List, Optional, Tuple
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Row, Select, func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import db
+from app.models import Stream
+from app.models.event import Event
+from app.pagination import decode_cursor, encode_cursor
+from app.schemas.stream import EventOut, EventPage, EventTypeSummaryOut, StreamStatsOut
+from app.services.event_archive import get_archive_reader
+from app.services.event_columns import decode_payload
+from app.services.sharding import FORWARDED_HEADER, get_shard_router
+from app.services.stream_stats import get_stream_stats
+
+router = APIRouter(prefix="/streams")
+
+_DEFAULT_USER_ID = 1
+_EXPORT_FETCH_SIZE = 1000
+_EVENT_COLUMNS = (
+    Event.id,
+    Event.stream_id,
+    Event.type,
+    Event.payload_json,
+    Event.ts,
+    Event.username,
+    Event.message,
+    Event.gift_name,
+)
+
+
+async def _get_stream_or_404(stream_id: int, session: AsyncSession) -> Stream:
+    stmt = select(Stream).where(
+        Stream.id == stream_id,
+        Stream.user_id == _DEFAULT_USER_ID,
+    )
+    stream = await session.scalar(stmt)
+    if stream is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Stream not found")
+    return stream
+
+
+def _event_out(row: Row[Any]) -> EventOut:
+    values = row._mapping
+    return EventOut(
+        id=values["id"],
+        stream_id=values["stream_id"],
+        type=values["type"],
+        payload_json=decode_payload(values["payload_json"], values),
+        ts=values["ts"],
+    )
+
+
+def _decode_cursor(cursor: Optional[str]) -> Optional[Tuple[datetime, int]]:
+    if not cursor:
+        return None
+    try:
+        return decode_cursor(cursor)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+
+
+def _events_query(
+    stream_id: int,
+    types: List[str],
+    position: Optional[Tuple[datetime, int]],
+    username: Optional[str] = None,
+    min_gift_value: Optional[float] = None,
+) -> Select:
+    stmt = (
+        select(*_EVENT_COLUMNS)
+        .where(Event.stream_id == stream_id)
+        .order_by(Event.ts, Event.id)
+    )
+    if types:
+        stmt = stmt.where(Event.type.in_(types))
+    if username is not None:
+        stmt = stmt.where(Event.username == username)
+    if min_gift_value is not None:
+        stmt = stmt.where(Event.gift_value >= min_gift_value)
+    if position is not None:
+        stmt = stmt.where(tuple_(Event.ts, Event.id) > tuple_(*position))
+    return stmt
+
+
+@router.get("/{stream_id}/events", response_model=EventPage)
+async def list_stream_events(
+    stream_id: int,
+    types: List[str] = Query(default=[], alias="type"),
+    cursor: Optional[str] = None,
+    username: Optional[str] = None,
+    min_gift_value: Optional[float] = Query(default=None, ge=0),
+    limit: int = Query(default=100, ge=1, le=1000),
+    session: AsyncSession = Depends(db.read_session()),
+) -> EventPage:
+    stream = await _get_stream_or_404(stream_id, session)
+    position = _decode_cursor(cursor)
+
+    if stream.archived_at is not None:
+        archived = await get_archive_reader().events(
+            stream_id,
+            types=types,
+            cursor=position,
+            username=username,
+            min_gift_value=min_gift_value,
+            limit=limit + 1,
+        )
+        items = [EventOut(**item) for item in archived]
+    else:
+        stmt = _events_query(stream_id, types, position, username, min_gift_value).limit(limit + 1)
+        items = [_event_out(row) for row in (await session.execute(stmt)).all()]
+
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        last = items[-1]
+        next_cursor = encode_cursor(last.ts, last.id)
+    return EventPage(items=items, next_cursor=next_cursor)
+
+
+@router.get("/{stream_id}/events/export")
+async def export_stream_events(
+    request: Request,
+    stream_id: int,
+    types: List[str] = Query(default=[], alias="type"),
+    cursor: Optional[str] = None,
+    username: Optional[str] = None,
+    min_gift_value: Optional[float] = Query(default=None, ge=0),
+    session: AsyncSession = Depends(db.read_session()),
+) -> StreamingResponse:
+    """Stream every matching event as NDJSON from a server-side cursor."""
+
+    stream = await _get_stream_or_404(stream_id, session)
+    position = _decode_cursor(cursor)
+
+    if stream.archived_at is not None:
+        reader = get_archive_reader()
+
+        async def _archived_lines() -> AsyncIterator[str]:
+            after = position
+            while True:
+                page = await reader.events(
+                    stream_id,
+                    types=types,
+                    cursor=after,
+                    username=username,
+                    min_gift_value=min_gift_value,
+                    limit=_EXPORT_FETCH_SIZE,
+                )
+                if not page:
+                    return
+                yield "".join(EventOut(**item).model_dump_json() + "\n" for item in page)
+                after = (page[-1]["ts"], page[-1]["id"])
+
+        return StreamingResponse(_archived_lines(), media_type="application/x-ndjson")
+
+    session_maker = await db.read_session_maker(request)
+    stmt = _events_query(stream_id, types, position, username, min_gift_value).execution_options(
+        yield_per=_EXPORT_FETCH_SIZE
+    )
+
+    async def _lines() -> AsyncIterator[str]:
+        # The request-scoped session may be closed before the body is sent, so the
+        # export owns its session for as long as rows are being streamed.
+        async with session_maker() as export_session:
+            result = await export_session.stream(stmt)
+            async for partition in result.partitions():
+                yield "".join(
+                    _event_out(row).model_dump_json() + "\n"
+                    for row in partition
+                )
+
+    return StreamingResponse(_lines(), media_type="application/x-ndjson")
+
+
+@router.get("/{stream_id}/events/summary", response_model=List[EventTypeSummaryOut])
+async def summarize_stream_events(
+    stream_id: int,
+    session: AsyncSession = Depends(db.read_session()),
+) -> List[EventTypeSummaryOut]:
+    """Event count and total gift value per event type."""
+
+    stream = await _get_stream_or_404(stream_id, session)
+    if stream.archived_at is not None:
+        totals = await get_archive_reader().summary(stream_id)
+        return [
+            EventTypeSummaryOut(type=event_type, count=int(summary["count"]), gift_value=summary["gift_value"])
+            for event_type, summary in sorted(totals.items())
+        ]
+
+    stmt = (
+        select(Event.type, func.count(), func.coalesce(func.sum(Event.gift_value), 0))
+        .where(Event.stream_id == stream_id)
+        .group_by(Event.type)
+        .order_by(Event.type)
+    )
+    return [
+        EventTypeSummaryOut(type=event_type, count=count, gift_value=float(gift_value))
+        for event_type, count, gift_value in (await session.execute(stmt)).all()
+    ]
+
+
+@router.get("/{stream_id}/stats", response_model=StreamStatsOut)
+async def stream_stats(
+    stream_id: int,
+    forwarded_by: Optional[str] = Header(default=None, alias=FORWARDED_HEADER),
+    session: AsyncSession = Depends(db.read_session()),
+) -> StreamStatsOut:
+    """Live chat/gift rates and totals, served from memory without querying events.
+
+    With sharded ingest the rates live on the worker owning the stream, so the
+    request is answered there.
+    """
+
+    if forwarded_by is None:
+        await _get_stream_or_404(stream_id, session)
+    shards = get_shard_router()
+    if forwarded_by is None and not shards.is_local(stream_id):
+        owned = await shards.fetch(shards.owner(stream_id), f"/streams/{stream_id}/stats")
+        if owned is not None:
+            return StreamStatsOut(**owned)
+    return StreamStatsOut(**(await get_stream_stats().snapshot(stream_id)))
@@ -20,9 +20,17 @@ class TokenResponse(BaseModel):
     token_type: str = "bearer"
 
 
-from .product import ProductIn, ProductOut  # noqa: E402,F401
+from .product import (  # noqa: E402,F401
+    ProductImportError,
+    ProductImportReport,
+    ProductIn,
+    ProductOut,
+    ProductSearchHit,
+    ProductSearchPage,
+)
 from .event import EventIngestRequest  # noqa: E402,F401
 from .rule import RuleIn, RuleOut, RuleEvalRequest  # noqa: E402,F401
+from .stream import EventOut, EventPage, StreamStatsOut  # noqa: E402,F401
 
 __all__ = [
     "HealthResponse",
@@ -31,8 +39,15 @@ __all__ = [
     "TokenResponse",
     "ProductIn",
     "ProductOut",
+    "ProductSearchHit",
+    "ProductSearchPage",
+    "ProductImportError",
+    "ProductImportReport",
     "EventIngestRequest",
     "RuleIn",
     "RuleOut",
     "RuleEvalRequest",
+    "EventOut",
+    "EventPage",
+    "StreamStatsOut",
 ]
@@ -1,4 +1,4 @@
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 from pydantic import BaseModel, Field
 
@@ -6,3 +6,5 @@ from pydantic import BaseModel, Field
 class EventIngestRequest(BaseModel):
     type: str
     payload: Dict[str, Any] = Field(default_factory=dict)
+    # Omitted by single-stream collectors, which ingest into the default stream.
+    stream_id: Optional[int] = Field(default=None, ge=1)
@@ -18,3 +18,24 @@ class ProductOut(ProductIn):
     user_id: int
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class ProductSearchHit(ProductOut):
+    score: float
+
+
+class ProductSearchPage(BaseModel):
+    items: List[ProductSearchHit]
+    next_offset: Optional[int] = None
+
+
+class ProductImportError(BaseModel):
+    row: int
+    error: str
+
+
+class ProductImportReport(BaseModel):
+    inserted: int = 0
+    updated: int = 0
+    failed: int = 0
+    errors: List[ProductImportError] = Field(default_factory=list)
@@ -2,6 +2,8 @@ from typing import Any, Dict, Literal
 
 from pydantic import BaseModel, Field, ConfigDict, field_validator
 
+from app.services.rate_limiter import rule_limits
+
 
 class RuleIn(BaseModel):
     trigger: str = Field(min_length=1)
@@ -14,6 +16,12 @@ class RuleIn(BaseModel):
     def _normalize_trigger(cls, value: str) -> str:
         return value.strip().lower()
 
+    @field_validator("params_json")
+    @classmethod
+    def _validate_limits(cls, value: Dict[str, Any]) -> Dict[str, Any]:
+        rule_limits(value)
+        return value
+
 
 class RuleOut(RuleIn):
     id: int
@@ -0,0 +1,37 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel, ConfigDict
+
+
+class EventOut(BaseModel):
+    id: int
+    stream_id: int
+    type: str
+    payload_json: Dict[str, Any]
+    ts: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class EventPage(BaseModel):
+    items: List[EventOut]
+    next_cursor: Optional[str] = None
+
+
+class EventTypeSummaryOut(BaseModel):
+    type: str
+    count: int
+    gift_value: float
+
+
+class StreamStatsOut(BaseModel):
+    stream_id: int
+    window_seconds: int
+    chats_per_minute: float
+    gifts_per_minute: float
+    gift_value_per_minute: float
+    total_chats: int
+    total_gifts: int
+    total_gift_value: float
+    last_event_at: Optional[datetime] = None
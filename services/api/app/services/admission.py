@@ -0,0 +1,188 @@
+"""Bounded, priority-aware admission control for the ingest endpoints.
+
+At most ``INGEST_MAX_IN_FLIGHT`` ingest requests are processed at once. Others
+wait in a bounded queue per priority class, and a freed slot always goes to the
+oldest waiter of the highest class, so gifts and purchases overtake chat when
+Postgres or the gateway slows down. A request is shed with ``429 Too Many
+Requests`` when its class's queue is full or when it waited longer than
+``INGEST_MAX_WAIT_MS``; ``Retry-After`` estimates when the queue ahead of it
+will have drained.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict, Iterable, Optional, Sequence
+
+from app.config import settings
+from app.metrics import Counter, Gauge, Histogram
+
+PRIORITY_HIGH = "high"
+PRIORITY_NORMAL = "normal"
+PRIORITIES = (PRIORITY_HIGH, PRIORITY_NORMAL)
+
+INGEST_ADMISSION_WAIT_SECONDS = Histogram(
+    "ingest_admission_wait_seconds",
+    "Time ingest requests waited for a processing slot, by priority.",
+    ("priority",),
+)
+INGEST_QUEUE_DEPTH = Gauge(
+    "ingest_queue_depth",
+    "Ingest requests waiting for a processing slot, by priority.",
+    ("priority",),
+)
+INGEST_IN_FLIGHT = Gauge(
+    "ingest_in_flight_requests",
+    "Ingest requests currently being processed.",
+)
+INGEST_SHED_TOTAL = Counter(
+    "ingest_requests_shed_total",
+    "Ingest requests rejected with 429, by priority and reason.",
+    ("priority", "reason"),
+)
+
+# Weight of the newest request in the moving average of processing time.
+_SERVICE_TIME_ALPHA = 0.1
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request cannot be admitted; carries the suggested retry delay."""
+
+    def __init__(self, priority: str, reason: str, retry_after_seconds: int) -> None:
+        super().__init__(f"{priority} ingest queue {reason}")
+        self.priority = priority
+        self.reason = reason
+        self.retry_after_seconds = retry_after_seconds
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        *,
+        max_in_flight: int,
+        queue_limits: Dict[str, int],
+        max_wait_seconds: float,
+    ) -> None:
+        self._max_in_flight = max_in_flight
+        self._queue_limits = queue_limits
+        self._max_wait_seconds = max_wait_seconds
+        self._in_flight = 0
+        self._waiters: Dict[str, Deque[asyncio.Future[None]]] = {
+            priority: deque() for priority in PRIORITIES
+        }
+        self._service_seconds = 0.01
+        self._stats = {"admitted": 0, "shed": 0}
+        self._wait_seconds = {
+            priority: INGEST_ADMISSION_WAIT_SECONDS.labels(priority) for priority in PRIORITIES
+        }
+        for priority, waiters in self._waiters.items():
+            INGEST_QUEUE_DEPTH.labels(priority).set_function(waiters.__len__)
+        INGEST_IN_FLIGHT.set_function(lambda: self._in_flight)
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            **self._stats,
+            "in_flight": self._in_flight,
+            "max_in_flight": self._max_in_flight,
+            "queued": {priority: len(waiters) for priority, waiters in self._waiters.items()},
+            "service_seconds": self._service_seconds,
+        }
+
+    def retry_after(self) -> int:
+        """Seconds until the current queue should have drained, at least one."""
+
+        queued = sum(len(waiters) for waiters in self._waiters.values())
+        return max(1, math.ceil(queued * self._service_seconds / self._max_in_flight))
+
+    def _reject(self, priority: str, reason: str) -> AdmissionRejected:
+        self._stats["shed"] += 1
+        INGEST_SHED_TOTAL.labels(priority, reason).inc()
+        return AdmissionRejected(priority, reason, self.retry_after())
+
+    async def _acquire(self, priority: str) -> None:
+        waiters = self._waiters[priority]
+        if self._in_flight < self._max_in_flight and not any(self._waiters.values()):
+            self._in_flight += 1
+            return
+        if len(waiters) >= self._queue_limits[priority]:
+            raise self._reject(priority, "queue_full")
+
+        waiter: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self._max_wait_seconds)
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as the wait timed out.
+                return
+            waiter.cancel()
+            waiters.remove(waiter)
+            raise self._reject(priority, "timeout") from None
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self._release()
+            else:
+                waiter.cancel()
+                waiters.remove(waiter)
+            raise
+
+    def _release(self) -> None:
+        # Hand the slot straight to the next waiter so it cannot be taken by a newcomer.
+        for priority in PRIORITIES:
+            waiters = self._waiters[priority]
+            while waiters:
+                waiter = waiters.popleft()
+                if not waiter.done():
+                    waiter.set_result(None)
+                    return
+        self._in_flight -= 1
+
+    @asynccontextmanager
+    async def admit(self, priority: str) -> AsyncIterator[None]:
+        """Hold a processing slot for the duration of the block.
+
+        Raises :class:`AdmissionRejected` when the request is shed.
+        """
+
+        queued_at = time.perf_counter()
+        await self._acquire(priority)
+        started = time.perf_counter()
+        self._wait_seconds[priority].observe(started - queued_at)
+        self._stats["admitted"] += 1
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self._service_seconds += _SERVICE_TIME_ALPHA * (elapsed - self._service_seconds)
+            self._release()
+
+
+def event_priority(event_types: Iterable[str], high_priority_types: Sequence[str]) -> str:
+    """Return the priority class for a request carrying events of ``event_types``."""
+
+    if any(event_type in high_priority_types for event_type in event_types):
+        return PRIORITY_HIGH
+    return PRIORITY_NORMAL
+
+
+_controller: Optional[AdmissionController] = None
+
+
+def get_admission_controller() -> AdmissionController:
+    """Return the process-wide ingest admission controller."""
+
+    global _controller
+    if _controller is None:
+        _controller = AdmissionController(
+            max_in_flight=settings.ingest_max_in_flight,
+            queue_limits={
+                PRIORITY_HIGH: settings.ingest_queue_size_high,
+                PRIORITY_NORMAL: settings.ingest_queue_size_normal,
+            },
+            max_wait_seconds=settings.ingest_max_wait_ms / 1000,
+        )
+    return _controller
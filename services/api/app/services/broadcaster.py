@@ -0,0 +1,311 @@
+from __future__ import annotations
+
+import abc
+import asyncio
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from itertools import groupby
+from operator import attrgetter
+from typing import Any, Dict, List, Optional, Sequence
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.config import settings
+from app.metrics import BROADCAST_BATCH_SECONDS, BROADCAST_FAILURES_TOTAL, BROADCAST_QUEUE_DEPTH
+from app.redis_client import get_redis
+
+_logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class BroadcastMessage:
+    channel: str
+    message: Dict[str, Any]
+    # Rule-action sends carry no ordering among themselves and may be delivered
+    # concurrently; everything else goes out in queue order.
+    concurrent: bool = False
+
+
+@dataclass
+class EndpointHealth:
+    """Consecutive-failure circuit breaker for a single delivery endpoint.
+
+    After ``failure_threshold`` failures in a row the circuit opens and the
+    endpoint is skipped for ``cooldown_seconds``; then a single trial request is
+    let through (half-open) and its outcome closes or re-opens the circuit.
+    """
+
+    url: str
+    failure_threshold: int
+    cooldown_seconds: float
+    consecutive_failures: int = 0
+    open_until: float = 0.0
+    trial_in_flight: bool = False
+    stats: Dict[str, int] = field(default_factory=lambda: {"sent": 0, "failed": 0, "skipped": 0})
+
+    @property
+    def state(self) -> str:
+        if self.consecutive_failures < self.failure_threshold:
+            return "closed"
+        if time.monotonic() < self.open_until:
+            return "open"
+        return "half_open"
+
+    def try_acquire(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self.trial_in_flight:
+            self.trial_in_flight = True
+            return True
+        self.stats["skipped"] += 1
+        return False
+
+    def record_success(self) -> None:
+        self.stats["sent"] += 1
+        self.consecutive_failures = 0
+        self.trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self.stats["failed"] += 1
+        self.consecutive_failures += 1
+        self.trial_in_flight = False
+        if self.consecutive_failures >= self.failure_threshold:
+            self.open_until = time.monotonic() + self.cooldown_seconds
+
+
+class Broadcaster(abc.ABC):
+    """Bounded queue of outgoing broadcasts drained by one background task.
+
+    Request handlers only call :meth:`enqueue`, which never waits: when the
+    queue is full the message is dropped and counted. A single sequencer takes
+    messages in batches of up to ``batch_size`` and hands them to
+    :meth:`_deliver`, one batch at a time, so the overlay feed is delivered in
+    the order it was queued.
+    """
+
+    backend = "base"
+
+    def __init__(self, *, queue_size: int, batch_size: int) -> None:
+        self._queue: asyncio.Queue[BroadcastMessage] = asyncio.Queue(maxsize=queue_size)
+        self._batch_size = batch_size
+        self._task: Optional[asyncio.Task[None]] = None
+        self._stats = {"enqueued": 0, "dropped": 0, "delivered": 0, "undeliverable": 0}
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._stats, "pending": self._queue.qsize()}
+
+    def enqueue(self, channel: str, message: Dict[str, Any], *, concurrent: bool = False) -> bool:
+        try:
+            self._queue.put_nowait(BroadcastMessage(channel, message, concurrent))
+        except asyncio.QueueFull:
+            self._stats["dropped"] += 1
+            _logger.warning("Broadcast queue full; dropping message for %s", channel)
+            return False
+        self._stats["enqueued"] += 1
+        return True
+
+    async def start(self) -> None:
+        if self._task is None:
+            BROADCAST_QUEUE_DEPTH.set_function(self._queue.qsize)
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self, drain_timeout: float = 5.0) -> None:
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), drain_timeout)
+        except asyncio.TimeoutError:
+            _logger.warning(
+                "Stopping broadcaster with %d undelivered messages", self._queue.qsize()
+            )
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        await self._close()
+
+    async def _run(self) -> None:
+        batch_seconds = BROADCAST_BATCH_SECONDS.labels(self.backend)
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self._batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                with batch_seconds.time():
+                    await self._deliver(batch)
+            except Exception:  # noqa: BLE001 - the sequencer must survive delivery bugs
+                _logger.exception("Unexpected error while delivering broadcasts")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    @abc.abstractmethod
+    async def _deliver(self, batch: Sequence[BroadcastMessage]) -> None:
+        """Send one batch taken from the queue."""
+
+    async def _close(self) -> None:
+        return None
+
+
+class HttpBroadcaster(Broadcaster):
+    """Deliver broadcasts through the gateway ``/broadcast`` HTTP endpoint.
+
+    A single pooled client is reused for every request, and endpoints are tried
+    in order, skipping those whose circuit is open. Messages are posted in
+    queue order, one request at a time, except that a run of consecutive
+    concurrent (rule-action) messages is posted over up to ``action_fan_out``
+    requests once everything queued before it has been sent; later messages
+    wait for the whole run.
+    """
+
+    backend = "http"
+
+    def __init__(
+        self,
+        endpoints: Sequence[str],
+        *,
+        timeout_seconds: float,
+        failure_threshold: int,
+        cooldown_seconds: float,
+        queue_size: int,
+        batch_size: int,
+        action_fan_out: int = 1,
+    ) -> None:
+        super().__init__(queue_size=queue_size, batch_size=batch_size)
+        self._action_fan_out = max(1, action_fan_out)
+        self._endpoints = [
+            EndpointHealth(url, failure_threshold, cooldown_seconds) for url in endpoints
+        ]
+        # Imported here so workers using the Redis backend do not pay for loading httpx.
+        import httpx
+
+        self._client = httpx.AsyncClient(
+            timeout=timeout_seconds,
+            limits=httpx.Limits(
+                max_connections=self._action_fan_out,
+                max_keepalive_connections=self._action_fan_out,
+            ),
+        )
+        self._http_error = httpx.HTTPError
+
+    def stats(self) -> Dict[str, Any]:
+        endpoints = {
+            endpoint.url: {"state": endpoint.state, **endpoint.stats}
+            for endpoint in self._endpoints
+        }
+        return {**super().stats(), "endpoints": endpoints}
+
+    async def _deliver(self, batch: Sequence[BroadcastMessage]) -> None:
+        for concurrent, run in groupby(batch, key=attrgetter("concurrent")):
+            if concurrent:
+                await self._post_concurrently(list(run))
+            else:
+                for item in run:
+                    await self._post(item)
+
+    async def _post_concurrently(self, items: List[BroadcastMessage]) -> None:
+        # Lanes share one iterator, so each message is posted exactly once and at
+        # most ``action_fan_out`` requests are in flight.
+        pending = iter(items)
+
+        async def lane() -> None:
+            for item in pending:
+                await self._post(item)
+
+        await asyncio.gather(*(lane() for _ in range(min(self._action_fan_out, len(items)))))
+
+    async def _post(self, item: BroadcastMessage) -> None:
+        body = {"channel": item.channel, "message": item.message}
+        attempted = False
+        for endpoint in self._endpoints:
+            if not endpoint.try_acquire():
+                continue
+            attempted = True
+            try:
+                response = await self._client.post(endpoint.url, json=body)
+                response.raise_for_status()
+            except self._http_error as exc:
+                endpoint.record_failure()
+                BROADCAST_FAILURES_TOTAL.labels(endpoint.url).inc()
+                _logger.warning(
+                    "Failed to broadcast event via %s: %s", endpoint.url, exc, exc_info=False
+                )
+                continue
+            endpoint.record_success()
+            self._stats["delivered"] += 1
+            return
+
+        self._stats["undeliverable"] += 1
+        if attempted:
+            _logger.error("Unable to broadcast event after trying all endpoints")
+        else:
+            _logger.debug("Broadcast skipped; every gateway endpoint circuit is open")
+
+    async def _close(self) -> None:
+        await self._client.aclose()
+
+
+class RedisBroadcaster(Broadcaster):
+    """Publish broadcasts straight to the Redis channels the gateway subscribes to.
+
+    Every batch taken off the queue is sent as one non-transactional pipeline,
+    so under load many publishes share a single round trip.
+    """
+
+    backend = "redis"
+
+    def __init__(
+        self,
+        redis: Redis,
+        *,
+        queue_size: int,
+        batch_size: int,
+    ) -> None:
+        super().__init__(queue_size=queue_size, batch_size=batch_size)
+        self._redis = redis
+        self._stats["pipelines"] = 0
+
+    async def _deliver(self, batch: Sequence[BroadcastMessage]) -> None:
+        try:
+            async with self._redis.pipeline(transaction=False) as pipe:
+                for item in batch:
+                    pipe.publish(item.channel, json.dumps(item.message))
+                await pipe.execute()
+        except (RedisError, OSError) as exc:
+            self._stats["undeliverable"] += len(batch)
+            BROADCAST_FAILURES_TOTAL.labels("redis").inc()
+            _logger.error("Failed to publish %d broadcasts to Redis: %s", len(batch), exc)
+            return
+
+        self._stats["pipelines"] += 1
+        self._stats["delivered"] += len(batch)
+
+
+_broadcaster: Optional[Broadcaster] = None
+
+
+def get_broadcaster() -> Broadcaster:
+    """Return the process-wide broadcaster for the configured backend."""
+
+    global _broadcaster
+    if _broadcaster is None:
+        if settings.broadcast_backend == "redis":
+            _broadcaster = RedisBroadcaster(
+                get_redis(),
+                queue_size=settings.broadcast_queue_size,
+                batch_size=settings.broadcast_batch_size,
+            )
+        else:
+            _broadcaster = HttpBroadcaster(
+                settings.gateway_broadcast_urls,
+                timeout_seconds=settings.broadcast_timeout_seconds,
+                failure_threshold=settings.broadcast_failure_threshold,
+                cooldown_seconds=settings.broadcast_cooldown_seconds,
+                queue_size=settings.broadcast_queue_size,
+                batch_size=settings.broadcast_batch_size,
+                action_fan_out=settings.broadcast_action_fan_out,
+            )
+    return _broadcaster
@@ -0,0 +1,263 @@
+"""Collapsing of repeated and spammy chat messages before they are ingested.
+
+During a live sale most chat lines are repeats: many viewers type the same
+"cek keranjang", or one viewer floods the chat. :class:`ChatDeduper` sits in
+front of persistence, broadcast and rule evaluation:
+
+* the first occurrence of a message on a stream passes through as usual and
+  opens a window of ``CHAT_DEDUP_WINDOW_SECONDS``;
+* repeats inside the window are only counted, and when the window closes a
+  single ``chat_repeat`` event carrying ``repeat_count`` is emitted for them;
+* each viewer gets a token bucket of ``CHAT_USER_MAX_PER_MINUTE`` messages
+  (``CHAT_USER_BURST`` at once); messages beyond it are dropped.
+
+Windows are kept in a dict keyed by ``(stream_id, normalized text)``. Every
+window has the same lifetime, so insertion order is expiry order and eviction
+only ever looks at the front of the dict. Rows that pass :meth:`ChatDeduper.admit`
+but then fail to persist are handed to :meth:`ChatDeduper.release`, so a
+retry of the same line is not mistaken for a duplicate.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.config import settings
+from app.metrics import Counter, Gauge
+from app.services.event_columns import chat_columns, register_extractor
+from app.services.event_writer import EventRow
+from app.services.rate_limiter import BucketSpec, LocalBuckets
+
+REPEAT_EVENT_TYPE = "chat_repeat"
+
+CHAT_MESSAGES_SEEN_TOTAL = Counter(
+    "chat_messages_seen_total",
+    "Chat messages received by the ingest endpoints, before collapsing.",
+)
+CHAT_MESSAGES_COLLAPSED_TOTAL = Counter(
+    "chat_messages_collapsed_total",
+    "Chat messages not ingested individually, by reason (duplicate or spam).",
+    ("reason",),
+)
+CHAT_COLLAPSE_RATIO = Gauge(
+    "chat_collapse_ratio",
+    "Share of received chat messages collapsed or dropped since the worker started.",
+)
+
+# Summaries carry the first message's payload, so they get the chat columns too.
+register_extractor(REPEAT_EVENT_TYPE)(chat_columns)
+
+_DUPLICATES = CHAT_MESSAGES_COLLAPSED_TOTAL.labels("duplicate")
+_SPAM = CHAT_MESSAGES_COLLAPSED_TOTAL.labels("spam")
+
+_logger = logging.getLogger(__name__)
+
+SummarySink = Callable[[List[EventRow]], Awaitable[None]]
+
+
+def chat_text(payload: Dict[str, Any]) -> Optional[str]:
+    text = payload.get("text") or payload.get("message")
+    return text if isinstance(text, str) else None
+
+
+def chat_author(payload: Dict[str, Any]) -> Optional[str]:
+    author = payload.get("user") or payload.get("username") or payload.get("author")
+    return str(author) if author else None
+
+
+def _window_key(stream_id: int, text: str) -> Tuple[int, str]:
+    return stream_id, " ".join(text.casefold().split())
+
+
+class _Window:
+    __slots__ = ("expires_at", "repeats", "stream_id", "payload")
+
+    def __init__(self, expires_at: float, stream_id: int, payload: Dict[str, Any]) -> None:
+        self.expires_at = expires_at
+        self.repeats = 0
+        self.stream_id = stream_id
+        self.payload = payload
+
+
+class ChatDeduper:
+    """Windowed duplicate collapsing and per-viewer spam limiting for chat rows."""
+
+    def __init__(
+        self,
+        *,
+        window_seconds: float,
+        max_windows: int,
+        user_limit: Optional[BucketSpec],
+        sweep_interval_seconds: float = 1.0,
+    ) -> None:
+        self._window_seconds = window_seconds
+        self._max_windows = max_windows
+        self._user_limit = user_limit
+        self._sweep_interval_seconds = sweep_interval_seconds
+        self._windows: Dict[Tuple[int, str], _Window] = {}
+        # Windows closed outside of a sweep, reported by the next one.
+        self._closed: List[_Window] = []
+        self._users = LocalBuckets()
+        self._sink: Optional[SummarySink] = None
+        self._task: Optional[asyncio.Task[None]] = None
+        self._stats = {"seen": 0, "duplicates": 0, "spam": 0, "summaries": 0}
+        CHAT_COLLAPSE_RATIO.set_function(self.collapse_ratio)
+
+    def collapse_ratio(self) -> float:
+        seen = self._stats["seen"]
+        return (self._stats["duplicates"] + self._stats["spam"]) / seen if seen else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._stats, "windows": len(self._windows), "collapse_ratio": self.collapse_ratio()}
+
+    def admit(self, row: EventRow, now: Optional[float] = None) -> bool:
+        """Return whether ``row`` should be ingested; rows other than chat always are."""
+
+        if row["type"] != "chat":
+            return True
+        payload = row["payload_json"]
+        text = chat_text(payload)
+        if not text:
+            return True
+
+        now = time.monotonic() if now is None else now
+        self._stats["seen"] += 1
+        CHAT_MESSAGES_SEEN_TOTAL.inc()
+        stream_id = row["stream_id"]
+
+        author = chat_author(payload)
+        if self._user_limit is not None and author is not None:
+            if self._users.acquire(((f"{stream_id}:{author}", self._user_limit),), now):
+                self._stats["spam"] += 1
+                _SPAM.inc()
+                return False
+
+        key = _window_key(stream_id, text)
+        window = self._windows.get(key)
+        if window is not None and now < window.expires_at:
+            window.repeats += 1
+            self._stats["duplicates"] += 1
+            _DUPLICATES.inc()
+            return False
+
+        if window is not None:
+            # Expired but not swept yet: close it before opening the next one.
+            self._closed.append(self._windows.pop(key))
+        if len(self._windows) >= self._max_windows:
+            self._closed.append(self._windows.pop(next(iter(self._windows))))
+        self._windows[key] = _Window(now + self._window_seconds, stream_id, payload)
+        return True
+
+    def release(self, rows: Iterable[EventRow], now: Optional[float] = None) -> None:
+        """Undo :meth:`admit` for admitted rows that could not be persisted.
+
+        The viewer's message is refunded and the window the row opened is
+        closed without a summary. If repeats were already collapsed into that
+        window it is kept instead, counting the failed row as one more repeat,
+        so its summary still carries the text.
+        """
+
+        now = time.monotonic() if now is None else now
+        for row in rows:
+            payload = row["payload_json"]
+            text = chat_text(payload) if row["type"] == "chat" else None
+            if not text:
+                continue
+            stream_id = row["stream_id"]
+            author = chat_author(payload)
+            if self._user_limit is not None and author is not None:
+                self._users.refund(((f"{stream_id}:{author}", self._user_limit),), now)
+            key = _window_key(stream_id, text)
+            window = self._windows.get(key)
+            if window is None or window.payload is not payload:
+                continue
+            if window.repeats:
+                window.repeats += 1
+            else:
+                del self._windows[key]
+
+    def _expired(self, now: float) -> Iterator[_Window]:
+        windows = self._windows
+        while windows:
+            key = next(iter(windows))
+            if windows[key].expires_at > now:
+                break
+            yield windows.pop(key)
+
+    def collect(self, now: Optional[float] = None, *, everything: bool = False) -> List[EventRow]:
+        """Close expired windows and return a ``chat_repeat`` row for each one with repeats."""
+
+        now = time.monotonic() if now is None else now
+        closed, self._closed = self._closed, []
+        closed.extend(self._expired(float("inf") if everything else now))
+        rows = [
+            {
+                "stream_id": window.stream_id,
+                "type": REPEAT_EVENT_TYPE,
+                "payload_json": {
+                    **window.payload,
+                    "repeat_count": window.repeats,
+                    "window_seconds": self._window_seconds,
+                },
+            }
+            for window in closed
+            if window.repeats
+        ]
+        self._stats["summaries"] += len(rows)
+        return rows
+
+    async def start(self, sink: SummarySink) -> None:
+        """Start emitting summaries of closed windows to ``sink``."""
+
+        self._sink = sink
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self._flush(everything=True)
+
+    async def _flush(self, *, everything: bool = False) -> None:
+        rows = self.collect(everything=everything)
+        if not rows or self._sink is None:
+            return
+        try:
+            await self._sink(rows)
+        except Exception as exc:  # noqa: BLE001 - a lost summary must not stop the sweeper
+            _logger.error("Failed to emit %d chat repeat summaries: %s", len(rows), exc)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self._sweep_interval_seconds)
+            await self._flush()
+
+
+_deduper: Optional[ChatDeduper] = None
+
+
+def get_chat_deduper() -> ChatDeduper:
+    """Return the process-wide chat deduplication stage."""
+
+    global _deduper
+    if _deduper is None:
+        user_limit = None
+        if settings.chat_user_max_per_minute > 0:
+            user_limit = BucketSpec(
+                max(float(settings.chat_user_burst), 1.0),
+                settings.chat_user_max_per_minute / 60.0,
+            )
+        _deduper = ChatDeduper(
+            window_seconds=settings.chat_dedup_window_seconds,
+            max_windows=settings.chat_dedup_max_windows,
+            user_limit=user_limit,
+        )
+    return _deduper
@@ -0,0 +1,210 @@
+"""Event-loop stall detection and stack sampling for a live worker.
+
+:class:`LoopLagMonitor` measures how late a periodic timer fires on the event
+loop. A watchdog thread notices when the loop has not come back for longer
+than the threshold and captures the loop thread's stack while it is still
+blocked, so each recorded stall names the code that caused it.
+
+:func:`sample_stacks` is a stdlib sampling profiler. It reads the stack of a
+thread at a fixed interval from a separate thread and returns the samples in
+the collapsed format used by flame graph tools.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from datetime import datetime, timezone
+from types import FrameType
+from typing import Any, Deque, Dict, List, Optional
+
+from app.config import settings
+from app.metrics import Counter as MetricCounter
+from app.metrics import Histogram
+
+LOOP_LAG_SECONDS = Histogram(
+    "event_loop_lag_seconds",
+    "How late the loop monitor's timer fired.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+LOOP_STALLS_TOTAL = MetricCounter(
+    "event_loop_stalls_total",
+    "Event loop stalls longer than the configured threshold.",
+)
+
+_MAX_STACK_DEPTH = 64
+
+
+def _frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    path = code.co_filename.split(os.sep)
+    return f"{code.co_qualname} ({'/'.join(path[-2:])}:{code.co_firstlineno})"
+
+
+def collapse_stack(frame: Optional[FrameType]) -> str:
+    """Return ``frame``'s stack as ``root;...;leaf`` with one label per function."""
+
+    labels: List[str] = []
+    while frame is not None and len(labels) < _MAX_STACK_DEPTH:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+def sample_stacks(thread_id: int, seconds: float, interval: float) -> Dict[str, int]:
+    """Sample ``thread_id``'s stack every ``interval`` seconds for ``seconds``.
+
+    Blocking; run it off the thread being profiled. Returns collapsed stacks
+    mapped to the number of samples they were seen in.
+    """
+
+    samples: Counter[str] = Counter()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        frame = sys._current_frames().get(thread_id)
+        if frame is None:
+            break
+        samples[collapse_stack(frame)] += 1
+        del frame
+        time.sleep(interval)
+    return dict(samples)
+
+
+def format_collapsed(samples: Dict[str, int]) -> str:
+    return "".join(
+        f"{stack} {count}\n"
+        for stack, count in sorted(samples.items(), key=lambda item: item[1], reverse=True)
+    )
+
+
+class LoopLagMonitor:
+    """Records event-loop lag and keeps the most recent stalls with their stacks."""
+
+    def __init__(
+        self,
+        *,
+        interval_seconds: float,
+        threshold_seconds: float,
+        max_stalls: int = 50,
+    ) -> None:
+        self._interval_seconds = interval_seconds
+        self._threshold_seconds = threshold_seconds
+        self._stalls: Deque[Dict[str, Any]] = deque(maxlen=max_stalls)
+        self._task: Optional[asyncio.Task[None]] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self._loop_thread_id: Optional[int] = None
+        # Guards the heartbeat and the stall opened by the watchdog thread.
+        self._lock = threading.Lock()
+        self._heartbeat = time.monotonic()
+        self._open_stall: Optional[Dict[str, Any]] = None
+        self._profiling = False
+
+    @property
+    def loop_thread_id(self) -> Optional[int]:
+        return self._loop_thread_id
+
+    def stalls(self) -> List[Dict[str, Any]]:
+        return list(self._stalls)
+
+    async def start(self) -> None:
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopping.clear()
+        self._task = asyncio.create_task(self._run())
+        self._watchdog = threading.Thread(
+            target=self._watch, name="loop-lag-watchdog", daemon=True
+        )
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        self._stopping.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=1.0)
+            self._watchdog = None
+
+    async def profile(self, seconds: float, interval: float) -> Dict[str, int]:
+        """Sample the event loop thread's stacks without blocking the loop."""
+
+        if self._loop_thread_id is None:
+            raise RuntimeError("Loop monitor is not running")
+        if self._profiling:
+            raise RuntimeError("A profile is already being recorded")
+        self._profiling = True
+        try:
+            return await asyncio.to_thread(
+                sample_stacks, self._loop_thread_id, seconds, interval
+            )
+        finally:
+            self._profiling = False
+
+    async def _run(self) -> None:
+        while True:
+            expected = time.monotonic() + self._interval_seconds
+            await asyncio.sleep(self._interval_seconds)
+            now = time.monotonic()
+            with self._lock:
+                self._heartbeat = now
+                stall, self._open_stall = self._open_stall, None
+            lag = max(now - expected, 0.0)
+            LOOP_LAG_SECONDS.observe(lag)
+            if lag < self._threshold_seconds and stall is None:
+                continue
+
+            # The watchdog has usually opened this stall already, with its stack.
+            if stall is None:
+                stall = self._new_stall(None)
+            stall["duration_ms"] = round(lag * 1000, 3)
+            LOOP_STALLS_TOTAL.inc()
+
+    def _new_stall(self, stack: Optional[List[str]]) -> Dict[str, Any]:
+        stall: Dict[str, Any] = {
+            "detected_at": datetime.now(timezone.utc).isoformat(),
+            "duration_ms": None,
+            "stack": stack,
+        }
+        self._stalls.append(stall)
+        return stall
+
+    def _watch(self) -> None:
+        # Checking twice per interval catches stalls shortly after they cross the threshold.
+        limit = self._interval_seconds + self._threshold_seconds
+        while not self._stopping.wait(self._interval_seconds / 2):
+            with self._lock:
+                if self._open_stall is not None or time.monotonic() - self._heartbeat < limit:
+                    continue
+                frame = sys._current_frames().get(self._loop_thread_id or 0)
+                if frame is None:
+                    continue
+                stack = traceback.format_stack(frame, limit=_MAX_STACK_DEPTH)
+                del frame
+                self._open_stall = self._new_stall([line.rstrip() for line in stack])
+
+
+_monitor: Optional[LoopLagMonitor] = None
+
+
+def get_loop_monitor() -> LoopLagMonitor:
+    """Return the process-wide event loop lag monitor."""
+
+    global _monitor
+    if _monitor is None:
+        _monitor = LoopLagMonitor(
+            interval_seconds=settings.loop_monitor_interval_ms / 1000,
+            threshold_seconds=settings.loop_stall_threshold_ms / 1000,
+        )
+    return _monitor
@@ -0,0 +1,528 @@
+"""Archiving of ended streams' events to columnar segment files.
+
+Once a stream has ended more than ``EVENT_ARCHIVE_AFTER_HOURS`` ago its
+events are exported, in ``(ts, id)`` order, to segment files (see
+:mod:`app.services.segments`) plus a ``manifest.json`` under
+``streams/<stream_id>/`` in the configured store, rolled up into
+``event_rollups`` like expired partitions, and deleted from ``events``. All of
+that happens in one transaction holding ``FOR UPDATE`` on the stream's row:
+inserting an event takes a key-share lock on that row through the foreign
+key, so late events for the stream wait until the archive commits instead of
+slipping between the export and the delete, and the stream is only marked
+archived once every one of its rows is in the files. Live streams (no
+``end_at``) are never archived, even when named explicitly, and ingest refuses
+events for archived streams (see :func:`app.services.event_writer.insert_events`).
+
+:class:`ArchiveReader` serves archived streams from memory-mapped segments
+with the same filters and cursors as the event history endpoints. Runs
+periodically inside the API (see :class:`EventArchiver`) or once from cron
+with ``python -m app.services.event_archive [stream_id ...]``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import sys
+from bisect import bisect_right
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Dict,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+from sqlalchemy import delete, func, select, text, update
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from app.config import settings
+from app.metrics import Counter
+from app.models import Stream
+from app.models.base import get_engine
+from app.models.event import Event
+from app.services.event_columns import decode_payload
+from app.services.event_partitions import rollup_stream
+from app.services.segments import Segment, to_micros, write_segment
+
+EVENTS_ARCHIVED_TOTAL = Counter(
+    "events_archived_total",
+    "Events moved from Postgres to archive segments.",
+)
+
+_ARCHIVE_COLUMNS = (
+    Event.id,
+    Event.stream_id,
+    Event.type,
+    Event.payload_json,
+    Event.ts,
+    Event.username,
+    Event.message,
+    Event.gift_name,
+    Event.gift_value,
+)
+# Arbitrary constant identifying archive jobs for pg_try_advisory_xact_lock(key, stream_id)
+_ADVISORY_LOCK_KEY = 7_305_413
+
+_logger = logging.getLogger(__name__)
+
+
+def _segment_key(stream_id: int, index: int) -> str:
+    return f"streams/{stream_id}/{index:05d}.seg"
+
+
+def _manifest_key(stream_id: int) -> str:
+    return f"streams/{stream_id}/manifest.json"
+
+
+class LocalSegmentStore:
+    """Segment files in a directory on local disk."""
+
+    def __init__(self, root: Path) -> None:
+        self._root = root
+
+    async def put(self, key: str, data: bytes) -> None:
+        await asyncio.to_thread(self._write, self._root / key, data)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        path = self._root / key
+        return await asyncio.to_thread(path.read_bytes) if path.exists() else None
+
+    async def local_path(self, key: str) -> Path:
+        return self._root / key
+
+    async def close(self) -> None:
+        pass
+
+    @staticmethod
+    def _write(path: Path, data: bytes) -> None:
+        # Written next to the target and renamed, so readers never map a partial file.
+        path.parent.mkdir(parents=True, exist_ok=True)
+        partial = path.with_name(path.name + ".partial")
+        partial.write_bytes(data)
+        os.replace(partial, path)
+
+
+class HttpSegmentStore:
+    """Segment files in an object store addressed by plain ``PUT``/``GET`` on ``base_url``.
+
+    Segments are downloaded into ``cache_dir`` the first time they are read,
+    since they can only be memory-mapped from local disk.
+    """
+
+    def __init__(self, base_url: str, cache_dir: Path, *, timeout_seconds: float = 30.0) -> None:
+        # Imported lazily like the HTTP broadcaster; local archives never need it.
+        import httpx
+
+        self._base_url = base_url.rstrip("/")
+        self._cache = LocalSegmentStore(cache_dir)
+        self._client = httpx.AsyncClient(timeout=timeout_seconds)
+
+    async def put(self, key: str, data: bytes) -> None:
+        response = await self._client.put(f"{self._base_url}/{key}", content=data)
+        response.raise_for_status()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        response = await self._client.get(f"{self._base_url}/{key}")
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return response.content
+
+    async def local_path(self, key: str) -> Path:
+        path = await self._cache.local_path(key)
+        if not path.exists():
+            data = await self.get(key)
+            if data is None:
+                raise FileNotFoundError(f"{self._base_url}/{key}")
+            await self._cache.put(key, data)
+        return path
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+SegmentStore = Union[LocalSegmentStore, HttpSegmentStore]
+
+
+async def write_archive(
+    store: SegmentStore, stream_id: int, rows: AsyncIterable[Mapping[str, Any]], *, segment_rows: int
+) -> Dict[str, Any]:
+    """Write ``rows`` (ordered by ``(ts, id)``) as segments plus a manifest; returns the manifest."""
+
+    segments: List[Dict[str, Any]] = []
+
+    async def flush(batch: List[Mapping[str, Any]]) -> None:
+        key = _segment_key(stream_id, len(segments))
+        await store.put(key, await asyncio.to_thread(write_segment, batch))
+        segments.append(
+            {
+                "key": key,
+                "rows": len(batch),
+                "first": [to_micros(batch[0]["ts"]), batch[0]["id"]],
+                "last": [to_micros(batch[-1]["ts"]), batch[-1]["id"]],
+            }
+        )
+
+    batch: List[Mapping[str, Any]] = []
+    async for row in rows:
+        batch.append(row)
+        if len(batch) >= segment_rows:
+            await flush(batch)
+            batch = []
+    if batch:
+        await flush(batch)
+
+    manifest = {
+        "stream_id": stream_id,
+        "rows": sum(segment["rows"] for segment in segments),
+        "archived_at": datetime.now(timezone.utc).isoformat(),
+        "segments": segments,
+    }
+    await store.put(_manifest_key(stream_id), json.dumps(manifest, indent=2).encode())
+    return manifest
+
+
+async def _stream_rows(
+    conn: AsyncConnection, stream_id: int, fetch_size: int
+) -> AsyncIterator[Mapping[str, Any]]:
+    stmt = (
+        select(*_ARCHIVE_COLUMNS)
+        .where(Event.stream_id == stream_id)
+        .order_by(Event.ts, Event.id)
+        .execution_options(yield_per=fetch_size)
+    )
+    result = await conn.stream(stmt)
+    async for row in result:
+        yield row._mapping
+
+
+async def archive_stream(
+    engine: AsyncEngine, store: SegmentStore, stream_id: int, *, segment_rows: int
+) -> Optional[int]:
+    """Archive one stream's events; returns the number archived, ``None`` if skipped.
+
+    A stream is skipped while it is live (no ``end_at``), while another worker
+    is archiving it, or once it has been archived.
+    """
+
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="READ COMMITTED")
+        async with conn.begin():
+            locked = await conn.scalar(
+                text("SELECT pg_try_advisory_xact_lock(:key, :stream_id)"),
+                {"key": _ADVISORY_LOCK_KEY, "stream_id": stream_id},
+            )
+            if not locked:
+                return None
+            # Waits for in-flight inserts into the stream and blocks new ones until
+            # commit, so every statement below sees the same, complete set of rows.
+            stream = (
+                await conn.execute(
+                    select(Stream.end_at, Stream.archived_at)
+                    .where(Stream.id == stream_id)
+                    .with_for_update()
+                )
+            ).first()
+            if stream is None or stream.end_at is None or stream.archived_at is not None:
+                return None
+            manifest = await write_archive(
+                store, stream_id, _stream_rows(conn, stream_id, segment_rows), segment_rows=segment_rows
+            )
+            await rollup_stream(conn, stream_id)
+            deleted = (
+                await conn.execute(delete(Event).where(Event.stream_id == stream_id))
+            ).rowcount
+            if deleted != manifest["rows"]:
+                raise RuntimeError(
+                    f"Stream {stream_id} changed while archiving: exported {manifest['rows']} "
+                    f"events but found {deleted}"
+                )
+            await conn.execute(
+                update(Stream).where(Stream.id == stream_id).values(archived_at=func.now())
+            )
+    EVENTS_ARCHIVED_TOTAL.inc(manifest["rows"])
+    return manifest["rows"]
+
+
+async def run_archive(
+    engine: AsyncEngine,
+    store: SegmentStore,
+    *,
+    after_hours: float,
+    segment_rows: int,
+    stream_ids: Sequence[int] = (),
+) -> Dict[int, int]:
+    """Archive ``stream_ids`` once ended, regardless of age, or every stream that ended ``after_hours`` ago.
+
+    Returns the number of events archived per stream.
+    """
+
+    if not stream_ids:
+        cutoff = datetime.now(timezone.utc) - timedelta(hours=after_hours)
+        async with engine.connect() as conn:
+            stream_ids = (
+                await conn.scalars(
+                    select(Stream.id)
+                    .where(Stream.end_at < cutoff, Stream.archived_at.is_(None))
+                    .order_by(Stream.end_at)
+                )
+            ).all()
+
+    archived: Dict[int, int] = {}
+    for stream_id in stream_ids:
+        count = await archive_stream(engine, store, stream_id, segment_rows=segment_rows)
+        if count is not None:
+            archived[stream_id] = count
+            _logger.info("Archived %d events of stream %d", count, stream_id)
+    return archived
+
+
+class ArchiveReader:
+    """Reads archived streams from memory-mapped segments.
+
+    Manifests and segments never change once written, so both are cached;
+    at most ``max_open_segments`` stay mapped.
+    """
+
+    def __init__(self, store: SegmentStore, *, max_open_segments: int = 64) -> None:
+        self._store = store
+        self._max_open_segments = max_open_segments
+        self._manifests: Dict[int, Dict[str, Any]] = {}
+        self._segments: "OrderedDict[str, Segment]" = OrderedDict()
+
+    async def manifest(self, stream_id: int) -> Dict[str, Any]:
+        manifest = self._manifests.get(stream_id)
+        if manifest is None:
+            data = await self._store.get(_manifest_key(stream_id))
+            if data is None:
+                raise FileNotFoundError(f"No archive for stream {stream_id}")
+            manifest = self._manifests[stream_id] = json.loads(data)
+        return manifest
+
+    async def _segment(self, key: str) -> Segment:
+        segment = self._segments.get(key)
+        if segment is not None:
+            self._segments.move_to_end(key)
+            return segment
+        path = await self._store.local_path(key)
+        segment = self._segments[key] = await asyncio.to_thread(Segment, path)
+        if len(self._segments) > self._max_open_segments:
+            # Not closed explicitly: a concurrent page may still be reading it.
+            self._segments.popitem(last=False)
+        return segment
+
+    async def events(
+        self,
+        stream_id: int,
+        *,
+        types: Sequence[str] = (),
+        cursor: Optional[Tuple[datetime, int]] = None,
+        username: Optional[str] = None,
+        min_gift_value: Optional[float] = None,
+        limit: int = 100,
+    ) -> List[Dict[str, Any]]:
+        """Return up to ``limit`` events after ``cursor`` shaped like ``EventOut``."""
+
+        position = (to_micros(cursor[0]), cursor[1]) if cursor else None
+        items: List[Dict[str, Any]] = []
+        for entry in (await self.manifest(stream_id))["segments"]:
+            if position is not None and tuple(entry["last"]) <= position:
+                continue
+            segment = await self._segment(entry["key"])
+            items += await asyncio.to_thread(
+                _scan, segment, position, types, username, min_gift_value, limit - len(items)
+            )
+            if len(items) >= limit:
+                break
+        return items
+
+    async def summary(self, stream_id: int) -> Dict[str, Dict[str, float]]:
+        """Event count and gift value per type, read from the type and value columns only."""
+
+        totals: Dict[str, Dict[str, float]] = {}
+        for entry in (await self.manifest(stream_id))["segments"]:
+            segment = await self._segment(entry["key"])
+            await asyncio.to_thread(_add_summary, segment, totals)
+        return totals
+
+
+def _scan(
+    segment: Segment,
+    position: Optional[Tuple[int, int]],
+    types: Sequence[str],
+    username: Optional[str],
+    min_gift_value: Optional[float],
+    limit: int,
+) -> List[Dict[str, Any]]:
+    ids = segment.column("id")
+    timestamps = segment.column("ts")
+    start = 0
+    if position is not None:
+        start = bisect_right(range(segment.rows), position, key=lambda index: (timestamps[index], ids[index]))
+
+    type_codes = segment.column("type")
+    wanted_types = segment.codes_for("type", types) if types else None
+    user_codes = segment.column("username") if username is not None else None
+    wanted_user = segment.codes_for("username", [username]) if username is not None else None
+    gift_values = segment.column("gift_value") if min_gift_value is not None else None
+
+    items: List[Dict[str, Any]] = []
+    for index in range(start, segment.rows):
+        if wanted_types is not None and type_codes[index] not in wanted_types:
+            continue
+        if wanted_user is not None and user_codes[index] not in wanted_user:
+            continue
+        # NaN (no gift value) compares False and is skipped as well.
+        if gift_values is not None and not gift_values[index] >= min_gift_value:
+            continue
+        columns = {name: segment.value(name, index) for name in ("username", "message", "gift_name")}
+        items.append(
+            {
+                "id": ids[index],
+                "stream_id": segment.footer["stream_id"],
+                "type": segment.value("type", index),
+                "payload_json": decode_payload(segment.value("payload_json", index), columns),
+                "ts": segment.value("ts", index),
+            }
+        )
+        if len(items) >= limit:
+            break
+    return items
+
+
+def _add_summary(segment: Segment, totals: Dict[str, Dict[str, float]]) -> None:
+    dictionary = segment.column("type.dict")
+    gift_values = segment.column("gift_value")
+    for code, value in zip(segment.column("type"), gift_values):
+        summary = totals.setdefault(dictionary[code], {"count": 0, "gift_value": 0.0})
+        summary["count"] += 1
+        if value == value:
+            summary["gift_value"] += value
+
+
+class EventArchiver:
+    """Background task running :func:`run_archive` on a fixed interval."""
+
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        store: SegmentStore,
+        *,
+        interval_seconds: float,
+        after_hours: float,
+        segment_rows: int,
+    ) -> None:
+        self._engine = engine
+        self._store = store
+        self._interval_seconds = interval_seconds
+        self._after_hours = after_hours
+        self._segment_rows = segment_rows
+        self._task: Optional[asyncio.Task[None]] = None
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await run_archive(
+                    self._engine,
+                    self._store,
+                    after_hours=self._after_hours,
+                    segment_rows=self._segment_rows,
+                )
+            except Exception:  # noqa: BLE001 - keep retrying on the next interval
+                _logger.exception("Event archiving failed")
+            await asyncio.sleep(self._interval_seconds)
+
+
+_store: Optional[SegmentStore] = None
+_reader: Optional[ArchiveReader] = None
+_archiver: Optional[EventArchiver] = None
+
+
+def get_segment_store() -> SegmentStore:
+    """Return the process-wide archive store."""
+
+    global _store
+    if _store is None:
+        if settings.event_archive_backend == "http":
+            _store = HttpSegmentStore(settings.event_archive_url, Path(settings.event_archive_cache_dir))
+        else:
+            _store = LocalSegmentStore(Path(settings.event_archive_dir))
+    return _store
+
+
+async def close_segment_store() -> None:
+    global _store, _reader
+    if _store is not None:
+        await _store.close()
+        _store = None
+        _reader = None
+
+
+def get_archive_reader() -> ArchiveReader:
+    """Return the process-wide archived stream reader."""
+
+    global _reader
+    if _reader is None:
+        _reader = ArchiveReader(get_segment_store())
+    return _reader
+
+
+def get_event_archiver() -> EventArchiver:
+    """Return the process-wide event archiving task."""
+
+    global _archiver
+    if _archiver is None:
+        _archiver = EventArchiver(
+            get_engine(),
+            get_segment_store(),
+            interval_seconds=settings.event_archive_interval_seconds,
+            after_hours=settings.event_archive_after_hours,
+            segment_rows=settings.event_archive_segment_rows,
+        )
+    return _archiver
+
+
+async def _main(stream_ids: List[int]) -> None:
+    engine = get_engine()
+    try:
+        archived = await run_archive(
+            engine,
+            get_segment_store(),
+            after_hours=settings.event_archive_after_hours,
+            segment_rows=settings.event_archive_segment_rows,
+            stream_ids=stream_ids,
+        )
+    finally:
+        await engine.dispose()
+    print(
+        "Archived streams: "
+        + (", ".join(f"{stream_id} ({count} events)" for stream_id, count in archived.items()) or "none")
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(_main([int(argument) for argument in sys.argv[1:]]))
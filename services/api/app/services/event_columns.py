@@ -0,0 +1,115 @@
+"""Promotion of hot payload fields to typed ``events`` columns.
+
+Adapters send the viewer name, chat text and gift details inside every
+payload, so storing the payload as-is repeats the same JSONB keys on every row
+and filters such as "gifts over X" or "messages by user" have to dig into
+JSONB. At insert time the extractors registered for an event's type move
+those fields into the ``username``, ``message``, ``gift_name`` and
+``gift_value`` columns and only the rest of the payload is kept in
+``payload_json``.
+
+The encoding is lossless: :func:`decode_payload` puts the promoted fields
+back under the keys they came from. Fields found under the key the TikTok
+adapter uses cost nothing extra; any other key name is remembered in a small
+``"~keys"`` object inside the stored payload. ``gift_value`` (``value`` x
+``amount``) is derived rather than moved, so it never needs restoring.
+"""
+
+from __future__ import annotations
+
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+from app.services.stream_stats import gift_value
+
+ALIASES_KEY = "~keys"
+HOT_COLUMNS = ("username", "message", "gift_name", "gift_value")
+
+# Payload keys each promoted column is taken from, canonical key first.
+PAYLOAD_KEYS: Dict[str, Tuple[str, ...]] = {
+    "username": ("username", "user", "author"),
+    "message": ("message", "text"),
+    "gift_name": ("giftName", "gift_name", "gift"),
+}
+
+# Called with the payload being stripped and the non-canonical keys used so
+# far; returns the columns it filled.
+Extractor = Callable[[Dict[str, Any], Dict[str, str]], Dict[str, Any]]
+
+_EXTRACTORS: Dict[str, List[Extractor]] = {}
+_ALL_TYPES = "*"
+
+
+def register_extractor(*event_types: str) -> Callable[[Extractor], Extractor]:
+    """Register an extractor for ``event_types``; ``"*"`` applies to every type."""
+
+    def decorator(extractor: Extractor) -> Extractor:
+        for event_type in event_types:
+            _EXTRACTORS.setdefault(event_type, []).append(extractor)
+        return extractor
+
+    return decorator
+
+
+def take(payload: Dict[str, Any], aliases: Dict[str, str], column: str) -> Optional[str]:
+    """Remove and return the first non-empty string stored under ``column``'s keys."""
+
+    keys = PAYLOAD_KEYS[column]
+    for key in keys:
+        value = payload.get(key)
+        if isinstance(value, str) and value:
+            del payload[key]
+            if key != keys[0]:
+                aliases[column] = key
+            return value
+    return None
+
+
+@register_extractor(_ALL_TYPES)
+def author_columns(payload: Dict[str, Any], aliases: Dict[str, str]) -> Dict[str, Any]:
+    return {"username": take(payload, aliases, "username")}
+
+
+@register_extractor("chat")
+def chat_columns(payload: Dict[str, Any], aliases: Dict[str, str]) -> Dict[str, Any]:
+    return {"message": take(payload, aliases, "message")}
+
+
+@register_extractor("gift")
+def gift_columns(payload: Dict[str, Any], aliases: Dict[str, str]) -> Dict[str, Any]:
+    value = payload.get("value")
+    total = None
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        total = Decimal(str(gift_value(payload)))
+    return {"gift_name": take(payload, aliases, "gift_name"), "gift_value": total}
+
+
+def encode_event(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Return ``row`` with hot fields moved from ``payload_json`` to their columns.
+
+    Every returned row carries all :data:`HOT_COLUMNS`, so a batch stays a
+    single executemany.
+    """
+
+    payload = dict(row["payload_json"])
+    aliases: Dict[str, str] = {}
+    columns: Dict[str, Any] = dict.fromkeys(HOT_COLUMNS)
+    for extractor in _EXTRACTORS.get(_ALL_TYPES, ()):
+        columns.update(extractor(payload, aliases))
+    for extractor in _EXTRACTORS.get(row["type"], ()):
+        columns.update(extractor(payload, aliases))
+    if aliases:
+        payload[ALIASES_KEY] = aliases
+    return {**row, **columns, "payload_json": payload}
+
+
+def decode_payload(payload: Mapping[str, Any], columns: Mapping[str, Any]) -> Dict[str, Any]:
+    """Rebuild the payload an event was ingested with from its stored form."""
+
+    restored = dict(payload)
+    aliases = restored.pop(ALIASES_KEY, None) or {}
+    for column, keys in PAYLOAD_KEYS.items():
+        value = columns.get(column)
+        if value is not None:
+            restored[aliases.get(column, keys[0])] = value
+    return restored
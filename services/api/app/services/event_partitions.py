@@ -0,0 +1,318 @@
+"""Partition maintenance for the ``events`` table.
+
+Keeps daily partitions created ahead of time and enforces retention by first
+rolling expired partitions up into ``event_rollups`` and then dropping them.
+Runs periodically inside the API (see :class:`PartitionMaintenance`) or once
+from cron with ``python -m app.services.event_partitions``.
+
+Detaching a partition takes an ``ACCESS EXCLUSIVE`` lock on ``events``
+(``DETACH ... CONCURRENTLY`` is not available because ``events`` has a default
+partition). The detach therefore runs in its own transaction under
+``EVENT_PARTITION_LOCK_TIMEOUT_MS``: ingest waits at most that long behind it,
+and a detach that cannot get the lock in time is retried on the next run. The
+detached table is then rolled up and dropped in a second transaction that does
+not touch ``events``; a run interrupted in between is finished by the next one.
+
+Rows in ``events_default`` (events for days without a partition, e.g. late
+events for days already dropped) are rolled up and deleted once they are past
+retention as well; the rows left there are exported as
+``events_default_partition_rows`` and logged.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from app.config import settings
+from app.metrics import Gauge
+from app.models.base import get_engine
+
+_PARTITION_PREFIX = "events_p"
+# Arbitrary constant identifying the maintenance job for pg_try_advisory_lock
+_ADVISORY_LOCK_KEY = 7_305_412
+
+EVENTS_DEFAULT_PARTITION_ROWS = Gauge(
+    "events_default_partition_rows",
+    "Rows in events_default (events for days without a partition) after the last maintenance run.",
+)
+
+_logger = logging.getLogger(__name__)
+
+_ROLLUP_SQL = """
+INSERT INTO event_rollups (stream_id, minute, type, event_count, gift_value)
+SELECT
+    stream_id,
+    date_trunc('minute', ts) AS minute,
+    type,
+    count(*) AS event_count,
+    COALESCE(sum(gift_value), 0) AS gift_value
+FROM {source}
+GROUP BY stream_id, date_trunc('minute', ts), type
+ON CONFLICT (stream_id, minute, type) DO UPDATE SET
+    event_count = event_rollups.event_count + EXCLUDED.event_count,
+    gift_value = event_rollups.gift_value + EXCLUDED.gift_value
+"""
+
+
+# One statement, so rows inserted meanwhile are either rolled up and deleted or left alone.
+_EXPIRE_DEFAULT_SQL = (
+    "WITH expired AS (DELETE FROM events_default WHERE ts < :cutoff "
+    "RETURNING stream_id, ts, type, gift_value) " + _ROLLUP_SQL.format(source="expired")
+)
+
+
+def partition_day(name: str) -> Optional[date]:
+    """Return the day covered by a daily partition name such as ``events_p20250924``."""
+
+    if not name.startswith(_PARTITION_PREFIX):
+        return None
+    try:
+        return datetime.strptime(name[len(_PARTITION_PREFIX):], "%Y%m%d").date()
+    except ValueError:
+        return None
+
+
+async def ensure_partitions(conn: AsyncConnection, days_ahead: int) -> List[str]:
+    """Create the daily partitions from today up to ``days_ahead`` days in the future."""
+
+    today = datetime.now(timezone.utc).date()
+    created: List[str] = []
+    for offset in range(days_ahead + 1):
+        name = await conn.scalar(
+            text("SELECT create_events_partition(:day)"),
+            {"day": today + timedelta(days=offset)},
+        )
+        created.append(name)
+    return created
+
+
+async def list_partitions(conn: AsyncConnection) -> List[str]:
+    result = await conn.execute(
+        text(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE parent.relname = 'events' ORDER BY child.relname"
+        )
+    )
+    return [row[0] for row in result]
+
+
+async def list_detached(conn: AsyncConnection) -> List[str]:
+    """Daily partition tables already detached from ``events`` but not dropped yet."""
+
+    result = await conn.execute(
+        text(
+            "SELECT relname FROM pg_class "
+            "WHERE relkind = 'r' AND relnamespace = to_regnamespace(current_schema()) "
+            "AND relname LIKE :prefix "
+            "AND NOT EXISTS (SELECT 1 FROM pg_inherits WHERE inhrelid = pg_class.oid) "
+            "ORDER BY relname"
+        ),
+        {"prefix": f"{_PARTITION_PREFIX}%"},
+    )
+    return [row[0] for row in result if partition_day(row[0]) is not None]
+
+
+async def rollup_stream(conn: AsyncConnection, stream_id: int) -> None:
+    """Roll one stream's events up into ``event_rollups`` before they are removed."""
+
+    await conn.execute(
+        text(_ROLLUP_SQL.format(source="events WHERE stream_id = :stream_id")),
+        {"stream_id": stream_id},
+    )
+
+
+async def detach_partition(conn: AsyncConnection, name: str, *, lock_timeout_ms: int) -> None:
+    """Detach a partition, waiting at most ``lock_timeout_ms`` for the lock on ``events``.
+
+    Must run in a transaction of its own, which holds the lock until it commits.
+    """
+
+    if partition_day(name) is None:
+        raise ValueError(f"Not a daily events partition: {name}")
+    await conn.execute(text(f"SET LOCAL lock_timeout = {int(lock_timeout_ms)}"))
+    await conn.execute(text(f"ALTER TABLE events DETACH PARTITION {name}"))
+
+
+async def expire_partition(conn: AsyncConnection, name: str) -> None:
+    """Roll a detached partition up into ``event_rollups`` and drop it."""
+
+    if partition_day(name) is None:
+        raise ValueError(f"Not a daily events partition: {name}")
+    await conn.execute(text(_ROLLUP_SQL.format(source=name)))
+    await conn.execute(text(f"DROP TABLE {name}"))
+
+
+async def expire_default_rows(conn: AsyncConnection, cutoff: date) -> int:
+    """Roll up and delete ``events_default`` rows before ``cutoff``; returns the rows left."""
+
+    await conn.execute(
+        text(_EXPIRE_DEFAULT_SQL),
+        {"cutoff": datetime.combine(cutoff, datetime.min.time(), timezone.utc)},
+    )
+    return await conn.scalar(text("SELECT count(*) FROM events_default"))
+
+
+async def run_maintenance(
+    engine: AsyncEngine,
+    *,
+    days_ahead: int,
+    retention_days: int,
+    lock_timeout_ms: int = 1000,
+) -> List[str]:
+    """Create upcoming partitions and expire those older than ``retention_days``.
+
+    Returns the names of the expired partitions. Only one worker performs the
+    maintenance at a time; the others return immediately. The lock is held at
+    session level on one connection for the whole run, since every partition
+    is expired in its own transaction.
+    """
+
+    async with engine.connect() as conn:
+        locked = await conn.scalar(
+            text("SELECT pg_try_advisory_lock(:key)"), {"key": _ADVISORY_LOCK_KEY}
+        )
+        await conn.commit()
+        if not locked:
+            return []
+        try:
+            return await _maintain(
+                conn,
+                days_ahead=days_ahead,
+                retention_days=retention_days,
+                lock_timeout_ms=lock_timeout_ms,
+            )
+        finally:
+            # A pooled connection would otherwise keep the lock after it is returned.
+            await conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": _ADVISORY_LOCK_KEY})
+            await conn.commit()
+
+
+async def _maintain(
+    conn: AsyncConnection, *, days_ahead: int, retention_days: int, lock_timeout_ms: int
+) -> List[str]:
+    async with conn.begin():
+        await ensure_partitions(conn, days_ahead)
+        partitions = await list_partitions(conn)
+
+    cutoff = datetime.now(timezone.utc).date() - timedelta(days=retention_days)
+    for name in partitions:
+        day = partition_day(name)
+        if day is None or day >= cutoff:
+            continue
+        try:
+            async with conn.begin():
+                await detach_partition(conn, name, lock_timeout_ms=lock_timeout_ms)
+        except DBAPIError as exc:
+            _logger.warning("Could not detach events partition %s, retrying next run: %s", name, exc)
+
+    async with conn.begin():
+        detached = await list_detached(conn)
+    expired: List[str] = []
+    for name in detached:
+        # One transaction per partition: the rollup and the drop commit together.
+        async with conn.begin():
+            await expire_partition(conn, name)
+        expired.append(name)
+        _logger.info("Rolled up and dropped events partition %s", name)
+
+    async with conn.begin():
+        remaining = await expire_default_rows(conn, cutoff)
+    EVENTS_DEFAULT_PARTITION_ROWS.set(remaining)
+    if remaining:
+        _logger.warning(
+            "events_default holds %d events of days without a partition; "
+            "they are rolled up and deleted once past retention",
+            remaining,
+        )
+    return expired
+
+
+class PartitionMaintenance:
+    """Background task running :func:`run_maintenance` on a fixed interval."""
+
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        *,
+        interval_seconds: float,
+        days_ahead: int,
+        retention_days: int,
+        lock_timeout_ms: int,
+    ) -> None:
+        self._engine = engine
+        self._interval_seconds = interval_seconds
+        self._days_ahead = days_ahead
+        self._retention_days = retention_days
+        self._lock_timeout_ms = lock_timeout_ms
+        self._task: Optional[asyncio.Task[None]] = None
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await run_maintenance(
+                    self._engine,
+                    days_ahead=self._days_ahead,
+                    retention_days=self._retention_days,
+                    lock_timeout_ms=self._lock_timeout_ms,
+                )
+            except Exception:  # noqa: BLE001 - keep retrying on the next interval
+                _logger.exception("Events partition maintenance failed")
+            await asyncio.sleep(self._interval_seconds)
+
+
+_maintenance: Optional[PartitionMaintenance] = None
+
+
+def get_partition_maintenance() -> PartitionMaintenance:
+    """Return the process-wide partition maintenance task."""
+
+    global _maintenance
+    if _maintenance is None:
+        _maintenance = PartitionMaintenance(
+            get_engine(),
+            interval_seconds=settings.event_partition_interval_seconds,
+            days_ahead=settings.event_partition_days_ahead,
+            retention_days=settings.event_retention_days,
+            lock_timeout_ms=settings.event_partition_lock_timeout_ms,
+        )
+    return _maintenance
+
+
+async def _main() -> None:
+    engine = get_engine()
+    try:
+        expired = await run_maintenance(
+            engine,
+            days_ahead=settings.event_partition_days_ahead,
+            retention_days=settings.event_retention_days,
+            lock_timeout_ms=settings.event_partition_lock_timeout_ms,
+        )
+    finally:
+        await engine.dispose()
+    print(f"Expired partitions: {', '.join(expired) or 'none'}")
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.config import settings
+from app.db import async_session_maker
+from app.models import Stream
+from app.models.event import Event
+from app.services.event_columns import encode_event
+
+EventRow = Dict[str, Any]
+
+DURABILITY_FLUSH = "flush"
+DURABILITY_ENQUEUE = "enqueue"
+
+_logger = logging.getLogger(__name__)
+
+# Waiters resolve to whether the row was stored (False: its stream is archived).
+_PendingRow = Tuple[EventRow, Optional["asyncio.Future[bool]"]]
+
+
+async def insert_events(session: AsyncSession, rows: Sequence[EventRow]) -> List[EventRow]:
+    """Insert event rows with a single executemany statement and commit.
+
+    Hot payload fields are moved to their typed columns on the way in. Rows of
+    archived streams are not inserted and are returned instead: their history
+    is served from the archive, where new rows would never show up. The stream
+    rows are locked ``FOR KEY SHARE`` (the lock the foreign key takes anyway)
+    before checking, so an archive job either committed first or waits for
+    this insert and archives the new rows too.
+    """
+
+    if not rows:
+        return []
+    stream_ids = sorted({row["stream_id"] for row in rows})
+    streams = await session.execute(
+        select(Stream.id, Stream.archived_at)
+        .where(Stream.id.in_(stream_ids))
+        .order_by(Stream.id)
+        .with_for_update(key_share=True)
+    )
+    archived = {stream_id for stream_id, archived_at in streams.all() if archived_at is not None}
+    stored = [row for row in rows if row["stream_id"] not in archived]
+    if stored:
+        await session.execute(insert(Event), [encode_event(row) for row in stored])
+    await session.commit()
+    return [row for row in rows if row["stream_id"] in archived]
+
+
+class EventWriter:
+    """Write-behind buffer that persists events in size/time bounded micro-batches.
+
+    With ``durability="flush"`` callers are acknowledged once the batch holding
+    their rows is committed; with ``durability="enqueue"`` they return as soon as
+    the rows are queued and a failed flush is only logged. The queue is bounded,
+    so producers wait when the database falls behind. Rows of archived streams
+    are skipped as in :func:`insert_events`.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        *,
+        max_batch: int,
+        max_delay_seconds: float,
+        max_pending: int,
+        durability: str,
+    ) -> None:
+        if durability not in (DURABILITY_FLUSH, DURABILITY_ENQUEUE):
+            raise ValueError(f"Unsupported event buffer durability: {durability}")
+
+        self._session_factory = session_factory
+        self._max_batch = max_batch
+        self._max_delay_seconds = max_delay_seconds
+        self._durability = durability
+        self._queue: asyncio.Queue[_PendingRow] = asyncio.Queue(maxsize=max_pending)
+        self._batch_ready = asyncio.Event()
+        self._task: Optional[asyncio.Task[None]] = None
+        self._stats = {"flushes": 0, "rows_written": 0, "rows_failed": 0, "rows_archived": 0}
+
+    def stats(self) -> Dict[str, int]:
+        return {**self._stats, "pending": self._queue.qsize()}
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the flusher after writing everything still queued."""
+
+        if self._task is None:
+            return
+        self._batch_ready.set()
+        await self._queue.join()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def write(self, rows: Sequence[EventRow]) -> List[EventRow]:
+        """Queue ``rows``; with ``durability="flush"`` returns those of archived streams."""
+
+        loop = asyncio.get_running_loop()
+        waiters: List[asyncio.Future[bool]] = []
+        for row in rows:
+            waiter = loop.create_future() if self._durability == DURABILITY_FLUSH else None
+            await self._queue.put((row, waiter))
+            if self._queue.qsize() >= self._max_batch:
+                self._batch_ready.set()
+            if waiter is not None:
+                waiters.append(waiter)
+
+        if not waiters:
+            return []
+        stored = await asyncio.gather(*waiters)
+        return [row for row, row_stored in zip(rows, stored) if not row_stored]
+
+    def _drain(self, limit: int) -> List[_PendingRow]:
+        batch: List[_PendingRow] = []
+        while len(batch) < limit and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            if self._queue.qsize() + 1 < self._max_batch:
+                self._batch_ready.clear()
+                try:
+                    await asyncio.wait_for(self._batch_ready.wait(), self._max_delay_seconds)
+                except asyncio.TimeoutError:
+                    pass
+            batch.extend(self._drain(self._max_batch - 1))
+            try:
+                await self._flush(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _flush(self, batch: List[_PendingRow]) -> None:
+        if not batch:
+            return
+
+        rows = [row for row, _ in batch]
+        try:
+            async with self._session_factory() as session:
+                skipped = await insert_events(session, rows)
+        except Exception as exc:  # noqa: BLE001 - surfaced to waiters or logged below
+            self._stats["rows_failed"] += len(rows)
+            _logger.error("Failed to flush %d buffered events: %s", len(rows), exc)
+            for _, waiter in batch:
+                if waiter is not None and not waiter.done():
+                    waiter.set_exception(exc)
+            return
+
+        skipped_ids = {id(row) for row in skipped}
+        if skipped:
+            _logger.warning("Skipped %d buffered events of archived streams", len(skipped))
+        self._stats["flushes"] += 1
+        self._stats["rows_written"] += len(rows) - len(skipped)
+        self._stats["rows_archived"] += len(skipped)
+        for row, waiter in batch:
+            if waiter is not None and not waiter.done():
+                waiter.set_result(id(row) not in skipped_ids)
+
+
+_event_writer: Optional[EventWriter] = None
+
+
+def get_event_writer() -> EventWriter:
+    """Return the process-wide write-behind event buffer."""
+
+    global _event_writer
+    if _event_writer is None:
+        _event_writer = EventWriter(
+            async_session_maker,
+            max_batch=settings.event_buffer_max_batch,
+            max_delay_seconds=settings.event_buffer_max_delay_ms / 1000,
+            max_pending=settings.event_buffer_max_pending,
+            durability=settings.event_buffer_durability,
+        )
+    return _event_writer
@@ -0,0 +1,220 @@
+"""Streaming bulk import and export of the product catalog.
+
+Imports parse CSV or NDJSON as the request body arrives, validate every row
+against :class:`~app.schemas.product.ProductIn` and upsert valid rows in
+chunks keyed on ``(user_id, url)``. Exports stream rows from a server-side
+cursor. Neither direction holds the whole catalog in memory.
+"""
+
+from __future__ import annotations
+
+import codecs
+import csv
+import io
+import json
+from typing import Any, AsyncIterator, Dict, Iterable, List, Literal, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import literal_column, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.product import Product
+from app.schemas.product import ProductImportError, ProductImportReport, ProductIn, ProductOut
+
+ProductFormat = Literal["csv", "ndjson"]
+
+CSV_COLUMNS = ("title", "price", "url", "image", "tags", "stock_info")
+# Tags are a single CSV cell, separated by this character.
+CSV_TAG_SEPARATOR = "|"
+
+IMPORT_CHUNK_SIZE = 1000
+EXPORT_FETCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 100
+
+_UPSERT_COLUMNS = ("title", "price", "image", "tags", "stock_info")
+
+
+async def _iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Decode a byte stream into lines, keeping their line terminators."""
+
+    buffer = ""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line + "\n"
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield buffer
+
+
+async def _iter_ndjson(lines: AsyncIterator[str]) -> AsyncIterator[Tuple[int, Any]]:
+    line_no = 0
+    async for line in lines:
+        line_no += 1
+        if not line.strip():
+            continue
+        try:
+            yield line_no, json.loads(line)
+        except json.JSONDecodeError as exc:
+            yield line_no, exc
+
+
+async def _iter_csv(lines: AsyncIterator[str]) -> AsyncIterator[Tuple[int, Any]]:
+    header: Optional[List[str]] = None
+    record = ""
+    record_no = 0
+    async for line in lines:
+        record += line
+        # A quoted field may span several lines; wait until its quotes balance.
+        if record.count('"') % 2:
+            continue
+        values = next(csv.reader([record]), [])
+        record = ""
+        if not any(value.strip() for value in values):
+            continue
+        if header is None:
+            header = [name.strip().lower() for name in values]
+            continue
+        record_no += 1
+        if len(values) > len(header):
+            yield record_no, ValueError(f"expected {len(header)} columns, got {len(values)}")
+            continue
+        yield record_no, _csv_row(dict(zip(header, values)))
+    if record:
+        yield record_no + 1, ValueError("unterminated quoted field")
+
+
+def _csv_row(raw: Dict[str, str]) -> Dict[str, Any]:
+    row: Dict[str, Any] = {name: value for name, value in raw.items() if value != ""}
+    tags = raw.get("tags", "")
+    row["tags"] = [tag.strip() for tag in tags.split(CSV_TAG_SEPARATOR) if tag.strip()]
+    return row
+
+
+def _error_message(exc: Exception) -> str:
+    if isinstance(exc, ValidationError):
+        return "; ".join(
+            f"{'.'.join(str(part) for part in error['loc']) or 'row'}: {error['msg']}"
+            for error in exc.errors()
+        )
+    return str(exc)
+
+
+def _product_values(user_id: int, payload: ProductIn) -> Dict[str, Any]:
+    return {
+        "user_id": user_id,
+        "title": payload.title,
+        "price": payload.price,
+        "url": str(payload.url),
+        "image": str(payload.image) if payload.image else None,
+        "tags": list(payload.tags),
+        "stock_info": payload.stock_info,
+    }
+
+
+async def _upsert(session: AsyncSession, rows: Iterable[Dict[str, Any]]) -> Tuple[int, int]:
+    """Upsert one chunk and return ``(inserted, updated)`` counts."""
+
+    # Postgres refuses to update the same row twice in one statement, so the
+    # last occurrence of a URL within the chunk wins.
+    unique = list({row["url"]: row for row in rows}.values())
+    stmt = insert(Product).values(unique)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Product.user_id, Product.url],
+        set_={name: stmt.excluded[name] for name in _UPSERT_COLUMNS},
+    ).returning(literal_column("xmax = 0"))
+    flags = (await session.scalars(stmt)).all()
+    await session.commit()
+    inserted = sum(1 for flag in flags if flag)
+    return inserted, len(flags) - inserted
+
+
+async def import_products(
+    session: AsyncSession,
+    user_id: int,
+    chunks: AsyncIterator[bytes],
+    fmt: ProductFormat,
+    *,
+    chunk_size: int = IMPORT_CHUNK_SIZE,
+    report: Optional[ProductImportReport] = None,
+) -> ProductImportReport:
+    """Validate and upsert products from a CSV or NDJSON byte stream.
+
+    Each chunk is committed on its own, so rows loaded before a failure stay
+    loaded; pass ``report`` to see what was committed if a later chunk raises.
+    Invalid rows are skipped and reported by their line (NDJSON) or record
+    (CSV, header excluded) number.
+    """
+
+    report = report if report is not None else ProductImportReport()
+    pending: List[Dict[str, Any]] = []
+    parser = _iter_csv if fmt == "csv" else _iter_ndjson
+
+    async for row_no, raw in parser(_iter_lines(chunks)):
+        try:
+            if isinstance(raw, Exception):
+                raise raw
+            pending.append(_product_values(user_id, ProductIn.model_validate(raw)))
+        except (ValidationError, ValueError) as exc:
+            report.failed += 1
+            if len(report.errors) < MAX_REPORTED_ERRORS:
+                report.errors.append(ProductImportError(row=row_no, error=_error_message(exc)))
+            continue
+        if len(pending) >= chunk_size:
+            inserted, updated = await _upsert(session, pending)
+            report.inserted += inserted
+            report.updated += updated
+            pending = []
+
+    if pending:
+        inserted, updated = await _upsert(session, pending)
+        report.inserted += inserted
+        report.updated += updated
+    return report
+
+
+async def export_products(
+    session: AsyncSession,
+    user_id: int,
+    fmt: ProductFormat,
+) -> AsyncIterator[str]:
+    """Yield the catalog as CSV or NDJSON text, one fetched partition at a time."""
+
+    stmt = (
+        select(Product)
+        .where(Product.user_id == user_id)
+        .order_by(Product.id)
+        .execution_options(yield_per=EXPORT_FETCH_SIZE)
+    )
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        writer.writerow(("id",) + CSV_COLUMNS)
+        yield buffer.getvalue()
+
+    result = await session.stream_scalars(stmt)
+    async for partition in result.partitions():
+        products = [ProductOut.model_validate(product) for product in partition]
+        if fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer, lineterminator="\n")
+            for product in products:
+                writer.writerow(
+                    (
+                        product.id,
+                        product.title,
+                        product.price,
+                        product.url,
+                        product.image or "",
+                        CSV_TAG_SEPARATOR.join(product.tags),
+                        product.stock_info or "",
+                    )
+                )
+            yield buffer.getvalue()
+        else:
+            yield "".join(
+                product.model_dump_json(exclude={"user_id"}) + "\n" for product in products
+            )
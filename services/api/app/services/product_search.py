@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+from typing import Sequence
+
+from sqlalchemy import Select, cast, func, literal, literal_column, or_, select
+from sqlalchemy.dialects.postgresql import JSONB
+
+from app.models.product import Product
+
+# The "simple" configuration avoids language-specific stemming, which would
+# mangle mixed Indonesian/English product titles. It is rendered inline so the
+# expression matches the ix_products_title_fts index definition.
+_TS_CONFIG = literal_column("'simple'::regconfig")
+
+
+def title_tsvector():
+    return func.to_tsvector(_TS_CONFIG, Product.title)
+
+
+def build_search_query(user_id: int, query: str, tags: Sequence[str]) -> Select:
+    """Select ``(Product, score)`` rows matching ``query`` and containing every tag.
+
+    Titles match by trigram similarity, substring or full-text terms (all served
+    by the indexes from migration 202409240007); results are ranked by the best
+    of the trigram and full-text scores. Without a query, matches are ordered
+    newest first.
+    """
+
+    stmt = select(Product).where(Product.user_id == user_id)
+    if tags:
+        stmt = stmt.where(Product.tags.op("@>")(cast(list(tags), JSONB)))
+
+    query = query.strip()
+    if not query:
+        return stmt.add_columns(literal(0.0).label("score")).order_by(
+            Product.created_at.desc(), Product.id.desc()
+        )
+
+    ts_query = func.plainto_tsquery(_TS_CONFIG, query)
+    score = func.greatest(
+        func.similarity(Product.title, query),
+        func.ts_rank(title_tsvector(), ts_query),
+    ).label("score")
+    return (
+        stmt.add_columns(score)
+        .where(
+            or_(
+                Product.title.op("%")(query),
+                Product.title.ilike(f"%{_escape_like(query)}%", escape="\\"),
+                title_tsvector().op("@@")(ts_query),
+            )
+        )
+        .order_by(score.desc(), Product.id.desc())
+    )
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
@@ -0,0 +1,245 @@
+"""Cooldowns and token buckets that throttle rule firings.
+
+A popular trigger can match thousands of chat messages a minute; without a
+limit each match becomes an identical broadcast. Every rule may carry limits
+in its ``params_json``:
+
+``cooldown_seconds``
+    Minimum time between two firings of the rule on the same stream.
+``max_per_minute`` / ``burst``
+    Token bucket refilled at ``max_per_minute`` with room for ``burst``
+    firings (default 1) on the same stream.
+
+``RULE_STREAM_MAX_PER_MINUTE`` and ``RULE_STREAM_BURST`` additionally cap the
+firings of all rules together on one stream. A firing is sent only if every
+bucket it draws from has a token; otherwise no bucket is charged.
+
+Buckets live in a compact in-process table. With ``RULE_LIMITER_BACKEND=redis``
+a firing the local table admits is also checked against buckets shared by all
+workers, so the limits hold across the deployment; the local check comes first
+because a bucket this worker has emptied is empty globally too. When the shared
+buckets deny the firing, the local tokens are given back.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from typing import Any, Dict, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.config import settings
+from app.redis_client import get_redis
+
+_KEY_PREFIX = "rule:limits:"
+_REDIS_RETRY_SECONDS = 5.0
+_MIN_SWEEP_SIZE = 1024
+
+# KEYS are the buckets, ARGV the current time then capacity and refill rate per bucket.
+# Returns 0 when admitted, otherwise the 1-based index of the first empty bucket.
+_ACQUIRE_SCRIPT = """
+local now = tonumber(ARGV[1])
+local tokens = {}
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[i * 2])
+    local rate = tonumber(ARGV[i * 2 + 1])
+    local bucket = redis.call('HMGET', key, 't', 'u')
+    local available = tonumber(bucket[1]) or capacity
+    local updated = tonumber(bucket[2]) or now
+    available = math.min(capacity, available + math.max(0, now - updated) * rate)
+    if available < 1 then
+        return i
+    end
+    tokens[i] = available
+end
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[i * 2])
+    local rate = tonumber(ARGV[i * 2 + 1])
+    redis.call('HSET', key, 't', tokens[i] - 1, 'u', now)
+    redis.call('PEXPIRE', key, math.ceil(capacity / rate * 1000) + 1000)
+end
+return 0
+"""
+
+_logger = logging.getLogger(__name__)
+
+
+class BucketSpec(NamedTuple):
+    capacity: float
+    refill_per_second: float
+
+
+def _positive_number(params: Mapping[str, Any], name: str) -> Optional[float]:
+    value = params.get(name)
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value <= 0:
+        raise ValueError(f"{name} must be a positive number")
+    return float(value)
+
+
+def rule_limits(params: Mapping[str, Any]) -> Tuple[BucketSpec, ...]:
+    """Return the buckets configured by a rule's ``params_json``.
+
+    Raises :class:`ValueError` for malformed limit values.
+    """
+
+    limits: List[BucketSpec] = []
+    cooldown = _positive_number(params, "cooldown_seconds")
+    if cooldown is not None:
+        limits.append(BucketSpec(1.0, 1.0 / cooldown))
+    per_minute = _positive_number(params, "max_per_minute")
+    burst = _positive_number(params, "burst")
+    if per_minute is not None:
+        limits.append(BucketSpec(max(burst or 1.0, 1.0), per_minute / 60.0))
+    elif burst is not None:
+        raise ValueError("burst requires max_per_minute")
+    return tuple(limits)
+
+
+class LocalBuckets:
+    """Token buckets keyed by string, stored as ``(tokens, updated_at, full_at)``.
+
+    Buckets that have refilled completely are indistinguishable from new ones,
+    so they are swept once the table doubles in size.
+    """
+
+    __slots__ = ("_buckets", "_next_sweep")
+
+    def __init__(self) -> None:
+        self._buckets: Dict[str, Tuple[float, float, float]] = {}
+        self._next_sweep = _MIN_SWEEP_SIZE
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def acquire(self, buckets: Sequence[Tuple[str, BucketSpec]], now: float) -> int:
+        """Take a token from every bucket, or from none.
+
+        Returns 0 when admitted, otherwise the 1-based index of the first empty bucket.
+        """
+
+        available: List[float] = []
+        for index, (key, spec) in enumerate(buckets, start=1):
+            state = self._buckets.get(key)
+            if state is None or now >= state[2]:
+                tokens = spec.capacity
+            else:
+                tokens = min(spec.capacity, state[0] + (now - state[1]) * spec.refill_per_second)
+            if tokens < 1.0:
+                return index
+            available.append(tokens)
+
+        for (key, spec), tokens in zip(buckets, available):
+            tokens -= 1.0
+            full_at = now + (spec.capacity - tokens) / spec.refill_per_second
+            self._buckets[key] = (tokens, now, full_at)
+        if len(self._buckets) >= self._next_sweep:
+            self._sweep(now)
+        return 0
+
+    def refund(self, buckets: Sequence[Tuple[str, BucketSpec]], now: float) -> None:
+        """Give back the token a successful :meth:`acquire` took from every bucket."""
+
+        for key, spec in buckets:
+            state = self._buckets.get(key)
+            if state is None or now >= state[2]:
+                continue
+            tokens = min(spec.capacity, state[0] + (now - state[1]) * spec.refill_per_second + 1.0)
+            full_at = now + (spec.capacity - tokens) / spec.refill_per_second
+            self._buckets[key] = (tokens, now, full_at)
+
+    def _sweep(self, now: float) -> None:
+        self._buckets = {key: state for key, state in self._buckets.items() if now < state[2]}
+        self._next_sweep = max(_MIN_SWEEP_SIZE, len(self._buckets) * 2)
+
+
+class RuleRateLimiter:
+    """Decides whether a matched rule may fire on a stream."""
+
+    def __init__(
+        self,
+        redis: Optional[Redis],
+        *,
+        stream_limit: Optional[BucketSpec],
+    ) -> None:
+        self._redis = redis
+        self._script = redis.register_script(_ACQUIRE_SCRIPT) if redis is not None else None
+        self._stream_limit = stream_limit
+        self._local = LocalBuckets()
+        self._redis_down_until = 0.0
+        self._stats = {"allowed": 0, "suppressed": 0}
+
+    async def acquire(
+        self,
+        stream_id: int,
+        rule_key: str,
+        limits: Sequence[BucketSpec],
+    ) -> Optional[str]:
+        """Charge the rule's and the stream's buckets for one firing.
+
+        Returns ``None`` when the firing may be sent, otherwise the scope of the
+        limit that suppressed it (``"rule"`` or ``"stream"``).
+        """
+
+        buckets = [(f"{stream_id}:{rule_key}:{index}", spec) for index, spec in enumerate(limits)]
+        if self._stream_limit is not None:
+            buckets.append((str(stream_id), self._stream_limit))
+        if not buckets:
+            self._stats["allowed"] += 1
+            return None
+
+        now = time.monotonic()
+        denied = self._local.acquire(buckets, now)
+        if not denied and self._script is not None:
+            denied = await self._acquire_shared(buckets)
+            if denied:
+                # The firing is not sent, so this worker's buckets keep their tokens.
+                self._local.refund(buckets, now)
+        if denied:
+            self._stats["suppressed"] += 1
+            # The stream bucket, when configured, is always the last one.
+            return "rule" if denied <= len(limits) else "stream"
+        self._stats["allowed"] += 1
+        return None
+
+    async def _acquire_shared(self, pairs: Sequence[Tuple[str, BucketSpec]]) -> int:
+        now = time.time()
+        if now < self._redis_down_until:
+            return 0
+        args: List[float] = [now]
+        for _, spec in pairs:
+            args.extend(spec)
+        try:
+            return int(await self._script(keys=[_KEY_PREFIX + key for key, _ in pairs], args=args))
+        except (RedisError, OSError) as exc:
+            # Until Redis is back each worker enforces the limits on its own.
+            _logger.warning("Shared rule limits unavailable, using local limits: %s", exc)
+            self._redis_down_until = now + _REDIS_RETRY_SECONDS
+            return 0
+
+    def stats(self) -> Dict[str, int]:
+        return {**self._stats, "buckets": len(self._local)}
+
+
+_limiter: Optional[RuleRateLimiter] = None
+
+
+def get_rule_limiter() -> RuleRateLimiter:
+    """Return the process-wide rule firing limiter."""
+
+    global _limiter
+    if _limiter is None:
+        stream_limit = None
+        if settings.rule_stream_max_per_minute > 0:
+            stream_limit = BucketSpec(
+                max(float(settings.rule_stream_burst), 1.0),
+                settings.rule_stream_max_per_minute / 60.0,
+            )
+        _limiter = RuleRateLimiter(
+            get_redis() if settings.rule_limiter_backend == "redis" else None,
+            stream_limit=stream_limit,
+        )
+    return _limiter
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.metrics import INGEST_STAGE_SECONDS
+from app.models.rule import Rule
+from app.services.rule_engine import RuleMatcher, compile_rules
+from app.services.versions import RULES_NAMESPACE, VersionRegistry, get_version_registry
+
+
+_FETCH_SECONDS = INGEST_STAGE_SECONDS.labels("rule_fetch")
+_COMPILE_SECONDS = INGEST_STAGE_SECONDS.labels("rule_compile")
+
+
+@dataclass
+class _CacheEntry:
+    version: int
+    matcher: RuleMatcher
+    loaded_at: float
+
+
+class RuleCache:
+    """In-process cache of compiled active rule sets, keyed by user.
+
+    Entries are tagged with the collection version they were loaded at and are
+    reloaded when the version moves on (see :class:`VersionRegistry`) or once
+    they are older than ``ttl_seconds``, which bounds staleness if an
+    invalidation message is ever lost.
+    """
+
+    def __init__(self, versions: VersionRegistry, ttl_seconds: float) -> None:
+        self._versions = versions
+        self._ttl_seconds = ttl_seconds
+        self._entries: Dict[int, _CacheEntry] = {}
+        self._locks: Dict[int, asyncio.Lock] = {}
+        self._loaded_users: Set[int] = set()
+        self._stats = {"hits": 0, "misses": 0, "reloads": 0, "invalidations": 0}
+        versions.add_listener(RULES_NAMESPACE, self._drop)
+
+    def stats(self) -> Dict[str, int]:
+        return {**self._stats, "entries": len(self._entries)}
+
+    async def get_matcher(self, user_id: int, session: AsyncSession) -> RuleMatcher:
+        """Return the compiled active rules for ``user_id``, loading them if stale."""
+
+        entry = await self._fresh_entry(user_id)
+        if entry is not None:
+            self._stats["hits"] += 1
+            return entry.matcher
+
+        lock = self._locks.setdefault(user_id, asyncio.Lock())
+        async with lock:
+            # Another request may have reloaded the rules while we were waiting.
+            entry = await self._fresh_entry(user_id)
+            if entry is not None:
+                self._stats["hits"] += 1
+                return entry.matcher
+
+            if user_id in self._loaded_users:
+                self._stats["reloads"] += 1
+            else:
+                self._stats["misses"] += 1
+                self._loaded_users.add(user_id)
+
+            version = await self._versions.current(RULES_NAMESPACE, user_id)
+            with _FETCH_SECONDS.time():
+                rules = await _fetch_active_rules(user_id, session)
+            with _COMPILE_SECONDS.time():
+                matcher = compile_rules(rules)
+            self._entries[user_id] = _CacheEntry(version.number, matcher, time.monotonic())
+            return matcher
+
+    async def invalidate(self, user_id: int) -> None:
+        """Bump the user's rule version so every worker drops its cached copy."""
+
+        await self._versions.bump(RULES_NAMESPACE, user_id)
+
+    async def _fresh_entry(self, user_id: int) -> Optional[_CacheEntry]:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        if time.monotonic() - entry.loaded_at >= self._ttl_seconds:
+            return None
+        version = await self._versions.current(RULES_NAMESPACE, user_id)
+        if version.number != entry.version:
+            return None
+        return entry
+
+    def _drop(self, user_id: Optional[int]) -> None:
+        self._stats["invalidations"] += 1
+        if user_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(user_id, None)
+
+
+async def _fetch_active_rules(user_id: int, session: AsyncSession) -> List[Rule]:
+    stmt = select(Rule).where(
+        Rule.user_id == user_id,
+        Rule.active.is_(True),
+    )
+    result = await session.scalars(stmt)
+    return list(result.all())
+
+
+_rule_cache: Optional[RuleCache] = None
+
+
+def get_rule_cache() -> RuleCache:
+    """Return the process-wide rule cache."""
+
+    global _rule_cache
+    if _rule_cache is None:
+        _rule_cache = RuleCache(get_version_registry(), settings.rule_cache_ttl_seconds)
+    return _rule_cache
@@ -1,11 +1,17 @@
 from __future__ import annotations
 
-from typing import Any, Dict, Iterable, List
+import logging
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
 
 from app.models.rule import Rule
+from app.services.rate_limiter import BucketSpec, rule_limits
 
 ActionPayload = Dict[str, Any]
 
+_logger = logging.getLogger(__name__)
+
 
 def apply_rules(text: str, rules: Iterable[Rule]) -> List[ActionPayload]:
     """Evaluate incoming text against rules and return triggered actions."""
@@ -33,3 +39,174 @@ def apply_rules(text: str, rules: Iterable[Rule]) -> List[ActionPayload]:
         triggered_actions.append(action_payload)
 
     return triggered_actions
+
+
+@dataclass(frozen=True)
+class CompiledRule:
+    """Snapshot of the rule fields needed to build an action payload."""
+
+    id: Optional[int]
+    trigger: str
+    action: str
+    params: Dict[str, Any]
+    limits: Tuple[BucketSpec, ...] = ()
+
+    @property
+    def limit_key(self) -> str:
+        return str(self.id) if self.id is not None else self.trigger
+
+    def to_payload(self) -> ActionPayload:
+        action_payload: ActionPayload = {"action": self.action}
+        action_payload.update(self.params)
+        return action_payload
+
+
+# Below this many distinct triggers a substring scan over the pre-lowered
+# triggers beats walking the automaton (see benchmarks/rule_engine.py).
+LINEAR_SCAN_MAX_TRIGGERS = 64
+
+
+class RuleMatcher:
+    """Aho-Corasick automaton over the triggers of a rule set.
+
+    Built once per active rule set, it finds every trigger contained in a
+    message in a single pass over the text and yields the same actions, in the
+    same order, as :func:`apply_rules` for the rules it was compiled from.
+    Rule sets with at most ``linear_scan_max_triggers`` distinct triggers skip
+    the automaton and test each trigger with ``in`` instead.
+    """
+
+    __slots__ = ("_goto", "_fail", "_output", "_rules", "_rules_by_pattern", "_linear")
+
+    def __init__(
+        self,
+        rules: Iterable[Rule],
+        *,
+        linear_scan_max_triggers: int = LINEAR_SCAN_MAX_TRIGGERS,
+    ) -> None:
+        self._rules: List[CompiledRule] = []
+        self._rules_by_pattern: List[Tuple[int, ...]] = []
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[Tuple[int, ...]] = [()]
+
+        pattern_ids: Dict[str, int] = {}
+        rule_indexes: List[List[int]] = []
+        for rule in rules:
+            if not rule.active:
+                continue
+
+            trigger = (rule.trigger or "").strip().lower()
+            if not trigger:
+                continue
+
+            pattern_id = pattern_ids.get(trigger)
+            if pattern_id is None:
+                pattern_id = len(rule_indexes)
+                pattern_ids[trigger] = pattern_id
+                rule_indexes.append([])
+
+            params = dict(rule.params_json or {})
+            try:
+                limits = rule_limits(params)
+            except ValueError as exc:
+                _logger.warning("Ignoring invalid limits of rule %s: %s", rule.id, exc)
+                limits = ()
+
+            rule_indexes[pattern_id].append(len(self._rules))
+            self._rules.append(
+                CompiledRule(
+                    id=rule.id,
+                    trigger=trigger,
+                    action=rule.action,
+                    params=params,
+                    limits=limits,
+                )
+            )
+
+        self._rules_by_pattern = [tuple(indexes) for indexes in rule_indexes]
+        self._linear = len(pattern_ids) <= linear_scan_max_triggers
+        if not self._linear:
+            for trigger, pattern_id in pattern_ids.items():
+                self._insert(trigger, pattern_id)
+            self._build_failure_links()
+
+    def __len__(self) -> int:
+        return len(self._rules)
+
+    @property
+    def linear(self) -> bool:
+        """Whether matching scans the triggers instead of walking the automaton."""
+
+        return self._linear
+
+    def _insert(self, trigger: str, pattern_id: int) -> None:
+        state = 0
+        for char in trigger:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(())
+            state = next_state
+        self._output[state] += (pattern_id,)
+
+    def _build_failure_links(self) -> None:
+        goto, fail, output = self._goto, self._fail, self._output
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in goto[state].items():
+                queue.append(next_state)
+                fallback = fail[state]
+                while fallback and char not in goto[fallback]:
+                    fallback = fail[fallback]
+                target = goto[fallback].get(char, 0)
+                fail[next_state] = target if target != next_state else 0
+                if output[fail[next_state]]:
+                    output[next_state] += output[fail[next_state]]
+
+    def match_rules(self, text: str) -> List[CompiledRule]:
+        """Return the compiled rules whose trigger occurs in ``text``."""
+
+        if not text or not self._rules:
+            return []
+
+        if self._linear:
+            normalized_text = text.lower()
+            return [rule for rule in self._rules if rule.trigger in normalized_text]
+
+        goto, fail, output = self._goto, self._fail, self._output
+        matched_patterns: Set[int] = set()
+        state = 0
+        for char in text.lower():
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                matched_patterns.update(output[state])
+
+        if not matched_patterns:
+            return []
+
+        indexes = sorted(
+            index
+            for pattern_id in matched_patterns
+            for index in self._rules_by_pattern[pattern_id]
+        )
+        return [self._rules[index] for index in indexes]
+
+    def match(self, text: str) -> List[ActionPayload]:
+        """Evaluate ``text`` and return triggered actions like :func:`apply_rules`."""
+
+        return [rule.to_payload() for rule in self.match_rules(text)]
+
+
+def compile_rules(
+    rules: Iterable[Rule], *, linear_scan_max_triggers: int = LINEAR_SCAN_MAX_TRIGGERS
+) -> RuleMatcher:
+    """Compile a rule set into a reusable :class:`RuleMatcher`."""
+
+    return RuleMatcher(rules, linear_scan_max_triggers=linear_scan_max_triggers)
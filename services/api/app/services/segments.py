@@ -0,0 +1,197 @@
+"""Compressed columnar segment files holding archived events.
+
+A segment stores up to ``EVENT_ARCHIVE_SEGMENT_ROWS`` events of one stream, ordered
+by ``(ts, id)``, one zlib-compressed block per column::
+
+    b"LAEVSEG1" | block | block | ... | footer JSON | footer length (u32) | b"LAEVSEG1"
+
+``id`` and ``ts`` (microseconds since the epoch) are delta encoded as int64;
+``type``, ``username``, ``message`` and ``gift_name`` are dictionary encoded
+as uint32 codes (0 is NULL) with the dictionary in its own block;
+``gift_value`` is float64 (NaN is NULL); the remaining payloads are JSON
+lines, parsed one row at a time. The footer records where each block starts
+and the segment's first and last ``(ts, id)``, so readers can skip whole
+segments.
+
+:class:`Segment` memory-maps a file and decompresses a column only when it is
+first used: counting gifts touches ``type`` and ``gift_value`` and never
+inflates the payloads.
+"""
+
+from __future__ import annotations
+
+import json
+import mmap
+import struct
+import sys
+import zlib
+from array import array
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Set, Tuple
+
+MAGIC = b"LAEVSEG1"
+FORMAT_VERSION = 1
+_FOOTER_LENGTH = struct.Struct("<I")
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+DICTIONARY_COLUMNS = ("type", "username", "message", "gift_name")
+
+
+class SegmentFormatError(ValueError):
+    """Raised when a file is not a readable event segment."""
+
+
+def to_micros(ts: datetime) -> int:
+    return (ts - _EPOCH) // timedelta(microseconds=1)
+
+
+def from_micros(micros: int) -> datetime:
+    return _EPOCH + timedelta(microseconds=micros)
+
+
+def _pack(values: array) -> bytes:
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values.tobytes()
+
+
+def _unpack(typecode: str, data: bytes) -> array:
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values
+
+
+def _deltas(values: Sequence[int]) -> array:
+    return array("q", (value - previous for previous, value in zip([0, *values], values)))
+
+
+def _dictionary(values: Sequence[Optional[str]]) -> Tuple[List[str], array]:
+    codes: Dict[str, int] = {}
+    encoded = array(
+        "I", (0 if value is None else codes.setdefault(value, len(codes) + 1) for value in values)
+    )
+    return list(codes), encoded
+
+
+def write_segment(rows: Sequence[Mapping[str, Any]]) -> bytes:
+    """Encode ``rows`` (ordered by ``(ts, id)``) as one segment file."""
+
+    if not rows:
+        raise ValueError("A segment needs at least one row")
+    micros = [to_micros(row["ts"]) for row in rows]
+    blocks: Dict[str, bytes] = {
+        "id": _pack(_deltas([row["id"] for row in rows])),
+        "ts": _pack(_deltas(micros)),
+        "gift_value": _pack(
+            array(
+                "d",
+                (float("nan") if row["gift_value"] is None else float(row["gift_value"]) for row in rows),
+            )
+        ),
+        # Compact JSON never contains a raw newline, so rows split on b"\n".
+        "payload_json": b"\n".join(
+            json.dumps(row["payload_json"], separators=(",", ":")).encode() for row in rows
+        ),
+    }
+    for column in DICTIONARY_COLUMNS:
+        dictionary, codes = _dictionary([row[column] for row in rows])
+        blocks[column] = _pack(codes)
+        blocks[f"{column}.dict"] = json.dumps(dictionary, separators=(",", ":")).encode()
+
+    body = bytearray(MAGIC)
+    offsets: Dict[str, List[int]] = {}
+    for name, block in blocks.items():
+        compressed = zlib.compress(block, 6)
+        offsets[name] = [len(body), len(compressed)]
+        body += compressed
+    footer = json.dumps(
+        {
+            "version": FORMAT_VERSION,
+            "stream_id": rows[0]["stream_id"],
+            "rows": len(rows),
+            "first": [micros[0], rows[0]["id"]],
+            "last": [micros[-1], rows[-1]["id"]],
+            "blocks": offsets,
+        },
+        separators=(",", ":"),
+    ).encode()
+    body += footer + _FOOTER_LENGTH.pack(len(footer)) + MAGIC
+    return bytes(body)
+
+
+class Segment:
+    """Read-only, memory-mapped view of a segment file with lazily decoded columns."""
+
+    def __init__(self, path: Path) -> None:
+        with open(path, "rb") as handle:
+            self._map = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._map)
+        tail = len(MAGIC) + _FOOTER_LENGTH.size
+        if len(view) < len(MAGIC) + tail or view[: len(MAGIC)] != MAGIC or view[-len(MAGIC):] != MAGIC:
+            view.release()
+            self._map.close()
+            raise SegmentFormatError(f"{path} is not an event segment")
+        (footer_length,) = _FOOTER_LENGTH.unpack(view[-tail:-len(MAGIC)])
+        self.footer: Dict[str, Any] = json.loads(bytes(view[-tail - footer_length:-tail]))
+        view.release()
+        if self.footer.get("version") != FORMAT_VERSION:
+            self._map.close()
+            raise SegmentFormatError(f"{path} has unsupported segment version {self.footer.get('version')}")
+        self.rows: int = self.footer["rows"]
+        self.first: Tuple[int, int] = tuple(self.footer["first"])  # type: ignore[assignment]
+        self.last: Tuple[int, int] = tuple(self.footer["last"])  # type: ignore[assignment]
+        self._columns: Dict[str, Any] = {}
+
+    def close(self) -> None:
+        self._columns.clear()
+        self._map.close()
+
+    def _block(self, name: str) -> bytes:
+        offset, length = self.footer["blocks"][name]
+        with memoryview(self._map) as view:
+            return zlib.decompress(view[offset:offset + length])
+
+    def column(self, name: str) -> Any:
+        """Return a decoded column: ints for ``id``/``ts``, codes for dictionary columns."""
+
+        values = self._columns.get(name)
+        if values is not None:
+            return values
+        if name in ("id", "ts"):
+            values = list(accumulate(_unpack("q", self._block(name))))
+        elif name == "gift_value":
+            values = _unpack("d", self._block(name))
+        elif name == "payload_json":
+            values = self._block(name).split(b"\n")
+        elif name in DICTIONARY_COLUMNS:
+            values = _unpack("I", self._block(name))
+        elif name.endswith(".dict"):
+            values = [None, *json.loads(self._block(name))]
+        else:
+            raise KeyError(name)
+        self._columns[name] = values
+        return values
+
+    def codes_for(self, name: str, wanted: Sequence[str]) -> Set[int]:
+        """Return the dictionary codes of ``name`` holding any of ``wanted``."""
+
+        dictionary = self.column(f"{name}.dict")
+        return {code for code, value in enumerate(dictionary) if value is not None and value in wanted}
+
+    def value(self, name: str, index: int) -> Any:
+        """Return the decoded value of column ``name`` for row ``index``."""
+
+        if name in DICTIONARY_COLUMNS:
+            return self.column(f"{name}.dict")[self.column(name)[index]]
+        if name == "ts":
+            return from_micros(self.column("ts")[index])
+        if name == "gift_value":
+            value = self.column("gift_value")[index]
+            return None if value != value else value
+        if name == "payload_json":
+            return json.loads(self.column("payload_json")[index])
+        return self.column(name)[index]
@@ -0,0 +1,308 @@
+"""Stream-affinity sharding of ingest across API worker processes.
+
+Every worker listed in ``SHARD_NODES`` places the same points on a consistent
+hash ring, so all of them agree on which worker owns a stream. Ingest requests
+that arrive at another worker are forwarded to the owner in one batch per
+owner. Per-stream state (stream stats, dedup windows, rule cooldowns) is then
+written by a single process and needs neither locks nor Redis round trips to
+stay consistent.
+
+Adding or removing a node only moves the streams on the ring arcs next to its
+points, about ``1 / nodes`` of them. Forwarded requests carry
+:data:`FORWARDED_HEADER` and are always processed where they land, so workers
+whose rings briefly disagree during a rebalance cannot bounce events between
+each other.
+
+A batch whose owner cannot be reached at all (the connection was never
+established) is processed locally. Any later failure, such as a read timeout,
+may come after the owner already committed the rows, so they are reported back
+to the client as rejected instead of being written a second time here.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+from bisect import bisect_right
+from collections import defaultdict
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from app.config import settings
+from app.metrics import Counter
+from app.services.event_writer import EventRow
+
+FORWARDED_HEADER = "X-Shard-Forwarded"
+
+SHARD_FORWARDED_EVENTS_TOTAL = Counter(
+    "shard_forwarded_events_total",
+    "Ingested events forwarded to the worker owning their stream, by node.",
+    ("node",),
+)
+SHARD_FORWARD_FAILURES_TOTAL = Counter(
+    "shard_forward_failures_total",
+    "Forwarding attempts that failed, by node and outcome (local or rejected).",
+    ("node", "outcome"),
+)
+
+# Retry-After sent to clients whose rows could not be confirmed by their owner.
+_UNCONFIRMED_RETRY_AFTER_SECONDS = 1
+
+_logger = logging.getLogger(__name__)
+
+
+def _never_sent(exc: BaseException) -> bool:
+    """Whether ``exc`` guarantees the request never reached the owner."""
+
+    import httpx
+
+    return isinstance(exc, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout))
+
+
+def _point(key: str) -> int:
+    # Python's hash() is salted per process; every worker must compute the same ring.
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+class ForwardResult(NamedTuple):
+    """Outcome of forwarding rows to their owners.
+
+    ``undelivered`` rows never reached an unreachable owner and are processed
+    locally; ``rejected`` rows were shed or not confirmed and are retried by the
+    client after ``retry_after`` seconds; ``archived`` rows belong to archived
+    streams and were refused for good.
+    """
+
+    undelivered: List[EventRow]
+    rejected: List[EventRow]
+    retry_after: Optional[int]
+    archived: List[EventRow]
+
+
+class HashRing:
+    """Consistent hash ring with ``vnodes`` points per node."""
+
+    __slots__ = ("nodes", "vnodes", "_points", "_owners")
+
+    def __init__(self, nodes: Sequence[str], vnodes: int = 128) -> None:
+        if not nodes:
+            raise ValueError("A hash ring needs at least one node")
+        self.nodes = tuple(dict.fromkeys(nodes))
+        self.vnodes = vnodes
+        ring = sorted((_point(f"{node}#{index}"), node) for node in self.nodes for index in range(vnodes))
+        self._points = [point for point, _ in ring]
+        self._owners = [node for _, node in ring]
+
+    def owner(self, stream_id: int) -> str:
+        index = bisect_right(self._points, _point(str(stream_id)))
+        return self._owners[index % len(self._owners)]
+
+    def shares(self) -> Dict[str, float]:
+        """Fraction of the hash space owned by each node."""
+
+        space = float(2**64)
+        shares = dict.fromkeys(self.nodes, 0.0)
+        previous = self._points[-1] - 2**64
+        for point, node in zip(self._points, self._owners):
+            shares[node] += (point - previous) / space
+            previous = point
+        return shares
+
+
+class ShardRouter:
+    """Splits ingest rows by owning node and forwards the remote ones."""
+
+    def __init__(
+        self,
+        nodes: Sequence[str],
+        *,
+        self_node: str,
+        vnodes: int,
+        timeout_seconds: float,
+    ) -> None:
+        if nodes and self_node not in nodes:
+            raise ValueError(f"SHARD_SELF {self_node!r} must be one of SHARD_NODES")
+        self._self_node = self_node
+        self._vnodes = vnodes
+        self._timeout_seconds = timeout_seconds
+        self._ring = HashRing(nodes, vnodes) if nodes else None
+        self._client: Any = None
+        self._stats = {"local": 0, "forwarded": 0, "forward_failures": 0, "unconfirmed": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self._ring is not None and len(self._ring.nodes) > 1
+
+    def owner(self, stream_id: int) -> str:
+        return self._ring.owner(stream_id) if self._ring is not None else self._self_node
+
+    def is_local(self, stream_id: int) -> bool:
+        return not self.enabled or self.owner(stream_id) == self._self_node
+
+    def set_nodes(self, nodes: Sequence[str]) -> None:
+        """Rebalance onto ``nodes``; streams whose owner is unchanged stay put."""
+
+        if nodes and self._self_node not in nodes:
+            raise ValueError(f"SHARD_SELF {self._self_node!r} must be one of the new nodes")
+        self._ring = HashRing(nodes, self._vnodes) if nodes else None
+
+    async def propagate_nodes(self, nodes: Sequence[str], admin_token: str) -> Dict[str, str]:
+        """Apply ``nodes`` on every other node of the new ring via ``PUT /debug/shards``.
+
+        Returns ``"ok"`` or the error for each peer. The requests carry
+        :data:`FORWARDED_HEADER`, so peers apply the ring without propagating it again.
+        """
+
+        async def put(node: str) -> str:
+            try:
+                response = await self._http_client().put(
+                    f"{node.rstrip('/')}/debug/shards",
+                    json={"nodes": list(nodes)},
+                    headers={
+                        FORWARDED_HEADER: self._self_node,
+                        "Authorization": f"Bearer {admin_token}",
+                    },
+                )
+            except Exception as exc:  # noqa: BLE001 - reported per node to the caller
+                return str(exc) or type(exc).__name__
+            if response.status_code >= 400:
+                return f"HTTP {response.status_code}: {response.text}"
+            return "ok"
+
+        peers = [node for node in dict.fromkeys(nodes) if node != self._self_node]
+        results = await asyncio.gather(*(put(node) for node in peers))
+        for node, result in zip(peers, results):
+            if result != "ok":
+                _logger.warning("Applying the shard ring on %s failed: %s", node, result)
+        return dict(zip(peers, results))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "self": self._self_node,
+            "nodes": list(self._ring.nodes) if self._ring is not None else [],
+            "shares": self._ring.shares() if self._ring is not None else {},
+        }
+
+    def split(self, rows: List[EventRow]) -> Tuple[List[EventRow], Dict[str, List[EventRow]]]:
+        """Return the rows this worker owns and the others grouped by owner."""
+
+        if not self.enabled:
+            return rows, {}
+        local: List[EventRow] = []
+        remote: Dict[str, List[EventRow]] = defaultdict(list)
+        for row in rows:
+            owner = self.owner(row["stream_id"])
+            if owner == self._self_node:
+                local.append(row)
+            else:
+                remote[owner].append(row)
+        self._stats["local"] += len(local)
+        return local, dict(remote)
+
+    async def forward(self, remote: Dict[str, List[EventRow]]) -> ForwardResult:
+        """Send each owner its rows concurrently and merge the outcomes."""
+
+        results = await asyncio.gather(*(self._send(node, rows) for node, rows in remote.items()))
+        undelivered: List[EventRow] = []
+        rejected: List[EventRow] = []
+        archived: List[EventRow] = []
+        retry_after: Optional[int] = None
+        for result in results:
+            undelivered.extend(result.undelivered)
+            rejected.extend(result.rejected)
+            archived.extend(result.archived)
+            if result.retry_after is not None:
+                retry_after = max(retry_after or 0, result.retry_after)
+        return ForwardResult(undelivered, rejected, retry_after, archived)
+
+    async def _send(self, node: str, rows: List[EventRow]) -> ForwardResult:
+        client = self._http_client()
+        body = [
+            {"type": row["type"], "payload": row["payload_json"], "stream_id": row["stream_id"]}
+            for row in rows
+        ]
+        try:
+            response = await client.post(
+                f"{node.rstrip('/')}/events/ingest/batch",
+                json=body,
+                headers={FORWARDED_HEADER: self._self_node},
+            )
+        except Exception as exc:  # noqa: BLE001 - classified by whether anything was sent
+            if _never_sent(exc):
+                return self._failed(node, rows, exc, "local")
+            return self._failed(node, rows, exc, "rejected")
+        if response.status_code == 429:
+            retry_after = int(response.headers.get("Retry-After", "1"))
+            return ForwardResult([], self._rejected_rows(rows, response), retry_after, [])
+        if response.status_code == 409:
+            # The owner stored everything except the rows of archived streams.
+            return ForwardResult([], [], None, self._rejected_rows(rows, response))
+        if response.status_code >= 400:
+            return self._failed(node, rows, f"HTTP {response.status_code}", "rejected")
+        self._stats["forwarded"] += len(rows)
+        SHARD_FORWARDED_EVENTS_TOTAL.labels(node).inc(len(rows))
+        return ForwardResult([], [], None, [])
+
+    @staticmethod
+    def _rejected_rows(rows: List[EventRow], response: Any) -> List[EventRow]:
+        # The owner lists the positions it refused; anything it accepted is kept.
+        try:
+            positions = response.json()["detail"]["rejected"]
+            return [rows[position] for position in positions]
+        except (ValueError, KeyError, TypeError, IndexError):
+            return rows
+
+    async def fetch(self, node: str, path: str) -> Optional[Any]:
+        """GET ``path`` from ``node`` as JSON, or ``None`` if the node cannot answer."""
+
+        try:
+            response = await self._http_client().get(
+                f"{node.rstrip('/')}{path}", headers={FORWARDED_HEADER: self._self_node}
+            )
+            response.raise_for_status()
+            return response.json()
+        except Exception as exc:  # noqa: BLE001 - callers fall back to local state
+            _logger.warning("Fetching %s from %s failed: %s", path, node, exc)
+            return None
+
+    def _failed(self, node: str, rows: List[EventRow], reason: object, outcome: str) -> ForwardResult:
+        self._stats["forward_failures"] += 1
+        SHARD_FORWARD_FAILURES_TOTAL.labels(node, outcome).inc()
+        if outcome == "local":
+            _logger.warning("%s unreachable, processing %d events locally: %s", node, len(rows), reason)
+            return ForwardResult(rows, [], None, [])
+        # The owner may have committed the rows; only the client can safely retry them.
+        _logger.warning("Forwarding %d events to %s unconfirmed, rejecting them: %s", len(rows), node, reason)
+        self._stats["unconfirmed"] += len(rows)
+        return ForwardResult([], rows, _UNCONFIRMED_RETRY_AFTER_SECONDS, [])
+
+    def _http_client(self) -> Any:
+        if self._client is None:
+            # Imported lazily like the HTTP broadcaster; unsharded workers never need it.
+            import httpx
+
+            self._client = httpx.AsyncClient(timeout=self._timeout_seconds)
+        return self._client
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+_router: Optional[ShardRouter] = None
+
+
+def get_shard_router() -> ShardRouter:
+    """Return the process-wide shard router."""
+
+    global _router
+    if _router is None:
+        _router = ShardRouter(
+            settings.shard_nodes,
+            self_node=settings.shard_self,
+            vnodes=settings.shard_vnodes,
+            timeout_seconds=settings.shard_forward_timeout_seconds,
+        )
+    return _router
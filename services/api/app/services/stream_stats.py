@@ -0,0 +1,262 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from array import array
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.config import settings
+from app.redis_client import get_redis
+
+_KEY_TEMPLATE = "stream:stats:{stream_id}"
+_IDLE_EVICTION_SECONDS = 3600.0
+
+_logger = logging.getLogger(__name__)
+
+
+def gift_value(payload: Dict[str, Any]) -> float:
+    """Return the total value of a gift event payload (``value`` x ``amount``)."""
+
+    value = payload.get("value")
+    if not isinstance(value, (int, float)) or isinstance(value, bool):
+        return 0.0
+    amount = payload.get("amount")
+    if not isinstance(amount, (int, float)) or isinstance(amount, bool):
+        amount = 1
+    return float(value) * amount
+
+
+class SlidingWindow:
+    """Per-second ring buffer with running sums over the last ``size`` seconds.
+
+    Adding and reading are O(1): expired buckets are subtracted from the sums
+    as the window advances, at most ``size`` buckets per call.
+    """
+
+    __slots__ = ("size", "_counts", "_values", "_head", "count", "value")
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self._counts = array("L", bytes(array("L").itemsize * size))
+        self._values = array("d", bytes(array("d").itemsize * size))
+        self._head = 0
+        self.count = 0
+        self.value = 0.0
+
+    def advance(self, second: int) -> None:
+        if second <= self._head:
+            return
+        if second - self._head >= self.size:
+            for index in range(self.size):
+                self._counts[index] = 0
+                self._values[index] = 0.0
+            self.count = 0
+            self.value = 0.0
+        else:
+            for expired in range(self._head + 1, second + 1):
+                index = expired % self.size
+                self.count -= self._counts[index]
+                self.value -= self._values[index]
+                self._counts[index] = 0
+                self._values[index] = 0.0
+        self._head = second
+
+    def add(self, second: int, value: float = 0.0) -> None:
+        # Clock steps backwards are counted in the newest bucket.
+        second = max(second, self._head)
+        self.advance(second)
+        index = second % self.size
+        self._counts[index] += 1
+        self._values[index] += value
+        self.count += 1
+        self.value += value
+
+
+class StreamStats:
+    __slots__ = (
+        "chats",
+        "gifts",
+        "totals",
+        "pending",
+        "synced",
+        "last_event_at",
+    )
+
+    def __init__(self, window_seconds: int) -> None:
+        self.chats = SlidingWindow(window_seconds)
+        self.gifts = SlidingWindow(window_seconds)
+        # Totals last confirmed by the checkpoint store, plus local increments
+        # that have not been checkpointed yet.
+        self.totals = {"chats": 0.0, "gifts": 0.0, "gift_value": 0.0}
+        self.pending = {"chats": 0.0, "gifts": 0.0, "gift_value": 0.0}
+        # False until totals have been read back from the checkpoint store.
+        self.synced = False
+        self.last_event_at: Optional[float] = None
+
+
+class StreamStatsRegistry:
+    """In-process, per-stream chat/gift rates and running totals.
+
+    Fed from ingest, read in O(1) by ``GET /streams/{id}/stats``, and
+    periodically checkpointed to Redis: each checkpoint adds this worker's new
+    increments to shared totals and takes back the combined values. Streams
+    this worker has not checkpointed yet (e.g. after a restart) read their
+    totals from Redis on first access.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        *,
+        window_seconds: int,
+        checkpoint_interval_seconds: float,
+    ) -> None:
+        self._redis = redis
+        self._window_seconds = window_seconds
+        self._checkpoint_interval_seconds = checkpoint_interval_seconds
+        self._streams: Dict[int, StreamStats] = {}
+        self._task: Optional[asyncio.Task[None]] = None
+
+    def record(self, stream_id: int, event_type: str, payload: Dict[str, Any]) -> None:
+        if event_type not in ("chat", "gift"):
+            return
+        stats = self._streams.get(stream_id)
+        if stats is None:
+            stats = self._streams[stream_id] = StreamStats(self._window_seconds)
+
+        now = time.time()
+        second = int(now)
+        stats.last_event_at = now
+        if event_type == "chat":
+            stats.chats.add(second)
+            stats.pending["chats"] += 1
+        else:
+            value = gift_value(payload)
+            stats.gifts.add(second, value)
+            stats.pending["gifts"] += 1
+            stats.pending["gift_value"] += value
+
+    async def snapshot(self, stream_id: int) -> Dict[str, Any]:
+        stats = self._streams.get(stream_id)
+        if stats is None or not stats.synced:
+            totals = await self._load_totals(stream_id)
+            # record() or a checkpoint may have run while Redis was answering.
+            stats = self._streams.get(stream_id) or stats
+            if stats is None:
+                stats = self._streams[stream_id] = StreamStats(self._window_seconds)
+            if totals is not None and not stats.synced:
+                stats.totals = totals
+                stats.synced = True
+
+        second = int(time.time())
+        stats.chats.advance(second)
+        stats.gifts.advance(second)
+        per_minute = 60.0 / self._window_seconds
+        return {
+            "stream_id": stream_id,
+            "window_seconds": self._window_seconds,
+            "chats_per_minute": stats.chats.count * per_minute,
+            "gifts_per_minute": stats.gifts.count * per_minute,
+            "gift_value_per_minute": stats.gifts.value * per_minute,
+            "total_chats": int(stats.totals["chats"] + stats.pending["chats"]),
+            "total_gifts": int(stats.totals["gifts"] + stats.pending["gifts"]),
+            "total_gift_value": stats.totals["gift_value"] + stats.pending["gift_value"],
+            "last_event_at": (
+                datetime.fromtimestamp(stats.last_event_at, timezone.utc)
+                if stats.last_event_at is not None
+                else None
+            ),
+        }
+
+    async def _load_totals(self, stream_id: int) -> Optional[Dict[str, float]]:
+        """Read the checkpointed totals of a stream this worker has not synced yet."""
+
+        try:
+            stored = await self._redis.hgetall(_KEY_TEMPLATE.format(stream_id=stream_id))
+        except (RedisError, OSError) as exc:
+            _logger.warning("Unable to load stream stats for %s: %s", stream_id, exc)
+            return None
+        return {
+            field: float(stored.get(field) or 0.0)
+            for field in ("chats", "gifts", "gift_value")
+        }
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.checkpoint()
+
+    async def checkpoint(self) -> None:
+        """Push pending increments to Redis and refresh totals from the shared values."""
+
+        now = time.time()
+        stream_ids: List[int] = []
+        sent: List[Dict[str, float]] = []
+        try:
+            async with self._redis.pipeline(transaction=False) as pipe:
+                for stream_id, stats in list(self._streams.items()):
+                    idle = (
+                        stats.last_event_at is None
+                        or now - stats.last_event_at > _IDLE_EVICTION_SECONDS
+                    )
+                    if idle and not any(stats.pending.values()):
+                        del self._streams[stream_id]
+                        continue
+                    key = _KEY_TEMPLATE.format(stream_id=stream_id)
+                    deltas = dict(stats.pending)
+                    pipe.hincrbyfloat(key, "chats", deltas["chats"])
+                    pipe.hincrbyfloat(key, "gifts", deltas["gifts"])
+                    pipe.hincrbyfloat(key, "gift_value", deltas["gift_value"])
+                    stream_ids.append(stream_id)
+                    sent.append(deltas)
+                if not stream_ids:
+                    return
+                replies = await pipe.execute()
+        except (RedisError, OSError) as exc:
+            _logger.warning("Unable to checkpoint stream stats: %s", exc)
+            return
+
+        for offset, (stream_id, deltas) in enumerate(zip(stream_ids, sent)):
+            stats = self._streams.get(stream_id)
+            if stats is None:
+                continue
+            chats, gifts, value = replies[offset * 3 : offset * 3 + 3]
+            stats.totals = {"chats": float(chats), "gifts": float(gifts), "gift_value": float(value)}
+            stats.synced = True
+            for field, delta in deltas.items():
+                stats.pending[field] -= delta
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self._checkpoint_interval_seconds)
+            await self.checkpoint()
+
+
+_registry: Optional[StreamStatsRegistry] = None
+
+
+def get_stream_stats() -> StreamStatsRegistry:
+    """Return the process-wide stream statistics registry."""
+
+    global _registry
+    if _registry is None:
+        _registry = StreamStatsRegistry(
+            get_redis(),
+            window_seconds=settings.stream_stats_window_seconds,
+            checkpoint_interval_seconds=settings.stream_stats_checkpoint_seconds,
+        )
+    return _registry
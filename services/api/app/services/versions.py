@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.redis_client import get_redis
+
+PRODUCTS_NAMESPACE = "products"
+RULES_NAMESPACE = "rules"
+
+_CHANNEL = "collections.versions"
+_KEY_TEMPLATE = "versions:{namespace}:{user_id}"
+_MAX_BACKOFF_SECONDS = 10.0
+_REDIS_RETRY_SECONDS = 5.0
+
+_logger = logging.getLogger(__name__)
+
+VersionListener = Callable[[Optional[int]], None]
+
+
+@dataclass(frozen=True)
+class CollectionVersion:
+    number: int
+    modified_at: float
+
+
+class VersionRegistry:
+    """Per-user version counters for mutable collections, shared through Redis.
+
+    Every worker keeps a local mirror of the versions it has seen. The mirror is
+    only trusted while the pub/sub subscription is live; bumps made by any
+    worker are published so the others update their mirror (and notify their
+    listeners) without a round trip on the read path. When Redis cannot be
+    reached the registry degrades to process-local counters.
+    """
+
+    def __init__(self, redis: Redis) -> None:
+        self._redis = redis
+        self._local: Dict[Tuple[str, int], CollectionVersion] = {}
+        self._listeners: Dict[str, List[VersionListener]] = {}
+        self._listener_task: Optional[asyncio.Task[None]] = None
+        self._live = False
+        self._started_at = time.time()
+        self._redis_down_until = 0.0
+
+    @property
+    def live(self) -> bool:
+        return self._live
+
+    def add_listener(self, namespace: str, callback: VersionListener) -> None:
+        """Call ``callback(user_id)`` when a collection changes; ``None`` means all users."""
+
+        self._listeners.setdefault(namespace, []).append(callback)
+
+    async def start(self) -> None:
+        if self._listener_task is None:
+            self._listener_task = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._listener_task is not None:
+            self._listener_task.cancel()
+            try:
+                await self._listener_task
+            except asyncio.CancelledError:
+                pass
+            self._listener_task = None
+        self._live = False
+
+    async def current(self, namespace: str, user_id: int) -> CollectionVersion:
+        key = (namespace, user_id)
+        cached = self._local.get(key)
+        if cached is not None and self._live:
+            return cached
+
+        fallback = cached or CollectionVersion(0, self._started_at)
+        if time.monotonic() < self._redis_down_until:
+            return fallback
+
+        redis_key = _KEY_TEMPLATE.format(namespace=namespace, user_id=user_id)
+        try:
+            async with self._redis.pipeline(transaction=True) as pipe:
+                pipe.hsetnx(redis_key, "n", 0)
+                pipe.hsetnx(redis_key, "ts", time.time())
+                pipe.hmget(redis_key, "n", "ts")
+                *_, (number, modified_at) = await pipe.execute()
+        except (RedisError, OSError) as exc:
+            _logger.debug("Falling back to local %s version: %s", namespace, exc)
+            self._redis_down_until = time.monotonic() + _REDIS_RETRY_SECONDS
+            return fallback
+
+        version = CollectionVersion(int(number), float(modified_at))
+        if self._live:
+            self._local[key] = version
+        return version
+
+    async def bump(self, namespace: str, user_id: int) -> CollectionVersion:
+        """Advance the version of a user's collection and notify every worker."""
+
+        key = (namespace, user_id)
+        redis_key = _KEY_TEMPLATE.format(namespace=namespace, user_id=user_id)
+        modified_at = time.time()
+        try:
+            async with self._redis.pipeline(transaction=True) as pipe:
+                pipe.hincrby(redis_key, "n", 1)
+                pipe.hset(redis_key, "ts", modified_at)
+                number, _ = await pipe.execute()
+            version = CollectionVersion(int(number), modified_at)
+            await self._redis.publish(
+                _CHANNEL,
+                json.dumps(
+                    {
+                        "namespace": namespace,
+                        "user_id": user_id,
+                        "number": version.number,
+                        "modified_at": version.modified_at,
+                    }
+                ),
+            )
+        except (RedisError, OSError) as exc:
+            _logger.warning(
+                "Unable to publish %s version bump; other workers rely on TTL expiry: %s",
+                namespace,
+                exc,
+            )
+            previous = self._local.get(key)
+            version = CollectionVersion((previous.number if previous else 0) + 1, modified_at)
+
+        self._apply(namespace, user_id, version)
+        return version
+
+    def _apply(self, namespace: str, user_id: int, version: CollectionVersion) -> None:
+        key = (namespace, user_id)
+        previous = self._local.get(key)
+        if previous is not None and previous.number >= version.number:
+            return
+        self._local[key] = version
+        for callback in self._listeners.get(namespace, ()):
+            callback(user_id)
+
+    def _reset(self) -> None:
+        self._local.clear()
+        for callbacks in self._listeners.values():
+            for callback in callbacks:
+                callback(None)
+
+    def _handle_message(self, raw: str) -> None:
+        try:
+            data = json.loads(raw)
+            version = CollectionVersion(int(data["number"]), float(data["modified_at"]))
+            namespace, user_id = str(data["namespace"]), int(data["user_id"])
+        except (KeyError, TypeError, ValueError):
+            _logger.debug("Ignoring malformed version message: %r", raw)
+            return
+        self._apply(namespace, user_id, version)
+
+    async def _listen(self) -> None:
+        backoff = 0.5
+        while True:
+            pubsub = self._redis.pubsub()
+            try:
+                await pubsub.subscribe(_CHANNEL)
+                # Bumps may have been missed while unsubscribed; start from a clean mirror.
+                self._reset()
+                self._live = True
+                backoff = 0.5
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        self._handle_message(message["data"])
+            except (RedisError, OSError) as exc:
+                _logger.warning("Version subscription unavailable, retrying: %s", exc)
+            finally:
+                if self._live:
+                    self._live = False
+                    self._reset()
+                await pubsub.aclose()
+
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, _MAX_BACKOFF_SECONDS)
+
+
+_registry: Optional[VersionRegistry] = None
+
+
+def get_version_registry() -> VersionRegistry:
+    """Return the process-wide collection version registry."""
+
+    global _registry
+    if _registry is None:
+        _registry = VersionRegistry(get_redis())
+    return _registry
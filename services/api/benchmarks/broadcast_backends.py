@@ -0,0 +1,120 @@
+"""Compare broadcast throughput of the HTTP gateway and direct Redis backends.
+
+Both backends run against local stand-ins (see :mod:`benchmarks.standins`), so
+the numbers reflect the API-side cost of each path rather than the network::
+
+    cd services/api
+    python -m benchmarks.broadcast_backends --events 20000 --json results.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Any, Dict, List, Tuple
+
+from redis.asyncio import Redis
+
+from app.services.broadcaster import Broadcaster, HttpBroadcaster, RedisBroadcaster
+
+from .standins import GatewayStandIn, RedisStandIn
+
+_CHANNELS = ("chat.events", "gift.events")
+
+
+def _sample_messages(count: int, action_ratio: float, actions: int) -> List[Tuple[Dict[str, Any], bool]]:
+    """Return ``(message, concurrent)`` pairs; some chats are followed by rule actions."""
+
+    rng = random.Random(7)
+    messages: List[Tuple[Dict[str, Any], bool]] = []
+    for index in range(count):
+        if rng.random() < 0.85:
+            messages.append(({"type": "chat", "username": f"viewer{index % 500}", "text": "cek keranjang kak"}, False))
+            if rng.random() < action_ratio:
+                messages.extend(({"type": "auto_reply", "text": f"balasan {n}"}, True) for n in range(actions))
+        else:
+            messages.append(({"type": "gift", "username": f"viewer{index % 500}", "giftName": "Rose", "value": 1}, False))
+    return messages
+
+
+async def _measure(broadcaster: Broadcaster, messages: List[Tuple[Dict[str, Any], bool]]) -> float:
+    await broadcaster.start()
+    started = time.perf_counter()
+    for message, concurrent in messages:
+        channel = _CHANNELS[message["type"] == "gift"]
+        while not broadcaster.enqueue(channel, message, concurrent=concurrent):
+            await asyncio.sleep(0)
+    await broadcaster.stop(drain_timeout=600)
+    return time.perf_counter() - started
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    messages = _sample_messages(args.events, args.action_ratio, args.actions)
+    results: Dict[str, Any] = {
+        "events": len(messages),
+        "batch_size": args.batch_size,
+        "action_fan_out": args.action_fan_out,
+    }
+
+    gateway = GatewayStandIn(latency_seconds=args.gateway_latency_ms / 1000)
+    await gateway.start()
+    http = HttpBroadcaster(
+        [gateway.url],
+        timeout_seconds=5.0,
+        failure_threshold=3,
+        cooldown_seconds=10.0,
+        queue_size=args.queue_size,
+        batch_size=args.batch_size,
+        action_fan_out=args.action_fan_out,
+    )
+    elapsed = await _measure(http, messages)
+    await gateway.stop()
+    results["http"] = {"seconds": elapsed, "events_per_second": len(messages) / elapsed, **http.stats()}
+
+    redis_standin = RedisStandIn()
+    await redis_standin.start()
+    redis = Redis.from_url(redis_standin.url, decode_responses=True)
+    direct = RedisBroadcaster(
+        redis,
+        queue_size=args.queue_size,
+        batch_size=args.batch_size,
+    )
+    elapsed = await _measure(direct, messages)
+    await redis.aclose()
+    await redis_standin.stop()
+    results["redis"] = {"seconds": elapsed, "events_per_second": len(messages) / elapsed, **direct.stats()}
+
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=10000)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--action-ratio", type=float, default=0.1, help="share of chats that fire rule actions")
+    parser.add_argument("--actions", type=int, default=3, help="rule actions per firing chat")
+    parser.add_argument(
+        "--action-fan-out", type=int, default=4, help="BROADCAST_ACTION_FAN_OUT for the http backend"
+    )
+    parser.add_argument("--gateway-latency-ms", type=float, default=0.0, help="stand-in gateway latency")
+    parser.add_argument("--queue-size", type=int, default=10000)
+    parser.add_argument("--json", dest="json_path", help="write results to this file")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    for backend in ("http", "redis"):
+        result = results[backend]
+        print(
+            f"{backend:>5}: {result['events_per_second']:>10.0f} events/s "
+            f"({result['delivered']} delivered, {result['undeliverable']} failed)"
+        )
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as handle:
+            json.dump(results, handle, indent=2, default=str)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""Measure the size and read speed of archived streams.
+
+Builds one synthetic stream of chats and gifts shaped like
+``TikTokDummyAdapter`` output, archives it with
+:func:`~app.services.event_archive.write_archive` to a local directory and to
+:class:`benchmarks.standins.ObjectStoreStandIn`, then reads it back through
+:class:`~app.services.event_archive.ArchiveReader` the way the history
+endpoints do::
+
+    cd services/api
+    python -m benchmarks.event_archive --events 500000 --json archive.json
+    python -m benchmarks.event_archive --events 500000 --baseline archive.json
+
+Sizes are compared with the same rows as compact JSON lines (the typed
+columns plus the stored payload), a rough stand-in for what the rows occupy
+in Postgres before TOAST and indexes.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List
+
+from app.services.event_archive import (
+    ArchiveReader,
+    HttpSegmentStore,
+    LocalSegmentStore,
+    SegmentStore,
+    write_archive,
+)
+from app.services.event_columns import encode_event
+
+from .load_ingest import _CHAT_MESSAGES, _GIFTS, _USERS
+from .standins import ObjectStoreStandIn
+
+_STREAM_ID = 1
+
+
+def build_rows(count: int, seed: int = 5) -> List[Dict[str, Any]]:
+    """Return ``count`` stored event rows ordered by ``(ts, id)``."""
+
+    rng = random.Random(seed)
+    started = datetime(2025, 9, 24, 12, tzinfo=timezone.utc)
+    rows = []
+    for index in range(count):
+        ts = started + timedelta(milliseconds=index * 50)
+        if rng.random() < 0.05:
+            name, value = rng.choice(_GIFTS)
+            event_type = "gift"
+            payload: Dict[str, Any] = {
+                "username": rng.choice(_USERS),
+                "giftName": name,
+                "amount": rng.randint(1, 5),
+                "value": value,
+                "timestamp": ts.isoformat(),
+            }
+        else:
+            event_type = "chat"
+            payload = {
+                "username": rng.choice(_USERS),
+                "message": rng.choice(_CHAT_MESSAGES),
+                "timestamp": ts.isoformat(),
+            }
+        row = encode_event({"stream_id": _STREAM_ID, "type": event_type, "payload_json": payload})
+        rows.append({**row, "id": index + 1, "ts": ts})
+    return rows
+
+
+async def _aiter(rows: List[Dict[str, Any]]) -> AsyncIterator[Dict[str, Any]]:
+    for row in rows:
+        yield row
+
+
+async def _time(call: Callable[[], Awaitable[Any]], runs: int) -> Dict[str, float]:
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        await call()
+        samples.append((time.perf_counter() - started) * 1000)
+    return {"first": samples[0], "p50": statistics.median(samples)}
+
+
+async def measure(store: SegmentStore, rows: List[Dict[str, Any]], args: argparse.Namespace) -> Dict[str, Any]:
+    started = time.perf_counter()
+    manifest = await write_archive(store, _STREAM_ID, _aiter(rows), segment_rows=args.segment_rows)
+    write_ms = (time.perf_counter() - started) * 1000
+
+    reader = ArchiveReader(store)
+    middle = rows[len(rows) // 2]
+    queries = {
+        "first_page": lambda: reader.events(_STREAM_ID, limit=100),
+        "middle_page": lambda: reader.events(_STREAM_ID, cursor=(middle["ts"], middle["id"]), limit=100),
+        "user_filter": lambda: reader.events(_STREAM_ID, username=_USERS[7], limit=100),
+        "gifts_over_100": lambda: reader.events(_STREAM_ID, types=["gift"], min_gift_value=100, limit=1000),
+        "summary": lambda: reader.summary(_STREAM_ID),
+    }
+    results: Dict[str, Any] = {"segments": len(manifest["segments"]), "write_ms": write_ms}
+    for name, call in queries.items():
+        results[name] = await _time(call, args.runs)
+    return results
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    rows = build_rows(args.events)
+    json_bytes = sum(
+        len(json.dumps({**row, "ts": row["ts"].isoformat(), "gift_value": str(row["gift_value"])}))
+        for row in rows
+    )
+    results: Dict[str, Any] = {"events": args.events, "json_bytes": json_bytes, "backends": {}}
+
+    with tempfile.TemporaryDirectory() as directory:
+        root = Path(directory)
+        local = LocalSegmentStore(root / "local")
+        results["backends"]["local"] = await measure(local, rows, args)
+        results["segment_bytes"] = sum(path.stat().st_size for path in (root / "local").rglob("*.seg"))
+
+        object_store = ObjectStoreStandIn(latency_seconds=args.object_latency_ms / 1000)
+        await object_store.start()
+        http = HttpSegmentStore(object_store.url, root / "cache")
+        try:
+            results["backends"]["http"] = await measure(http, rows, args)
+        finally:
+            await http.close()
+            await object_store.stop()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=200_000, help="events in the archived stream")
+    parser.add_argument("--segment-rows", type=int, default=65536, help="EVENT_ARCHIVE_SEGMENT_ROWS")
+    parser.add_argument("--runs", type=int, default=5, help="repetitions per read")
+    parser.add_argument("--object-latency-ms", type=float, default=20.0, help="object store latency per request")
+    parser.add_argument("--json", dest="json_path", help="write results to this file")
+    parser.add_argument("--baseline", help="compare against results saved by an earlier run")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    baseline: Dict[str, Any] = {}
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as handle:
+            baseline = json.load(handle)
+
+    print(
+        f"{results['events']:,} events: {results['json_bytes'] / 2**20:.1f} MiB as JSON lines, "
+        f"{results['segment_bytes'] / 2**20:.1f} MiB in segments "
+        f"({results['json_bytes'] / results['segment_bytes']:.1f}x smaller)"
+    )
+    for backend, summary in results["backends"].items():
+        previous = baseline.get("backends", {}).get(backend, {})
+        print(f"[{backend}] {summary['segments']} segments written in {summary['write_ms']:.0f} ms")
+        for name, timing in summary.items():
+            if not isinstance(timing, dict):
+                continue
+            line = f"  {name:<16} first {timing['first']:9.2f} ms  p50 {timing['p50']:9.2f} ms"
+            if name in previous:
+                line += f"  ({(timing['p50'] / previous[name]['p50'] - 1) * 100:+.0f}% p50)"
+            print(line)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as handle:
+            json.dump(results, handle, indent=2)
+
+
+if __name__ == "__main__":
+    main()
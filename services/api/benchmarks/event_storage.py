@@ -0,0 +1,169 @@
+"""Report the size of the ``events`` table and the cost of typical payload queries.
+
+Run it against the database in ``DATABASE_URL`` once before and once after
+``alembic upgrade`` to 202409240009, which moves the hot payload fields into
+typed columns::
+
+    cd services/api
+    python -m benchmarks.event_storage --seed 1000000   # optional, before upgrading
+    python -m benchmarks.event_storage --json before.json
+    alembic upgrade head && psql "$DATABASE_URL" -c "VACUUM ANALYZE events"
+    python -m benchmarks.event_storage --baseline before.json
+
+Sizes cover every partition (heap, TOAST and indexes). Queries are "gifts
+worth at least ``--min-gift-value`` on a stream" and "messages by one viewer
+on a stream"; they use the typed columns when the schema has them and JSONB
+paths otherwise, so the same command measures both sides.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from typing import Any, Dict
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.models.base import get_engine
+
+_SIZES_SQL = """
+SELECT
+    count(*) AS partitions,
+    COALESCE(sum(pg_relation_size(inhrelid)), 0) AS heap_bytes,
+    COALESCE(sum(pg_total_relation_size(inhrelid) - pg_indexes_size(inhrelid)), 0) AS table_bytes,
+    COALESCE(sum(pg_indexes_size(inhrelid)), 0) AS index_bytes
+FROM pg_inherits
+WHERE inhparent = 'events'::regclass
+"""
+
+_ROW_SQL = """
+SELECT count(*) AS rows, avg(pg_column_size(e.*)) AS row_bytes,
+       avg(pg_column_size(payload_json)) AS payload_bytes
+FROM events e
+"""
+
+_QUERIES = {
+    "gifts_over": (
+        "SELECT count(*) FROM events WHERE stream_id = :stream_id AND gift_value >= :min_value",
+        "SELECT count(*) FROM events WHERE stream_id = :stream_id AND type = 'gift' "
+        "AND jsonb_typeof(payload_json -> 'value') = 'number' "
+        "AND (payload_json ->> 'value')::numeric * CASE "
+        "WHEN jsonb_typeof(payload_json -> 'amount') = 'number' "
+        "THEN (payload_json ->> 'amount')::numeric ELSE 1 END >= :min_value",
+    ),
+    "messages_by_user": (
+        "SELECT count(*) FROM events WHERE stream_id = :stream_id AND username = :username",
+        "SELECT count(*) FROM events WHERE stream_id = :stream_id "
+        "AND payload_json ->> 'username' = :username",
+    ),
+}
+
+# Rows shaped like the TikTok adapter's chats and gifts, in the pre-upgrade layout.
+_SEED_SQL = """
+INSERT INTO events (stream_id, type, payload_json, ts)
+SELECT
+    :stream_id,
+    CASE WHEN n % 20 = 0 THEN 'gift' ELSE 'chat' END,
+    CASE WHEN n % 20 = 0 THEN jsonb_build_object(
+        'username', 'viewer' || (n % 5000),
+        'giftName', (ARRAY['Rose', 'Diamond', 'Legend'])[1 + n % 3],
+        'amount', 1 + n % 5,
+        'value', (ARRAY[1, 10, 50])[1 + n % 3],
+        'timestamp', now() - (n || ' seconds')::interval
+    ) ELSE jsonb_build_object(
+        'username', 'viewer' || (n % 5000),
+        'message', (ARRAY['kak harga berapa?', 'link keranjang mana kak', 'mantap!'])[1 + n % 3],
+        'timestamp', now() - (n || ' seconds')::interval
+    ) END,
+    now() - (n || ' seconds')::interval
+FROM generate_series(1, :rows) AS n
+"""
+
+
+async def _has_hot_columns(conn: AsyncConnection) -> bool:
+    return bool(
+        await conn.scalar(
+            text(
+                "SELECT count(*) FROM information_schema.columns "
+                "WHERE table_name = 'events' AND column_name = 'gift_value'"
+            )
+        )
+    )
+
+
+async def _time_query(conn: AsyncConnection, sql: str, params: Dict[str, Any], runs: int) -> Dict[str, float]:
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        await conn.execute(text(sql), params)
+        samples.append((time.perf_counter() - started) * 1000)
+    return {"p50": statistics.median(samples), "min": min(samples)}
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    async with get_engine().connect() as conn:
+        typed = await _has_hot_columns(conn)
+        if args.seed:
+            if typed:
+                raise SystemExit("--seed writes the pre-upgrade layout; seed before upgrading")
+            await conn.execute(text(_SEED_SQL), {"stream_id": args.stream_id, "rows": args.seed})
+            await conn.commit()
+            await conn.execute(text("ANALYZE events"))
+
+        sizes = dict((await conn.execute(text(_SIZES_SQL))).mappings().one())
+        rows = dict((await conn.execute(text(_ROW_SQL))).mappings().one())
+        params = {"stream_id": args.stream_id, "min_value": args.min_gift_value, "username": args.username}
+        queries = {
+            name: await _time_query(conn, typed_sql if typed else jsonb_sql, params, args.runs)
+            for name, (typed_sql, jsonb_sql) in _QUERIES.items()
+        }
+    await get_engine().dispose()
+    return {
+        "layout": "typed" if typed else "jsonb",
+        **{key: float(value or 0) for key, value in {**sizes, **rows}.items()},
+        "queries": queries,
+    }
+
+
+def _change(current: float, previous: Any) -> str:
+    if not previous:
+        return ""
+    return f"  ({(current / previous - 1) * 100:+.0f}%)"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--stream-id", type=int, default=1, help="stream to query and seed")
+    parser.add_argument("--username", default="viewer42", help="viewer for the messages query")
+    parser.add_argument("--min-gift-value", type=float, default=100.0, help="threshold for the gifts query")
+    parser.add_argument("--runs", type=int, default=7, help="executions per query")
+    parser.add_argument("--seed", type=int, default=0, help="insert this many synthetic events first")
+    parser.add_argument("--json", dest="json_path", help="write results to this file")
+    parser.add_argument("--baseline", help="compare against results saved by an earlier run")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    baseline: Dict[str, Any] = {}
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as handle:
+            baseline = json.load(handle)
+
+    print(f"layout {results['layout']}, {results['rows']:,.0f} rows in {results['partitions']:.0f} partitions")
+    for key in ("heap_bytes", "table_bytes", "index_bytes"):
+        print(f"{key:<22} {results[key] / 2**20:10.1f} MiB{_change(results[key], baseline.get(key))}")
+    for key in ("row_bytes", "payload_bytes"):
+        print(f"{key:<22} {results[key]:10.1f} B{_change(results[key], baseline.get(key))}")
+    for name, summary in results["queries"].items():
+        previous = baseline.get("queries", {}).get(name, {}).get("p50")
+        print(f"{name:<22} {summary['p50']:10.2f} ms p50{_change(summary['p50'], previous)}")
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as handle:
+            json.dump(results, handle, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Measure the per-request cost of token verification with and without the cache.
+
+Pure CPU benchmark, no services needed::
+
+    cd services/api
+    python -m benchmarks.jwt_cache --calls 100000 --tokens 50 --json jwt.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from typing import Any, Callable, Dict, List
+
+import jwt
+
+from app import auth
+from app.config import settings
+
+
+def _per_call_us(decode: Callable[[str], Dict[str, Any]], tokens: List[str], calls: int) -> float:
+    started = time.perf_counter()
+    for index in range(calls):
+        decode(tokens[index % len(tokens)])
+    return (time.perf_counter() - started) / calls * 1_000_000
+
+
+def _uncached(token: str) -> Dict[str, Any]:
+    return jwt.decode(token, settings.jwt_secret, algorithms=[settings.jwt_algorithm])
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    # Distinct subjects stand in for distinct adapters re-sending their own token.
+    tokens = [auth.create_access_token(f"adapter-{index}") for index in range(args.tokens)]
+    auth.token_cache.clear()
+
+    uncached_us = _per_call_us(_uncached, tokens, args.calls)
+    cached_us = _per_call_us(auth.decode_access_token, tokens, args.calls)
+    return {
+        "calls": args.calls,
+        "tokens": args.tokens,
+        "algorithm": settings.jwt_algorithm,
+        "uncached_us_per_call": uncached_us,
+        "cached_us_per_call": cached_us,
+        "speedup": uncached_us / cached_us,
+        "cache": auth.token_cache.stats(),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=100_000)
+    parser.add_argument("--tokens", type=int, default=50)
+    parser.add_argument("--json", dest="json_path", help="write results to this file")
+    args = parser.parse_args()
+
+    results = run(args)
+    print(f"jwt.decode:          {results['uncached_us_per_call']:8.2f} us/call")
+    print(f"decode_access_token: {results['cached_us_per_call']:8.2f} us/call")
+    print(f"speedup:             {results['speedup']:8.1f}x")
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as handle:
+            json.dump(results, handle, indent=2)
+
+
+if __name__ == "__main__":
+    main()
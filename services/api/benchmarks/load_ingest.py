@@ -0,0 +1,398 @@
+"""Drive ``/events/ingest`` and ``/rules/eval`` with realistic live-stream traffic.
+
+Traffic follows ``TikTokDummyAdapter`` (chats and gifts from a pool of viewers)
+at a configurable open-loop rate with periodic bursts. By default the API runs
+in-process against local stand-ins for Postgres, Redis and the gateway (see
+:mod:`benchmarks.standins`), which also enables a per-stage breakdown of the
+ingest path. ``--target`` sends the same traffic to a running API instead::
+
+    cd services/api
+    python -m benchmarks.load_ingest --rate 500 --duration 20 --json load.json
+    python -m benchmarks.load_ingest --rate 500 --duration 20 --baseline load.json
+
+Latency is measured from each request's scheduled send time, so queueing
+inside the generator counts against the API rather than being hidden. In
+process the generator shares the event loop with the API, so absolute numbers
+are pessimistic; compare runs against a saved ``--baseline`` instead.
+
+The synthetic chat repeats a small set of lines, so most of it is collapsed by
+the dedup stage; ``--no-chat-dedup`` ingests every message.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import functools
+import json
+import random
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import httpx
+
+from .standins import DatabaseStandIn, GatewayStandIn, RedisStandIn
+
+_USERS = [f"viewer{index}" for index in range(2000)]
+_CHAT_MESSAGES = (
+    "Hello everyone!",
+    "Thanks for joining the stream!",
+    "What do you think about the new product?",
+    "kak harga hoodie berapa?",
+    "link keranjang mana kak",
+    "ongkir ke surabaya berapa",
+    "size L masih ready?",
+    "mantap kak, lanjut!",
+    "bisa cod gak kak",
+    "wkwkwk lucu banget",
+)
+_GIFTS = (("Rose", 1), ("Diamond", 10), ("Legend", 50))
+# (trigger, action, params) for the stand-in rule set
+_RULES = (
+    ("harga", "reply", {"text": "Harga ada di keranjang kuning ya kak!"}),
+    ("keranjang", "pin_product", {"product_id": 1}),
+    ("ongkir", "reply", {"text": "Ongkir dihitung otomatis saat checkout."}),
+    ("ready", "reply", {"text": "Semua size ready kak."}),
+    ("cod", "reply", {"text": "Bisa COD kak."}),
+    ("hoodie", "pin_product", {"product_id": 2}),
+)
+
+
+def _percentiles(samples: List[float]) -> Dict[str, float]:
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def rank(fraction: float) -> float:
+        return ordered[min(len(ordered) - 1, max(0, int(len(ordered) * fraction + 0.5) - 1))]
+
+    return {
+        "count": len(ordered),
+        "p50": rank(0.50),
+        "p95": rank(0.95),
+        "p99": rank(0.99),
+        "max": ordered[-1],
+    }
+
+
+class TrafficModel:
+    """Chat/gift mix modelled on ``TikTokDummyAdapter`` with periodic bursts."""
+
+    def __init__(self, args: argparse.Namespace) -> None:
+        self._args = args
+        self._rng = random.Random(args.seed)
+
+    def rate_at(self, offset: float) -> float:
+        args = self._args
+        in_burst = args.burst_every > 0 and offset % args.burst_every < args.burst_length
+        return args.rate * (args.burst_factor if in_burst else 1.0)
+
+    def schedule(self) -> Iterator[float]:
+        offset = 0.0
+        while offset < self._args.duration:
+            yield offset
+            offset += 1.0 / self.rate_at(offset)
+
+    def next_request(self) -> Tuple[str, Dict[str, Any]]:
+        rng = self._rng
+        if rng.random() < self._args.eval_ratio:
+            return "/rules/eval", {"text": rng.choice(_CHAT_MESSAGES)}
+        if rng.random() < self._args.gift_ratio:
+            name, value = rng.choice(_GIFTS)
+            payload = {
+                "username": rng.choice(_USERS),
+                "giftName": name,
+                "amount": rng.randint(1, 5),
+                "value": value,
+            }
+            return "/events/ingest", {"type": "gift", "payload": payload}
+        payload = {"username": rng.choice(_USERS), "message": rng.choice(_CHAT_MESSAGES)}
+        return "/events/ingest", {"type": "chat", "payload": payload}
+
+
+class StageTimer:
+    """Wraps functions on the ingest path and records how long each call takes."""
+
+    def __init__(self) -> None:
+        self.samples: Dict[str, List[float]] = {}
+
+    def wrap(self, owner: Any, name: str, stage: str) -> None:
+        original = getattr(owner, name)
+        samples = self.samples.setdefault(stage, [])
+
+        if asyncio.iscoroutinefunction(original):
+
+            @functools.wraps(original)
+            async def timed_async(*args: Any, **kwargs: Any) -> Any:
+                started = time.perf_counter()
+                try:
+                    return await original(*args, **kwargs)
+                finally:
+                    samples.append((time.perf_counter() - started) * 1000)
+
+            setattr(owner, name, timed_async)
+        else:
+
+            @functools.wraps(original)
+            def timed(*args: Any, **kwargs: Any) -> Any:
+                started = time.perf_counter()
+                try:
+                    return original(*args, **kwargs)
+                finally:
+                    samples.append((time.perf_counter() - started) * 1000)
+
+            setattr(owner, name, timed)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        return {stage: _percentiles(samples) for stage, samples in self.samples.items()}
+
+
+class InProcessApi:
+    """The FastAPI app wired to local stand-ins, with its ingest stages timed."""
+
+    def __init__(self, args: argparse.Namespace) -> None:
+        self._args = args
+        self.gateway = GatewayStandIn(latency_seconds=args.gateway_latency_ms / 1000)
+        self.redis = RedisStandIn()
+        self.database: Optional[DatabaseStandIn] = None
+        self.stages = StageTimer()
+
+    async def start(self) -> httpx.AsyncClient:
+        await self.gateway.start()
+        await self.redis.start()
+
+        # Point the lazily created clients at the stand-ins before first use.
+        from app.config import settings
+
+        settings.redis_url = self.redis.url
+        settings.gateway_broadcast_urls = [self.gateway.url]
+        settings.broadcast_backend = self._args.broadcast_backend
+        settings.event_buffer_enabled = self._args.event_buffer
+        settings.chat_dedup_enabled = self._args.chat_dedup
+
+        from app import db
+        from app.main import app
+        from app.models.product import Product
+        from app.models.rule import Rule
+        from app.routers import events
+        from app.services import event_writer
+        from app.services.broadcaster import get_broadcaster
+        from app.services.chat_dedup import get_chat_deduper
+        from app.services.rule_cache import get_rule_cache
+        from app.services.rule_engine import RuleMatcher
+        from app.services.stream_stats import get_stream_stats
+        from app.services.versions import get_version_registry
+
+        rules = [
+            Rule(id=index, user_id=1, trigger=trigger, action=action, params_json=params, active=True)
+            for index, (trigger, action, params) in enumerate(_RULES, start=1)
+        ]
+        products = [
+            Product(id=index, user_id=1, title=f"Produk {index}", price=99000, url=f"https://shop.example/p/{index}", tags=[])
+            for index in (1, 2)
+        ]
+        self.database = DatabaseStandIn(rules, products, self._args.db_latency_ms / 1000)
+        app.dependency_overrides[db.get_async_session] = self.database.get_session
+        # Read-only dependencies resolve their session factory at request time.
+        db.async_session_maker = self.database.session
+
+        await get_version_registry().start()
+        if self._args.event_buffer:
+            event_writer._event_writer = event_writer.EventWriter(
+                self.database.session,
+                max_batch=settings.event_buffer_max_batch,
+                max_delay_seconds=settings.event_buffer_max_delay_ms / 1000,
+                max_pending=settings.event_buffer_max_pending,
+                durability=settings.event_buffer_durability,
+            )
+            await event_writer.get_event_writer().start()
+        await get_broadcaster().start()
+        if self._args.chat_dedup:
+            await get_chat_deduper().start(events.emit_chat_repeats)
+        await get_stream_stats().start()
+
+        self.stages.wrap(events, "_persist_events", "persist")
+        self.stages.wrap(events, "_forward_to_gateway", "forward")
+        self.stages.wrap(events, "_dispatch_rule_actions", "dispatch")
+        self.stages.wrap(get_rule_cache(), "get_matcher", "rule_lookup")
+        self.stages.wrap(RuleMatcher, "match_rules", "rule_match")
+
+        return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://api")
+
+    async def stop(self) -> Dict[str, Any]:
+        from app.redis_client import close_redis
+        from app.services.admission import get_admission_controller
+        from app.services.broadcaster import get_broadcaster
+        from app.services.chat_dedup import get_chat_deduper
+        from app.services.event_writer import get_event_writer
+        from app.services.stream_stats import get_stream_stats
+        from app.services.versions import get_version_registry
+
+        if self._args.chat_dedup:
+            await get_chat_deduper().stop()
+        if self._args.event_buffer:
+            await get_event_writer().stop()
+        broadcaster = get_broadcaster()
+        await broadcaster.stop(drain_timeout=30)
+        await get_stream_stats().stop()
+        await get_version_registry().stop()
+        await close_redis()
+        await self.gateway.stop()
+        await self.redis.stop()
+
+        assert self.database is not None
+        return {
+            "database": dict(self.database.stats),
+            "chat_dedup": get_chat_deduper().stats(),
+            "admission": get_admission_controller().stats(),
+            "broadcaster": {key: value for key, value in broadcaster.stats().items() if key != "endpoints"},
+            "gateway_received": dict(self.gateway.received),
+            "redis_published": dict(self.redis.published),
+        }
+
+
+async def _drive(
+    client: httpx.AsyncClient,
+    model: TrafficModel,
+    concurrency: int,
+) -> Tuple[float, Dict[str, List[float]], int, int]:
+    latencies: Dict[str, List[float]] = {}
+    errors = 0
+    shed = 0
+    slots = asyncio.Semaphore(concurrency)
+    tasks: List[asyncio.Task[None]] = []
+
+    async def send(scheduled: float, path: str, body: Dict[str, Any]) -> None:
+        nonlocal errors, shed
+        async with slots:
+            try:
+                response = await client.post(path, json=body)
+                ok = response.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+                response = None
+        if response is not None and response.status_code == 429:
+            shed += 1
+            return
+        if not ok:
+            errors += 1
+            return
+        latencies.setdefault(path, []).append((time.perf_counter() - scheduled) * 1000)
+
+    started = time.perf_counter()
+    for offset in model.schedule():
+        scheduled = started + offset
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        path, body = model.next_request()
+        tasks.append(asyncio.create_task(send(scheduled, path, body)))
+    await asyncio.gather(*tasks)
+    return time.perf_counter() - started, latencies, errors, shed
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    model = TrafficModel(args)
+    api: Optional[InProcessApi] = None
+    if args.target:
+        client = httpx.AsyncClient(base_url=args.target, timeout=30.0)
+    else:
+        api = InProcessApi(args)
+        client = await api.start()
+
+    try:
+        elapsed, latencies, errors, shed = await _drive(client, model, args.concurrency)
+    finally:
+        await client.aclose()
+    standins = await api.stop() if api is not None else {}
+
+    requests = sum(len(samples) for samples in latencies.values()) + errors + shed
+    all_latencies = [sample for samples in latencies.values() for sample in samples]
+    return {
+        "config": {key: value for key, value in vars(args).items() if key not in ("json_path", "baseline")},
+        "elapsed_seconds": elapsed,
+        "requests": requests,
+        "errors": errors,
+        "shed": shed,
+        "throughput_rps": (requests - errors - shed) / elapsed,
+        "latency_ms": {
+            "all": _percentiles(all_latencies),
+            **{path: _percentiles(samples) for path, samples in sorted(latencies.items())},
+        },
+        "stages_ms": api.stages.summary() if api is not None else {},
+        "standins": standins,
+    }
+
+
+def _print_summary(results: Dict[str, Any]) -> None:
+    print(
+        f"{results['requests']} requests in {results['elapsed_seconds']:.1f}s "
+        f"({results['throughput_rps']:.0f} req/s, {results['errors']} errors, "
+        f"{results.get('shed', 0)} shed with 429)"
+    )
+    for name, section in (("latency", results["latency_ms"]), ("stage", results["stages_ms"])):
+        for label, stats in section.items():
+            if not stats.get("count"):
+                continue
+            print(
+                f"  {name} {label:<16} p50 {stats['p50']:8.2f}  p95 {stats['p95']:8.2f}  "
+                f"p99 {stats['p99']:8.2f} ms  (n={stats['count']})"
+            )
+
+
+def _print_comparison(results: Dict[str, Any], baseline: Dict[str, Any]) -> None:
+    def change(current: float, previous: float) -> str:
+        return f"{(current - previous) / previous * 100:+.1f}%" if previous else "n/a"
+
+    print("vs baseline:")
+    print(
+        f"  throughput {change(results['throughput_rps'], baseline['throughput_rps'])}"
+    )
+    for label, stats in results["latency_ms"].items():
+        previous = baseline["latency_ms"].get(label, {})
+        if not stats.get("count") or not previous.get("count"):
+            continue
+        print(
+            f"  {label:<16} p50 {change(stats['p50'], previous['p50'])}  "
+            f"p95 {change(stats['p95'], previous['p95'])}  p99 {change(stats['p99'], previous['p99'])}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rate", type=float, default=200.0, help="base requests per second")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of traffic")
+    parser.add_argument("--burst-every", type=float, default=5.0, help="seconds between bursts (0 disables)")
+    parser.add_argument("--burst-length", type=float, default=1.0, help="seconds each burst lasts")
+    parser.add_argument("--burst-factor", type=float, default=4.0, help="rate multiplier during bursts")
+    parser.add_argument("--gift-ratio", type=float, default=0.15, help="share of events that are gifts")
+    parser.add_argument("--eval-ratio", type=float, default=0.05, help="share of requests to /rules/eval")
+    parser.add_argument("--concurrency", type=int, default=256, help="max requests in flight")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--target", help="base URL of a running API; default runs in-process")
+    parser.add_argument("--broadcast-backend", choices=("http", "redis"), default="http")
+    parser.add_argument("--event-buffer", action="store_true", help="enable the write-behind event buffer")
+    parser.add_argument(
+        "--no-chat-dedup",
+        dest="chat_dedup",
+        action="store_false",
+        help="ingest every chat message instead of collapsing repeats",
+    )
+    parser.add_argument("--db-latency-ms", type=float, default=0.5, help="stand-in database round trip")
+    parser.add_argument("--gateway-latency-ms", type=float, default=0.0, help="stand-in gateway latency")
+    parser.add_argument("--json", dest="json_path", help="write results to this file")
+    parser.add_argument("--baseline", help="compare against results saved by an earlier run")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    _print_summary(results)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as handle:
+            _print_comparison(results, json.load(handle))
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as handle:
+            json.dump(results, handle, indent=2, default=str)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""Measure GET /products/search query latency on a large synthetic catalog.
+
+Needs a PostgreSQL database migrated to head (``alembic upgrade head``) at
+``DATABASE_URL``. Products are seeded for a dedicated benchmark user, which is
+deleted again afterwards unless ``--keep`` is given::
+
+    cd services/api
+    python -m benchmarks.product_search --products 100000 --json search.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+from typing import Any, Dict, List, Sequence, Tuple
+
+from sqlalchemy import delete, insert, select, text
+
+from app.models import User
+from app.models.base import get_engine, get_sessionmaker
+from app.models.product import Product
+from app.services.product_search import build_search_query
+
+_BENCH_EMAIL = "product-search-bench@example.invalid"
+_CHUNK_SIZE = 5000
+
+_ADJECTIVES = ["premium", "murah", "original", "import", "lokal", "jumbo", "mini", "polos", "motif", "viral"]
+_NOUNS = ["kaos", "hoodie", "celana", "sepatu", "tas", "jam tangan", "serum", "lipstik", "kemeja", "sandal"]
+_MATERIALS = ["katun", "denim", "kulit", "rajut", "linen", "wol", "sutra", "canvas"]
+_TAGS = ["promo", "flash-sale", "best-seller", "new", "bundling", "cod", "gratis-ongkir", "pria", "wanita", "anak"]
+
+# (label, query, tags)
+_QUERIES: Sequence[Tuple[str, str, List[str]]] = (
+    ("exact word", "hoodie", []),
+    ("two words", "kaos katun", []),
+    ("typo", "hodie rajut", []),
+    ("short prefix", "sep", []),
+    ("tags only", "", ["flash-sale"]),
+    ("query and tags", "sepatu kulit", ["promo", "cod"]),
+)
+
+
+def _product_rows(user_id: int, count: int, rng: random.Random) -> List[Dict[str, Any]]:
+    rows = []
+    for index in range(count):
+        title = (
+            f"{rng.choice(_NOUNS).title()} {rng.choice(_MATERIALS)} "
+            f"{rng.choice(_ADJECTIVES)} {rng.randint(1, 999)}"
+        )
+        rows.append(
+            {
+                "user_id": user_id,
+                "title": title,
+                "price": rng.randint(10, 2000) * 1000,
+                "url": f"https://shop.example/p/{index}",
+                "tags": rng.sample(_TAGS, rng.randint(0, 3)),
+            }
+        )
+    return rows
+
+
+async def _seed(count: int) -> int:
+    async with get_sessionmaker()() as session:
+        user_id = await session.scalar(select(User.id).where(User.email == _BENCH_EMAIL))
+        if user_id is None:
+            user_id = await session.scalar(
+                insert(User).values(email=_BENCH_EMAIL, password_hash="!").returning(User.id)
+            )
+        await session.execute(delete(Product).where(Product.user_id == user_id))
+
+        rng = random.Random(42)
+        for start in range(0, count, _CHUNK_SIZE):
+            await session.execute(insert(Product), _product_rows(user_id, min(_CHUNK_SIZE, count - start), rng))
+        await session.commit()
+
+    async with get_engine().connect() as conn:
+        await conn.execute(text("ANALYZE products"))
+        await conn.commit()
+    return user_id
+
+
+async def _measure(user_id: int, iterations: int, limit: int) -> Dict[str, Dict[str, float]]:
+    results: Dict[str, Dict[str, float]] = {}
+    async with get_sessionmaker()() as session:
+        for label, query, tags in _QUERIES:
+            stmt = build_search_query(user_id, query, tags).limit(limit)
+            await session.execute(stmt)  # warm up caches and the statement cache
+            timings = []
+            hits = 0
+            for _ in range(iterations):
+                started = time.perf_counter()
+                hits = len((await session.execute(stmt)).all())
+                timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            results[label] = {
+                "hits": hits,
+                "p50_ms": statistics.median(timings),
+                "p95_ms": timings[int(len(timings) * 0.95) - 1],
+                "max_ms": timings[-1],
+            }
+    return results
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    engine = get_engine()
+    try:
+        user_id = await _seed(args.products)
+        results = await _measure(user_id, args.iterations, args.limit)
+        if not args.keep:
+            async with get_sessionmaker()() as session:
+                await session.execute(delete(User).where(User.id == user_id))
+                await session.commit()
+    finally:
+        await engine.dispose()
+    return {"products": args.products, "iterations": args.iterations, "queries": results}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--keep", action="store_true", help="keep the seeded catalog")
+    parser.add_argument("--json", dest="json_path", help="write results to this file")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    for label, result in results["queries"].items():
+        print(
+            f"{label:>15}: p50 {result['p50_ms']:7.2f} ms  p95 {result['p95_ms']:7.2f} ms  "
+            f"({result['hits']} hits)"
+        )
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as handle:
+            json.dump(results, handle, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""Micro-benchmark the rule engine across rule-set sizes and message shapes.
+
+Runs :func:`~app.services.rule_engine.apply_rules` (the reference linear scan),
+the compiled :class:`~app.services.rule_engine.RuleMatcher` as ingest uses it,
+and the same matcher forced to use its automaton at every size, against
+synthetic rule sets built from :class:`benchmarks.standins.RuleStandIn`, so no
+database is needed::
+
+    cd services/api
+    python -m benchmarks.rule_engine --json rules.json
+    python -m benchmarks.rule_engine --baseline rules.json   # exits 1 on slowdowns
+
+Each case reports the best ns/message over several rounds and the peak memory
+allocated per message; each rule-set size also reports the compile time and
+resident size of the matcher. Baselines are machine specific, so save one on
+the machine that will run the comparison.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Sequence
+
+from app.services.rule_engine import apply_rules, compile_rules
+
+from .standins import RuleStandIn
+
+# Triggers sellers actually configure; every rule set starts with these.
+_COMMON_TRIGGERS = (
+    "harga", "berapa", "ongkir", "keranjang", "link", "checkout", "cod", "ready",
+    "size", "stok", "diskon", "promo", "price", "how much", "shipping", "restock",
+)
+_SYLLABLES = (
+    "ba", "ka", "la", "ma", "na", "pa", "ra", "sa", "ta", "ja", "ku", "lu", "mu",
+    "nu", "ri", "si", "ti", "de", "ge", "be", "ng", "ny", "ah", "ok", "an", "in",
+)
+_MESSAGES: Dict[str, Sequence[str]] = {
+    "emoji": ("🔥🔥🔥", "😍😍👍", "❤️", "🙏🙏", "😂😂😂😂"),
+    "short": ("harga?", "cod?", "mantap", "hi kak", "ready?", "wow"),
+    "chat": (
+        "kak harga hoodie yang hitam berapa ya?",
+        "link keranjang mana kak, mau checkout sekarang",
+        "ongkir ke Surabaya berapa kak 🙏",
+        "is the size L still available?",
+        "how much is shipping to Jakarta",
+        "wkwkwk lucu banget kak hostnya 😂",
+    ),
+    "paragraph": (
+        "Kak aku udah nonton dari awal live, produknya bagus banget tapi aku masih "
+        "bingung soal ukuran. Biasanya aku pakai size M untuk kaos, tapi kalau hoodie "
+        "suka kekecilan di bagian lengan. Ada size chart gak kak? Terus kalau beli dua "
+        "dapat diskon gak, soalnya mau sekalian buat adikku juga. Oh iya, shipping ke "
+        "Makassar biasanya berapa hari ya? Last time I ordered it took almost a week "
+        "and the package was a bit damaged, so please pack it carefully. Makasih kak! 🔥",
+    ),
+}
+
+
+def build_rules(size: int, seed: int = 7) -> List[RuleStandIn]:
+    """Return ``size`` rules: the common triggers plus unique synthetic words."""
+
+    rng = random.Random(seed)
+    triggers = list(_COMMON_TRIGGERS[:size])
+    seen = set(triggers)
+    while len(triggers) < size:
+        word = "".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(2, 4)))
+        if word not in seen:
+            seen.add(word)
+            triggers.append(word)
+    return [
+        RuleStandIn(id=index, trigger=trigger, params_json={"text": f"auto reply {index}"})
+        for index, trigger in enumerate(triggers, start=1)
+    ]
+
+
+def _time_per_message(
+    func: Callable[[str], Any],
+    messages: Sequence[str],
+    budget: float,
+    repeat: int,
+) -> float:
+    """Return the best ns per message over ``repeat`` rounds sharing ``budget`` seconds."""
+
+    best = float("inf")
+    for _ in range(repeat):
+        calls = 0
+        started = time.perf_counter_ns()
+        deadline = started + int(budget / repeat * 1e9)
+        while True:
+            for message in messages:
+                func(message)
+            calls += len(messages)
+            now = time.perf_counter_ns()
+            if now >= deadline:
+                break
+        best = min(best, (now - started) / calls)
+    return best
+
+
+def _peak_bytes_per_message(func: Callable[[str], Any], messages: Sequence[str]) -> float:
+    peaks = []
+    tracemalloc.start()
+    try:
+        for message in messages:
+            tracemalloc.reset_peak()
+            baseline, _ = tracemalloc.get_traced_memory()
+            func(message)
+            _, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - baseline)
+    finally:
+        tracemalloc.stop()
+    return sum(peaks) / len(peaks)
+
+
+def _matcher_footprint(rules: List[RuleStandIn]) -> Dict[str, float]:
+    started = time.perf_counter()
+    compile_rules(rules)
+    compile_seconds = time.perf_counter() - started
+
+    tracemalloc.start()
+    try:
+        matcher = compile_rules(rules)
+        resident, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del matcher
+    return {"compile_ms": compile_seconds * 1000, "resident_bytes": resident}
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    results: Dict[str, Any] = {"python": sys.version.split()[0], "cases": {}, "compile": {}}
+    for size in args.sizes:
+        rules = build_rules(size, args.seed)
+        matcher = compile_rules(rules)
+        results["compile"][str(size)] = _matcher_footprint(rules)
+
+        implementations: Dict[str, Callable[[str], Any]] = {
+            "compiled": matcher.match,
+            "automaton": compile_rules(rules, linear_scan_max_triggers=0).match,
+            "reference": lambda text, rules=rules: apply_rules(text, rules),
+        }
+        for implementation, func in implementations.items():
+            for kind, messages in _MESSAGES.items():
+                results["cases"][f"{implementation}/{size}/{kind}"] = {
+                    "ns_per_message": _time_per_message(func, messages, args.budget, args.repeat),
+                    "peak_bytes_per_message": _peak_bytes_per_message(func, messages),
+                    "matches": sum(len(func(message)) for message in messages),
+                }
+    return results
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Return descriptions of the cases that got slower than ``tolerance`` allows."""
+
+    slowdowns = []
+    for case, current in results["cases"].items():
+        previous = baseline.get("cases", {}).get(case)
+        if previous is None:
+            continue
+        ratio = current["ns_per_message"] / previous["ns_per_message"]
+        if ratio > 1 + tolerance:
+            slowdowns.append(
+                f"{case}: {previous['ns_per_message']:.0f} -> "
+                f"{current['ns_per_message']:.0f} ns/message ({(ratio - 1) * 100:+.0f}%)"
+            )
+    return slowdowns
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes",
+        type=lambda value: [int(size) for size in value.split(",")],
+        default=[10, 1000, 100_000],
+        help="comma-separated rule-set sizes",
+    )
+    parser.add_argument("--budget", type=float, default=0.2, help="seconds spent timing each case")
+    parser.add_argument("--repeat", type=int, default=5, help="timing rounds per case; the best counts")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", dest="json_path", help="write results to this file")
+    parser.add_argument("--baseline", help="flag cases slower than in this results file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown, 0.25 = 25%%")
+    args = parser.parse_args()
+
+    results = run(args)
+    for size, footprint in results["compile"].items():
+        print(
+            f"{size:>7} rules: compile {footprint['compile_ms']:9.1f} ms, "
+            f"matcher {footprint['resident_bytes'] / 1024:9.0f} KiB"
+        )
+    for case, result in results["cases"].items():
+        print(
+            f"{case:<28} {result['ns_per_message']:>14,.0f} ns/msg  "
+            f"{result['peak_bytes_per_message']:>9,.0f} B/msg peak"
+        )
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as handle:
+            json.dump(results, handle, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as handle:
+            slowdowns = compare(results, json.load(handle), args.tolerance)
+        for slowdown in slowdowns:
+            print(f"SLOWER {slowdown}")
+        if slowdowns:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""Measure how per-stream ingest work scales when streams are sharded across processes.
+
+A synthetic event log over many streams is split with the same
+:class:`~app.services.sharding.HashRing` the API uses, and each of ``K``
+processes runs the in-memory part of the ingest pipeline (chat dedup, stream
+stats, rule matching and rule limits) on the streams it owns. Because no state
+is shared, throughput should grow with ``K`` up to the number of cores::
+
+    cd services/api
+    python -m benchmarks.shard_scaling --processes 1,2,4 --json shards.json
+    python -m benchmarks.shard_scaling --processes 1,2,4 --baseline shards.json
+
+Ring balance (the largest node's share of the hash space relative to a fair
+share) and the fraction of streams that move when one node is added are
+reported for each ``K`` as well.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import time
+from typing import Any, Dict, List, Tuple
+
+from app.services.chat_dedup import ChatDeduper
+from app.services.rate_limiter import BucketSpec, LocalBuckets
+from app.services.rule_engine import compile_rules
+from app.services.sharding import HashRing
+from app.services.stream_stats import StreamStatsRegistry
+
+from .rule_engine import _MESSAGES, build_rules
+
+Event = Tuple[int, str, Dict[str, Any]]
+
+
+def build_events(count: int, streams: int, seed: int = 11) -> List[Event]:
+    """Return ``count`` chat and gift events spread over ``streams`` streams."""
+
+    rng = random.Random(seed)
+    texts = [text for shape in ("short", "chat", "emoji") for text in _MESSAGES[shape]]
+    events: List[Event] = []
+    for _ in range(count):
+        stream_id = rng.randint(1, streams)
+        user = f"viewer{rng.randint(1, 5000)}"
+        if rng.random() < 0.05:
+            events.append((stream_id, "gift", {"user": user, "diamonds": rng.randint(1, 100)}))
+        else:
+            events.append((stream_id, "chat", {"user": user, "text": rng.choice(texts)}))
+    return events
+
+
+def _worker(node: str, nodes: List[str], args: Tuple[int, int, int], start: Any, results: Any) -> None:
+    count, streams, rules = args
+    ring = HashRing(nodes)
+    owned = [event for event in build_events(count, streams) if ring.owner(event[0]) == node]
+    deduper = ChatDeduper(window_seconds=10.0, max_windows=100_000, user_limit=BucketSpec(5.0, 20 / 60))
+    stats = StreamStatsRegistry(None, window_seconds=60, checkpoint_interval_seconds=5.0)  # type: ignore[arg-type]
+    matcher = compile_rules(build_rules(rules))
+    limits = LocalBuckets()
+    cooldown = BucketSpec(1.0, 1 / 30)
+
+    start.wait()
+    started = time.perf_counter()
+    now = time.monotonic()
+    for stream_id, event_type, payload in owned:
+        row = {"stream_id": stream_id, "type": event_type, "payload_json": payload}
+        stats.record(stream_id, event_type, payload)
+        if not deduper.admit(row, now) or event_type != "chat":
+            continue
+        for rule in matcher.match_rules(payload["text"]):
+            limits.acquire(((f"{stream_id}:{rule.limit_key}", cooldown),), now)
+    results.put((node, len(owned), time.perf_counter() - started))
+
+
+def run_sharded(processes: int, args: argparse.Namespace) -> Dict[str, Any]:
+    nodes = [f"http://worker-{index}:8000" for index in range(processes)]
+    context = multiprocessing.get_context("spawn")
+    start = context.Barrier(processes + 1)
+    results = context.Queue()
+    workers = [
+        context.Process(
+            target=_worker,
+            args=(node, nodes, (args.events, args.streams, args.rules), start, results),
+        )
+        for node in nodes
+    ]
+    for worker in workers:
+        worker.start()
+    start.wait()
+    finished = [results.get() for _ in workers]
+    for worker in workers:
+        worker.join()
+
+    ring = HashRing(nodes)
+    grown = HashRing(nodes + [f"http://worker-{processes}:8000"])
+    moved = sum(ring.owner(stream) != grown.owner(stream) for stream in range(1, args.streams + 1))
+    elapsed = max(seconds for _, _, seconds in finished)
+    return {
+        "events_per_second": args.events / elapsed,
+        "events_per_process": sorted(count for _, count, _ in finished),
+        "ring_imbalance": max(ring.shares().values()) * processes,
+        "moved_on_add": moved / args.streams,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--processes",
+        type=lambda value: [int(part) for part in value.split(",")],
+        default=[1, 2, 4],
+        help="comma-separated process counts to compare",
+    )
+    parser.add_argument("--events", type=int, default=200_000, help="events in the synthetic log")
+    parser.add_argument("--streams", type=int, default=1000, help="distinct streams in the log")
+    parser.add_argument("--rules", type=int, default=50, help="rules per matcher")
+    parser.add_argument("--json", dest="json_path", help="write results to this file")
+    parser.add_argument("--baseline", help="compare against results saved by an earlier run")
+    args = parser.parse_args()
+
+    results: Dict[str, Any] = {"cpus": os.cpu_count(), "events": args.events, "processes": {}}
+    for processes in args.processes:
+        results["processes"][str(processes)] = run_sharded(processes, args)
+
+    baseline: Dict[str, Any] = {}
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as handle:
+            baseline = json.load(handle)
+
+    single = results["processes"].get("1", {}).get("events_per_second")
+    print(f"{results['cpus']} CPUs, {args.events} events over {args.streams} streams")
+    for processes, summary in results["processes"].items():
+        line = (
+            f"K={processes:<3} {summary['events_per_second']:12,.0f} events/s"
+            f"  imbalance {summary['ring_imbalance']:.2f}"
+            f"  moved on add {summary['moved_on_add'] * 100:5.1f}%"
+        )
+        if single:
+            line += f"  speedup {summary['events_per_second'] / single:.2f}x"
+        previous = baseline.get("processes", {}).get(processes)
+        if previous:
+            line += f"  ({(summary['events_per_second'] / previous['events_per_second'] - 1) * 100:+.0f}% vs baseline)"
+        print(line)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as handle:
+            json.dump(results, handle, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,393 @@
+"""Local stand-ins for the services the API talks to, for use by the benchmarks."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+
+class RedisStandIn:
+    """Minimal in-memory RESP server covering the commands the API issues.
+
+    Supports hashes (HSET/HSETNX/HMGET/HGETALL/HINCRBY/HINCRBYFLOAT), MULTI/EXEC
+    and PUBLISH/SUBSCRIBE, and counts publishes per channel. Anything else is
+    acknowledged with ``+OK``.
+    """
+
+    def __init__(self) -> None:
+        self.published: Dict[str, int] = {}
+        self._hashes: Dict[bytes, Dict[bytes, bytes]] = {}
+        self._subscribers: Dict[bytes, List[asyncio.StreamWriter]] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._address()
+        return f"redis://{host}:{port}/0"
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> None:
+        self._server = await asyncio.start_server(self._handle, host, port)
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            for writers in self._subscribers.values():
+                for writer in writers:
+                    writer.close()
+            self._subscribers.clear()
+            await self._server.wait_closed()
+            self._server = None
+
+    def _address(self) -> Tuple[str, int]:
+        assert self._server is not None, "stand-in is not running"
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return host, port
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        queued: Optional[List[Any]] = None
+        try:
+            while True:
+                command = await _read_command(reader)
+                if command is None:
+                    break
+                name = command[0].upper() if command else b""
+                if name == b"MULTI":
+                    queued = []
+                    reply: Any = _Status("OK")
+                elif name == b"EXEC":
+                    reply, queued = queued or [], None
+                elif name == b"SUBSCRIBE":
+                    for count, channel in enumerate(command[1:], start=1):
+                        self._subscribers.setdefault(channel, []).append(writer)
+                        writer.write(_encode([b"subscribe", channel, count]))
+                    await writer.drain()
+                    continue
+                elif queued is not None:
+                    queued.append(self._execute(name, command[1:]))
+                    reply = _Status("QUEUED")
+                else:
+                    reply = self._execute(name, command[1:])
+                writer.write(_encode(reply))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            for writers in self._subscribers.values():
+                if writer in writers:
+                    writers.remove(writer)
+            writer.close()
+
+    def _execute(self, name: bytes, args: List[bytes]) -> Any:
+        if name == b"PUBLISH" and len(args) >= 2:
+            channel = args[0].decode()
+            self.published[channel] = self.published.get(channel, 0) + 1
+            subscribers = self._subscribers.get(args[0], [])
+            for subscriber in subscribers:
+                subscriber.write(_encode([b"message", args[0], args[1]]))
+            return len(subscribers)
+        if name == b"PING":
+            return _Status("PONG")
+        if name in (b"HSET", b"HSETNX", b"HMGET", b"HGETALL", b"HINCRBY", b"HINCRBYFLOAT"):
+            values = self._hashes.setdefault(args[0], {})
+            return self._hash_command(name, values, args[1:])
+        return _Status("OK")
+
+    @staticmethod
+    def _hash_command(name: bytes, values: Dict[bytes, bytes], args: List[bytes]) -> Any:
+        if name == b"HSET":
+            added = 0
+            for field, value in zip(args[::2], args[1::2]):
+                added += field not in values
+                values[field] = value
+            return added
+        if name == b"HSETNX":
+            if args[0] in values:
+                return 0
+            values[args[0]] = args[1]
+            return 1
+        if name == b"HMGET":
+            return [values.get(field) for field in args]
+        if name == b"HGETALL":
+            return [item for pair in values.items() for item in pair]
+        if name == b"HINCRBY":
+            number = int(values.get(args[0], b"0")) + int(args[1])
+            values[args[0]] = str(number).encode()
+            return number
+        number = float(values.get(args[0], b"0")) + float(args[1])
+        values[args[0]] = repr(number).encode()
+        return values[args[0]]
+
+
+class _Status(str):
+    """A RESP simple-string reply."""
+
+
+def _encode(value: Any) -> bytes:
+    if isinstance(value, _Status):
+        return f"+{value}\r\n".encode()
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, int):
+        return f":{value}\r\n".encode()
+    if isinstance(value, list):
+        return f"*{len(value)}\r\n".encode() + b"".join(_encode(item) for item in value)
+    data = value if isinstance(value, bytes) else str(value).encode()
+    return b"$%d\r\n%s\r\n" % (len(data), data)
+
+
+async def _read_command(reader: asyncio.StreamReader) -> Optional[List[bytes]]:
+    header = await reader.readline()
+    if not header:
+        return None
+    if not header.startswith(b"*"):
+        return header.strip().split()
+
+    parts: List[bytes] = []
+    for _ in range(int(header[1:])):
+        length_line = await reader.readline()
+        length = int(length_line[1:])
+        data = await reader.readexactly(length + 2)
+        parts.append(data[:-2])
+    return parts
+
+
+class GatewayStandIn:
+    """Keep-alive HTTP server that accepts ``POST /broadcast`` like the Node gateway."""
+
+    def __init__(self, latency_seconds: float = 0.0) -> None:
+        self.latency_seconds = latency_seconds
+        self.received: Dict[str, int] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    @property
+    def url(self) -> str:
+        assert self._server is not None, "stand-in is not running"
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}/broadcast"
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> None:
+        self._server = await asyncio.start_server(self._handle, host, port)
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers: Dict[str, str] = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", "0")))
+                status, response = self._respond(request_line, body)
+                if self.latency_seconds:
+                    await asyncio.sleep(self.latency_seconds)
+                writer.write(
+                    f"HTTP/1.1 {status}\r\n"
+                    "Content-Type: application/json\r\n"
+                    f"Content-Length: {len(response)}\r\n\r\n".encode("latin-1")
+                    + response
+                )
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def _respond(self, request_line: bytes, body: bytes) -> Tuple[str, bytes]:
+        method, path, *_ = request_line.decode("latin-1").split()
+        if method != "POST" or path != "/broadcast":
+            return "404 Not Found", b'{"error":"not found"}'
+        try:
+            data: Dict[str, Any] = json.loads(body or b"{}")
+        except ValueError:
+            return "400 Bad Request", b'{"error":"invalid json"}'
+        if not data.get("message"):
+            return "400 Bad Request", b'{"error":"Missing `message` in request body"}'
+        channel = str(data.get("channel", "chat.events"))
+        self.received[channel] = self.received.get(channel, 0) + 1
+        return "202 Accepted", b'{"status":"broadcasted"}'
+
+
+class ObjectStoreStandIn:
+    """Keep-alive HTTP server storing objects in memory under ``PUT``/``GET /<key>``."""
+
+    def __init__(self, latency_seconds: float = 0.0) -> None:
+        self.latency_seconds = latency_seconds
+        self.objects: Dict[str, bytes] = {}
+        self.stats: Dict[str, int] = {"puts": 0, "gets": 0}
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    @property
+    def url(self) -> str:
+        assert self._server is not None, "stand-in is not running"
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}/archive"
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> None:
+        self._server = await asyncio.start_server(self._handle, host, port)
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers: Dict[str, str] = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", "0")))
+                method, path, *_ = request_line.decode("latin-1").split()
+                if self.latency_seconds:
+                    await asyncio.sleep(self.latency_seconds)
+                if method == "PUT":
+                    self.stats["puts"] += 1
+                    self.objects[path] = body
+                    status, response = "200 OK", b""
+                elif method == "GET" and path in self.objects:
+                    self.stats["gets"] += 1
+                    status, response = "200 OK", self.objects[path]
+                else:
+                    status, response = "404 Not Found", b""
+                writer.write(
+                    f"HTTP/1.1 {status}\r\n"
+                    "Content-Type: application/octet-stream\r\n"
+                    f"Content-Length: {len(response)}\r\n\r\n".encode("latin-1")
+                    + response
+                )
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+class DatabaseStandIn:
+    """In-memory stand-in for the Postgres sessions used on the ingest path.
+
+    Sessions accept event inserts (counted, not stored) and answer rule and
+    product lookups from the fixtures given to the constructor. Every database
+    call waits ``latency_seconds`` to model the round trip to Postgres.
+    """
+
+    def __init__(
+        self,
+        rules: Sequence[Any] = (),
+        products: Sequence[Any] = (),
+        latency_seconds: float = 0.0,
+    ) -> None:
+        self.rules = list(rules)
+        self.products = {product.id: product for product in products}
+        self.latency_seconds = latency_seconds
+        self.stats: Dict[str, int] = {"round_trips": 0, "inserted_rows": 0, "commits": 0}
+
+    def session(self) -> "_StandInSession":
+        """Session factory, usable in place of an ``async_sessionmaker``."""
+
+        return _StandInSession(self)
+
+    async def get_session(self) -> AsyncIterator["_StandInSession"]:
+        """Drop-in override for the ``db.get_async_session`` dependency."""
+
+        async with self.session() as session:
+            yield session
+
+    async def _round_trip(self) -> None:
+        self.stats["round_trips"] += 1
+        if self.latency_seconds:
+            await asyncio.sleep(self.latency_seconds)
+
+
+class _StandInResult:
+    def __init__(self, rows: Sequence[Any]) -> None:
+        self._rows = list(rows)
+
+    def all(self) -> List[Any]:
+        return list(self._rows)
+
+    def first(self) -> Any:
+        return self._rows[0] if self._rows else None
+
+
+class _StandInSession:
+    def __init__(self, database: DatabaseStandIn) -> None:
+        self._database = database
+
+    async def __aenter__(self) -> "_StandInSession":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        return None
+
+    async def execute(self, statement: Any, params: Any = None) -> _StandInResult:
+        await self._database._round_trip()
+        if statement.is_insert:
+            self._database.stats["inserted_rows"] += len(params) if isinstance(params, list) else 1
+            return _StandInResult([])
+        return _StandInResult(self._select(statement))
+
+    async def scalars(self, statement: Any) -> _StandInResult:
+        await self._database._round_trip()
+        return _StandInResult(self._select(statement))
+
+    async def scalar(self, statement: Any) -> Any:
+        return (await self.scalars(statement)).first()
+
+    async def commit(self) -> None:
+        await self._database._round_trip()
+        self._database.stats["commits"] += 1
+
+    async def rollback(self) -> None:
+        return None
+
+    async def close(self) -> None:
+        return None
+
+    def _select(self, statement: Any) -> List[Any]:
+        entity = statement.column_descriptions[0]["entity"]
+        table = getattr(entity, "__tablename__", None)
+        if table == "rules":
+            return [rule for rule in self._database.rules if rule.active]
+        if table == "products":
+            # Lookups are by primary key: the ``id_1`` bind of ``Product.id == ...``
+            # or the list bound by ``Product.id.in_(...)``.
+            bound = statement.compile().params.get("id_1")
+            ids = bound if isinstance(bound, list) else [bound]
+            products = (self._database.products.get(product_id) for product_id in ids)
+            return [product for product in products if product is not None]
+        if table == "streams":
+            # Archive checks before inserts: every stream exists and is live.
+            return [(stream_id, None) for stream_id in statement.compile().params["id_1"]]
+        raise NotImplementedError(f"Database stand-in cannot answer queries on {table}")
+
+
+@dataclass
+class RuleStandIn:
+    """Plain object with the fields the rule engine reads from a ``Rule`` row."""
+
+    id: int
+    trigger: str
+    action: str = "reply"
+    params_json: Dict[str, Any] = field(default_factory=dict)
+    active: bool = True
@@ -0,0 +1,174 @@
+"""Measure how long a fresh API worker takes to answer its first ``/health``.
+
+Each run starts ``uvicorn app.main:app`` in a new process and polls
+``/health`` until it returns 200, which is what an autoscaler waits for before
+routing traffic. Redis and the gateway are local stand-ins (see
+:mod:`benchmarks.standins`); the database is whatever ``DATABASE_URL`` points
+at, so ``check`` and ``create_all`` need a reachable, migrated Postgres::
+
+    cd services/api
+    python -m benchmarks.startup --modes check,create_all --json startup.json
+    python -m benchmarks.startup --modes skip --prewarm 0 --baseline startup.json
+
+The time to import ``app.main`` in a bare interpreter is reported separately,
+since it is paid by every worker regardless of the schema mode.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+import httpx
+
+from .standins import GatewayStandIn, RedisStandIn
+
+_API_DIR = Path(__file__).resolve().parent.parent
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _summary(samples: List[float]) -> Dict[str, float]:
+    return {
+        "runs": len(samples),
+        "min": min(samples),
+        "p50": statistics.median(samples),
+        "max": max(samples),
+    }
+
+
+def measure_import(runs: int) -> Dict[str, float]:
+    """Milliseconds to start an interpreter and import ``app.main``."""
+
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "import app.main"], cwd=_API_DIR, check=True)
+        samples.append((time.perf_counter() - started) * 1000)
+    return _summary(samples)
+
+
+async def time_to_healthy(env: Dict[str, str], timeout: float) -> float:
+    """Start one worker with ``env`` and return milliseconds until ``/health`` is 200."""
+
+    port = _free_port()
+    started = time.perf_counter()
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, "-m", "uvicorn", "app.main:app",
+        "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning",
+        cwd=_API_DIR,
+        env=env,
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=1.0) as client:
+            while time.perf_counter() - started < timeout:
+                if process.returncode is not None:
+                    break
+                try:
+                    response = await client.get("/health")
+                    if response.status_code == 200:
+                        return (time.perf_counter() - started) * 1000
+                except httpx.TransportError:
+                    pass
+                await asyncio.sleep(0.005)
+    finally:
+        if process.returncode is None:
+            process.terminate()
+        _, stderr = await process.communicate()
+
+    tail = stderr.decode(errors="replace").strip().splitlines()[-3:]
+    raise RuntimeError("worker never became healthy: " + " | ".join(tail))
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    redis = RedisStandIn()
+    gateway = GatewayStandIn()
+    await redis.start()
+    await gateway.start()
+    env = {
+        **os.environ,
+        "REDIS_URL": redis.url,
+        "GATEWAY_BROADCAST_URLS": json.dumps([gateway.url]),
+        "DB_POOL_PREWARM_CONNECTIONS": str(args.prewarm),
+        "EVENT_PARTITION_MAINTENANCE_ENABLED": "false",
+    }
+
+    results: Dict[str, Any] = {
+        "python": sys.version.split()[0],
+        "prewarm": args.prewarm,
+        "import_ms": measure_import(args.runs),
+        "modes": {},
+    }
+    try:
+        for mode in args.modes:
+            try:
+                samples = [
+                    await time_to_healthy({**env, "DB_SCHEMA_MODE": mode}, args.timeout)
+                    for _ in range(args.runs)
+                ]
+            except RuntimeError as exc:
+                results["modes"][mode] = {"error": str(exc)}
+                continue
+            results["modes"][mode] = _summary(samples)
+    finally:
+        await gateway.stop()
+        await redis.stop()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--modes",
+        type=lambda value: value.split(","),
+        default=["check", "create_all", "skip"],
+        help="comma-separated DB_SCHEMA_MODE values to compare",
+    )
+    parser.add_argument("--runs", type=int, default=5, help="workers started per mode")
+    parser.add_argument("--prewarm", type=int, default=5, help="DB_POOL_PREWARM_CONNECTIONS")
+    parser.add_argument("--timeout", type=float, default=30.0, help="seconds to wait for each worker")
+    parser.add_argument("--json", dest="json_path", help="write results to this file")
+    parser.add_argument("--baseline", help="compare against results saved by an earlier run")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    baseline: Dict[str, Any] = {}
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as handle:
+            baseline = json.load(handle)
+
+    rows = [("import app.main", results["import_ms"], baseline.get("import_ms"))]
+    rows += [
+        (f"healthy ({mode})", summary, baseline.get("modes", {}).get(mode))
+        for mode, summary in results["modes"].items()
+    ]
+    for label, summary, previous in rows:
+        if "error" in summary:
+            print(f"{label:<22} failed: {summary['error']}")
+            continue
+        line = f"{label:<22} p50 {summary['p50']:8.1f}  min {summary['min']:8.1f}  max {summary['max']:8.1f} ms"
+        if previous and "p50" in previous:
+            line += f"  ({(summary['p50'] / previous['p50'] - 1) * 100:+.0f}% p50)"
+        print(line)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as handle:
+            json.dump(results, handle, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Delivery order of the HTTP broadcaster."""
+
+from __future__ import annotations
+
+import asyncio
+import random
+from typing import Any, Dict, List
+
+from app.services.broadcaster import HttpBroadcaster
+
+
+class FakeResponse:
+    def raise_for_status(self) -> None:
+        return None
+
+
+class FakeGatewayClient:
+    """Records posts as they complete, after a random per-request latency."""
+
+    def __init__(self, seed: int) -> None:
+        self.rng = random.Random(seed)
+        self.received: List[Dict[str, Any]] = []
+
+    async def post(self, url: str, json: Dict[str, Any]) -> FakeResponse:
+        await asyncio.sleep(self.rng.random() / 1000)
+        self.received.append(json["message"])
+        return FakeResponse()
+
+    async def aclose(self) -> None:
+        return None
+
+
+async def _deliver(seed: int) -> List[Dict[str, Any]]:
+    broadcaster = HttpBroadcaster(
+        ["http://gateway/broadcast"],
+        timeout_seconds=1.0,
+        failure_threshold=3,
+        cooldown_seconds=1.0,
+        queue_size=1000,
+        batch_size=7,
+        action_fan_out=4,
+    )
+    await broadcaster._client.aclose()
+    client = broadcaster._client = FakeGatewayClient(seed)
+
+    rng = random.Random(seed)
+    await broadcaster.start()
+    for seq in range(120):
+        broadcaster.enqueue("chat.events", {"type": "chat", "seq": seq})
+        for action in range(rng.choice((0, 0, 1, 3))):
+            broadcaster.enqueue("rule.actions", {"type": "auto_reply", "seq": seq, "n": action}, concurrent=True)
+        if rng.random() < 0.3:
+            await asyncio.sleep(0)
+    await broadcaster.stop(drain_timeout=30)
+    return client.received
+
+
+def test_feed_order_survives_action_fan_out() -> None:
+    for seed in range(5):
+        received = asyncio.run(_deliver(seed))
+
+        chats = [message["seq"] for message in received if message["type"] == "chat"]
+        assert chats == list(range(120))
+        # Every action arrives after the chat that fired it and before the next chat.
+        last_chat = -1
+        for message in received:
+            if message["type"] == "chat":
+                last_chat = message["seq"]
+            else:
+                assert message["seq"] == last_chat
@@ -0,0 +1,65 @@
+"""ChatDeduper windows and spam buckets, including rollback of failed ingests."""
+
+from __future__ import annotations
+
+from typing import Any, Dict
+
+from app.services.chat_dedup import REPEAT_EVENT_TYPE, ChatDeduper
+from app.services.rate_limiter import BucketSpec
+
+
+def _deduper(**kwargs: Any) -> ChatDeduper:
+    kwargs.setdefault("user_limit", None)
+    return ChatDeduper(window_seconds=10.0, max_windows=100, **kwargs)
+
+
+def _chat(text: str, user: str = "viewer1", stream_id: int = 1) -> Dict[str, Any]:
+    return {"stream_id": stream_id, "type": "chat", "payload_json": {"username": user, "message": text}}
+
+
+def test_repeats_collapse_into_one_summary() -> None:
+    deduper = _deduper()
+
+    assert deduper.admit(_chat("Cek  keranjang"), now=0.0)
+    assert not deduper.admit(_chat("cek keranjang", user="viewer2"), now=1.0)
+    assert deduper.admit(_chat("cek keranjang", stream_id=2), now=1.0)
+
+    (summary,) = deduper.collect(now=11.0)
+    assert summary["type"] == REPEAT_EVENT_TYPE
+    assert summary["payload_json"]["repeat_count"] == 1
+
+
+def test_release_lets_the_retry_through() -> None:
+    deduper = _deduper(user_limit=BucketSpec(1.0, 1.0 / 60))
+    row = _chat("harga berapa")
+
+    assert deduper.admit(row, now=0.0)
+    deduper.release([row], now=0.5)
+
+    assert deduper.admit(_chat("harga berapa"), now=1.0)
+    assert deduper.stats()["duplicates"] == 0
+    assert deduper.stats()["spam"] == 0
+
+
+def test_release_keeps_a_window_that_already_has_repeats() -> None:
+    deduper = _deduper()
+    row = _chat("mantap")
+
+    assert deduper.admit(row, now=0.0)
+    assert not deduper.admit(_chat("mantap", user="viewer2"), now=1.0)
+    deduper.release([row], now=2.0)
+
+    (summary,) = deduper.collect(now=11.0)
+    assert summary["payload_json"]["message"] == "mantap"
+    assert summary["payload_json"]["repeat_count"] == 2
+
+
+def test_release_ignores_windows_opened_by_other_rows() -> None:
+    deduper = _deduper()
+    first, collapsed = _chat("ready?"), _chat("ready?", user="viewer2")
+
+    assert deduper.admit(first, now=0.0)
+    assert not deduper.admit(collapsed, now=1.0)
+    deduper.release([collapsed], now=2.0)
+
+    assert not deduper.admit(_chat("ready?", user="viewer3"), now=3.0)
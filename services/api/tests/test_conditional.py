@@ -0,0 +1,39 @@
+"""Conditional GET on versioned collections."""
+
+from __future__ import annotations
+
+from typing import Dict
+
+from fastapi import Request
+
+from app.conditional import collection_etag, not_modified_response, validator_headers
+from app.services.versions import CollectionVersion
+
+
+def _request(headers: Dict[str, str]) -> Request:
+    raw = [(name.lower().encode(), value.encode()) for name, value in headers.items()]
+    return Request({"type": "http", "method": "GET", "headers": raw})
+
+
+def test_matching_etag_is_not_modified() -> None:
+    etag = collection_etag("products", 1, CollectionVersion(3, 100.2))
+
+    cached = not_modified_response(_request({"If-None-Match": etag.removeprefix("W/")}), etag)
+
+    assert cached is not None and cached.status_code == 304
+    assert cached.headers["ETag"] == etag
+
+
+def test_write_within_the_same_second_is_modified() -> None:
+    before = collection_etag("products", 1, CollectionVersion(3, 100.2))
+    after = collection_etag("products", 1, CollectionVersion(4, 100.7))
+
+    assert not_modified_response(_request({"If-None-Match": before}), after) is None
+
+
+def test_if_modified_since_is_ignored() -> None:
+    etag = collection_etag("products", 1, CollectionVersion(4, 100.7))
+    request = _request({"If-Modified-Since": "Fri, 01 Jan 2100 00:00:00 GMT"})
+
+    assert not_modified_response(request, etag) is None
+    assert "Last-Modified" not in validator_headers(etag)
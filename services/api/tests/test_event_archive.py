@@ -0,0 +1,80 @@
+"""archive_stream eligibility checks, run against a scripted connection."""
+
+from __future__ import annotations
+
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, List, Optional
+
+from app.services.event_archive import archive_stream
+
+
+class FakeResult:
+    def __init__(self, row: Any) -> None:
+        self.row = row
+
+    def first(self) -> Any:
+        return self.row
+
+
+class FakeConnection:
+    """Grants the advisory lock and answers the stream lookup with ``stream``."""
+
+    def __init__(self, stream: Optional[SimpleNamespace]) -> None:
+        self.stream = stream
+        self.statements: List[str] = []
+
+    async def execution_options(self, **options: Any) -> "FakeConnection":
+        return self
+
+    @asynccontextmanager
+    async def begin(self) -> AsyncIterator[None]:
+        yield
+
+    async def scalar(self, statement: Any, params: Any = None) -> bool:
+        self.statements.append(str(statement))
+        return True
+
+    async def execute(self, statement: Any, params: Any = None) -> FakeResult:
+        self.statements.append(str(statement))
+        return FakeResult(self.stream)
+
+
+class FakeEngine:
+    def __init__(self, conn: FakeConnection) -> None:
+        self.conn = conn
+
+    @asynccontextmanager
+    async def connect(self) -> AsyncIterator[FakeConnection]:
+        yield self.conn
+
+
+class FakeStore:
+    def __init__(self) -> None:
+        self.keys: List[str] = []
+
+    async def put(self, key: str, data: bytes) -> None:
+        self.keys.append(key)
+
+
+def _archive(stream: Optional[SimpleNamespace]) -> Any:
+    conn, store = FakeConnection(stream), FakeStore()
+    archived = asyncio.run(archive_stream(FakeEngine(conn), store, 5, segment_rows=100))
+    return archived, conn, store
+
+
+def test_live_stream_is_not_archived_even_when_named() -> None:
+    archived, conn, store = _archive(SimpleNamespace(end_at=None, archived_at=None))
+
+    assert archived is None
+    assert store.keys == []
+    assert "FOR UPDATE" in conn.statements[-1]
+
+
+def test_archived_or_missing_stream_is_skipped() -> None:
+    ended = datetime(2024, 9, 1, tzinfo=timezone.utc)
+
+    assert _archive(SimpleNamespace(end_at=ended, archived_at=ended))[0] is None
+    assert _archive(None)[0] is None
@@ -0,0 +1,67 @@
+"""Partition maintenance statement order, run against a scripted connection."""
+
+from __future__ import annotations
+
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, List
+
+from sqlalchemy.exc import OperationalError
+
+from app.services.event_partitions import EVENTS_DEFAULT_PARTITION_ROWS, _maintain
+
+
+def _name(days_ago: int) -> str:
+    return "events_p" + (datetime.now(timezone.utc).date() - timedelta(days=days_ago)).strftime("%Y%m%d")
+
+
+class FakeConnection:
+    """Records statements per transaction; ``locked`` partitions fail to detach."""
+
+    def __init__(self, partitions: List[str], locked: List[str]) -> None:
+        self.partitions = partitions
+        self.locked = locked
+        self.detached: List[str] = []
+        self.transactions: List[List[str]] = []
+
+    @asynccontextmanager
+    async def begin(self) -> AsyncIterator[None]:
+        self.transactions.append([])
+        yield
+
+    async def scalar(self, statement: Any, params: Any = None) -> Any:
+        self.transactions[-1].append(str(statement))
+        return 3 if "count(*)" in str(statement) else "created"
+
+    async def execute(self, statement: Any, params: Any = None) -> List[Any]:
+        sql = str(statement)
+        self.transactions[-1].append(sql)
+        if sql.startswith("SELECT relname FROM pg_class"):
+            return [(name,) for name in self.detached]
+        if "FROM pg_inherits" in sql:
+            return [(name,) for name in self.partitions]
+        if "DETACH PARTITION" in sql:
+            name = sql.rsplit(" ", 1)[-1]
+            if name in self.locked:
+                raise OperationalError(sql, None, Exception("lock timeout"))
+            self.detached.append(name)
+        return []
+
+
+def test_expired_partitions_are_detached_alone_then_dropped() -> None:
+    old, locked, kept = _name(40), _name(35), _name(3)
+    conn = FakeConnection([old, locked, kept, "events_default"], locked=[locked])
+
+    expired = asyncio.run(_maintain(conn, days_ahead=1, retention_days=30, lock_timeout_ms=500))
+
+    assert expired == [old]
+    detaches = [statements for statements in conn.transactions if any("DETACH" in sql for sql in statements)]
+    assert detaches == [
+        ["SET LOCAL lock_timeout = 500", f"ALTER TABLE events DETACH PARTITION {old}"],
+        ["SET LOCAL lock_timeout = 500", f"ALTER TABLE events DETACH PARTITION {locked}"],
+    ]
+    (drop,) = [statements for statements in conn.transactions if any("DROP" in sql for sql in statements)]
+    assert f"FROM {old}" in drop[0] and drop[1] == f"DROP TABLE {old}"
+    assert any("DELETE FROM events_default" in sql for sql in conn.transactions[-1])
+    assert EVENTS_DEFAULT_PARTITION_ROWS._default().value == 3
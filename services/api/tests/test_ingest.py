@@ -0,0 +1,80 @@
+"""Ingest outcomes reported back to clients."""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Dict, List
+
+import pytest
+from fastapi import HTTPException
+
+from app.metrics import EVENTS_INGESTED_TOTAL
+from app.routers import events
+from app.services.stream_stats import StreamStatsRegistry
+
+
+def _gift(stream_id: int) -> Dict[str, Any]:
+    return {"stream_id": stream_id, "type": "gift", "payload_json": {"username": "viewer", "value": 1}}
+
+
+@pytest.fixture
+def forwarded(monkeypatch: pytest.MonkeyPatch) -> List[Dict[str, Any]]:
+    sent: List[Dict[str, Any]] = []
+    monkeypatch.setattr(events, "_forward_to_gateway", lambda event_type, payload, **_: sent.append(payload))
+    return sent
+
+
+class FakeRedis:
+    async def hgetall(self, key: str) -> Dict[str, str]:
+        return {}
+
+
+@pytest.fixture
+def stream_stats(monkeypatch: pytest.MonkeyPatch) -> StreamStatsRegistry:
+    registry = StreamStatsRegistry(FakeRedis(), window_seconds=60, checkpoint_interval_seconds=5.0)
+    monkeypatch.setattr(events, "get_stream_stats", lambda: registry)
+    return registry
+
+
+def test_failed_persist_is_not_counted_until_the_retry_succeeds(
+    monkeypatch: pytest.MonkeyPatch, forwarded: List[Dict[str, Any]], stream_stats: StreamStatsRegistry
+) -> None:
+    attempts: List[int] = []
+
+    async def persist(rows: List[Dict[str, Any]], session: Any) -> List[Dict[str, Any]]:
+        attempts.append(len(rows))
+        if len(attempts) == 1:
+            raise ConnectionError("database went away")
+        return []
+
+    monkeypatch.setattr(events, "_persist_events", persist)
+    ingested = EVENTS_INGESTED_TOTAL.labels("gift")
+    before = ingested.value
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(events._ingest([_gift(3), _gift(3)], None, None, None))
+    assert ingested.value == before
+    assert asyncio.run(stream_stats.snapshot(3))["total_gifts"] == 0
+
+    asyncio.run(events._ingest([_gift(3), _gift(3)], None, None, None))
+    assert ingested.value == before + 2
+    assert asyncio.run(stream_stats.snapshot(3))["total_gifts"] == 2
+    assert len(forwarded) == 2
+
+
+def test_events_of_archived_streams_are_refused(
+    monkeypatch: pytest.MonkeyPatch, forwarded: List[Dict[str, Any]], stream_stats: StreamStatsRegistry
+) -> None:
+    async def persist(rows: List[Dict[str, Any]], session: Any) -> List[Dict[str, Any]]:
+        return [row for row in rows if row["stream_id"] == 9]
+
+    monkeypatch.setattr(events, "_persist_events", persist)
+    rows = [_gift(1), _gift(9), _gift(1)]
+
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(events._ingest(rows, None, None, None))
+
+    assert raised.value.status_code == 409
+    assert raised.value.detail["rejected"] == [1]
+    assert len(forwarded) == 2
+    assert asyncio.run(stream_stats.snapshot(9))["total_gifts"] == 0
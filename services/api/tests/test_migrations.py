@@ -0,0 +1,19 @@
+"""The Alembic chain must stay importable and linear for ``alembic upgrade head``."""
+
+from __future__ import annotations
+
+import ast
+
+from app.db import _MIGRATIONS_DIR, migration_heads, migration_revisions
+
+
+def test_every_migration_parses() -> None:
+    for path in sorted(_MIGRATIONS_DIR.glob("*.py")):
+        ast.parse(path.read_text(encoding="utf-8"), filename=str(path))
+
+
+def test_chain_has_a_single_head() -> None:
+    revisions = migration_revisions()
+
+    assert len(migration_heads(revisions)) == 1
+    assert [revision for revision, down in revisions.items() if not down] == ["202409240001"]
@@ -0,0 +1,47 @@
+"""RuleRateLimiter charging across the local and shared buckets."""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Any, List
+
+from app.services.rate_limiter import BucketSpec, RuleRateLimiter
+
+COOLDOWN = (BucketSpec(1.0, 1.0 / 30),)
+
+
+class FakeRedis:
+    """Shared buckets that deny every firing while ``full`` is set."""
+
+    def __init__(self) -> None:
+        self.full = False
+        self.calls = 0
+
+    def register_script(self, script: str) -> Any:
+        async def run(keys: List[str], args: List[float]) -> int:
+            self.calls += 1
+            return 1 if self.full else 0
+
+        return run
+
+
+def test_shared_denial_refunds_local_tokens() -> None:
+    redis = FakeRedis()
+    limiter = RuleRateLimiter(redis, stream_limit=None)
+
+    redis.full = True
+    assert asyncio.run(limiter.acquire(7, "rule-1", COOLDOWN)) == "rule"
+
+    redis.full = False
+    assert asyncio.run(limiter.acquire(7, "rule-1", COOLDOWN)) is None
+    assert redis.calls == 2
+
+
+def test_local_denial_skips_the_shared_check() -> None:
+    redis = FakeRedis()
+    limiter = RuleRateLimiter(redis, stream_limit=BucketSpec(5.0, 1.0))
+
+    assert asyncio.run(limiter.acquire(7, "rule-1", COOLDOWN)) is None
+    assert asyncio.run(limiter.acquire(7, "rule-1", COOLDOWN)) == "rule"
+    assert redis.calls == 1
+    assert limiter.stats() == {"allowed": 1, "suppressed": 1, "buckets": 2}
@@ -0,0 +1,99 @@
+"""RuleMatcher must return exactly what the reference apply_rules scan returns."""
+
+from __future__ import annotations
+
+import random
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import pytest
+
+from app.services.rule_engine import apply_rules, compile_rules
+
+# Both matching strategies: always scan the triggers, always walk the automaton.
+MODES = {"linear": 10**9, "automaton": 0}
+
+
+@dataclass
+class FakeRule:
+    id: int
+    trigger: Optional[str]
+    action: str = "reply"
+    params_json: Optional[Dict[str, Any]] = field(default_factory=dict)
+    active: bool = True
+
+
+def _rule(index: int, trigger: Optional[str], **kwargs: Any) -> FakeRule:
+    kwargs.setdefault("params_json", {"text": f"reply {index}"})
+    return FakeRule(id=index, trigger=trigger, **kwargs)
+
+
+def _assert_equivalent(rules: List[FakeRule], texts: List[str]) -> None:
+    for mode, max_triggers in MODES.items():
+        matcher = compile_rules(rules, linear_scan_max_triggers=max_triggers)
+        for text in texts:
+            assert matcher.match(text) == apply_rules(text, rules), (mode, text)
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_strategy_follows_trigger_count(mode: str) -> None:
+    rules = [_rule(index, f"word{index}") for index in range(3)]
+
+    matcher = compile_rules(rules, linear_scan_max_triggers=MODES[mode])
+
+    assert matcher.linear is (mode == "linear")
+
+
+def test_edge_cases() -> None:
+    rules = [
+        _rule(1, "Harga"),
+        _rule(2, "  harga  ", action="pin_product", params_json={"product_id": 7}),
+        _rule(3, "ongkir", active=False),
+        _rule(4, ""),
+        _rule(5, "   "),
+        _rule(6, None),
+        _rule(7, "arg"),
+        _rule(8, "harga berapa"),
+        _rule(9, "🔥"),
+        _rule(10, "ÉTÉ"),
+        _rule(11, "aa", params_json=None),
+        _rule(12, "cooldown", params_json={"cooldown_seconds": "soon"}),
+    ]
+    texts = [
+        "",
+        "HARGA BERAPA kak?",
+        "harg",
+        "ongkir berapa",
+        "🔥🔥🔥",
+        "été à Bali",
+        "aaaa",
+        "no cooldown here",
+        "hargaharga",
+    ]
+
+    _assert_equivalent(rules, texts)
+
+
+def test_overlapping_and_nested_triggers() -> None:
+    rules = [_rule(index, trigger) for index, trigger in enumerate(
+        ["he", "she", "his", "hers", "s", "ushers", "e", "h"], start=1
+    )]
+
+    _assert_equivalent(rules, ["ushers", "this", "hhhhe", "sh", "xyz"])
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_random_rule_sets(seed: int) -> None:
+    rng = random.Random(seed)
+    alphabet = "abcAB ?é🔥"
+
+    def word(low: int, high: int) -> str:
+        return "".join(rng.choice(alphabet) for _ in range(rng.randint(low, high)))
+
+    rules = [
+        _rule(index, word(0, 4), active=rng.random() > 0.1)
+        for index in range(rng.randint(1, 120))
+    ]
+    texts = [word(0, 40) for _ in range(50)]
+
+    _assert_equivalent(rules, texts)
@@ -0,0 +1,75 @@
+"""ShardRouter forwarding failures: local fallback only when nothing was sent."""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from app.services.sharding import ShardRouter
+
+NODES = ["http://api-a:8000", "http://api-b:8000"]
+
+
+class FakeOwnerClient:
+    def __init__(self, *, error: Optional[Exception] = None, response: Optional[httpx.Response] = None) -> None:
+        self.error = error
+        self.response = response
+        self.posted: List[Any] = []
+
+    async def post(self, url: str, json: Any, headers: Dict[str, str]) -> httpx.Response:
+        self.posted.append(json)
+        if self.error is not None:
+            raise self.error
+        return self.response
+
+    async def aclose(self) -> None:
+        return None
+
+
+def _forward(client: FakeOwnerClient) -> Any:
+    router = ShardRouter(NODES, self_node=NODES[0], vnodes=16, timeout_seconds=1.0)
+    router._client = client
+    rows = [{"stream_id": stream_id, "type": "chat", "payload_json": {"message": "halo"}} for stream_id in (1, 2)]
+    return rows, asyncio.run(router.forward({NODES[1]: rows})), router.stats()
+
+
+def test_unreachable_owner_falls_back_to_local_processing() -> None:
+    request = httpx.Request("POST", NODES[1])
+    rows, (undelivered, rejected, retry_after, archived), _ = _forward(
+        FakeOwnerClient(error=httpx.ConnectError("refused", request=request))
+    )
+
+    assert undelivered == rows
+    assert rejected == []
+    assert retry_after is None
+
+
+def test_read_timeout_rejects_rows_instead_of_writing_them_twice() -> None:
+    request = httpx.Request("POST", NODES[1])
+    rows, (undelivered, rejected, retry_after, archived), stats = _forward(
+        FakeOwnerClient(error=httpx.ReadTimeout("slow owner", request=request))
+    )
+
+    assert undelivered == []
+    assert rejected == rows
+    assert retry_after == 1
+    assert stats["unconfirmed"] == 2
+
+
+def test_owner_429_rejects_only_the_rows_it_shed() -> None:
+    response = httpx.Response(429, headers={"Retry-After": "3"}, json={"detail": {"rejected": [1]}})
+    rows, (undelivered, rejected, retry_after, archived), _ = _forward(FakeOwnerClient(response=response))
+
+    assert undelivered == []
+    assert rejected == [rows[1]]
+    assert retry_after == 3
+
+
+def test_owner_409_reports_rows_of_archived_streams() -> None:
+    response = httpx.Response(409, json={"detail": {"rejected": [0]}})
+    rows, (undelivered, rejected, retry_after, archived), _ = _forward(FakeOwnerClient(response=response))
+
+    assert (undelivered, rejected, retry_after) == ([], [], None)
+    assert archived == [rows[0]]
@@ -0,0 +1,50 @@
+"""StreamStatsRegistry totals across worker restarts."""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Dict
+
+from app.services.stream_stats import StreamStatsRegistry
+
+
+class FakeRedis:
+    def __init__(self, hashes: Dict[str, Dict[str, str]]) -> None:
+        self.hashes = hashes
+
+    async def hgetall(self, key: str) -> Dict[str, str]:
+        return dict(self.hashes.get(key, {}))
+
+
+def _registry(hashes: Dict[str, Dict[str, str]]) -> StreamStatsRegistry:
+    return StreamStatsRegistry(FakeRedis(hashes), window_seconds=60, checkpoint_interval_seconds=5.0)
+
+
+def test_snapshot_loads_checkpointed_totals_on_a_miss() -> None:
+    registry = _registry({"stream:stats:7": {"chats": "40", "gifts": "3", "gift_value": "12.5"}})
+
+    snapshot = asyncio.run(registry.snapshot(7))
+
+    assert snapshot["total_chats"] == 40
+    assert snapshot["total_gifts"] == 3
+    assert snapshot["total_gift_value"] == 12.5
+
+
+def test_local_increments_add_to_checkpointed_totals() -> None:
+    registry = _registry({"stream:stats:7": {"chats": "40", "gifts": "0", "gift_value": "0"}})
+    registry.record(7, "chat", {"message": "halo"})
+    registry.record(7, "gift", {"value": 5, "amount": 2})
+
+    snapshot = asyncio.run(registry.snapshot(7))
+
+    assert snapshot["total_chats"] == 41
+    assert snapshot["total_gifts"] == 1
+    assert snapshot["total_gift_value"] == 10.0
+    assert snapshot["chats_per_minute"] == 1.0
+
+
+def test_unknown_stream_reads_as_zero() -> None:
+    snapshot = asyncio.run(_registry({}).snapshot(9))
+
+    assert snapshot["total_chats"] == 0
+    assert snapshot["last_event_at"] is None